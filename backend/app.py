@@ -1,5 +1,6 @@
 """Main Flask application"""
-from flask import Flask, send_from_directory
+import click
+from flask import Flask
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flask_limiter import Limiter
@@ -9,6 +10,24 @@ import os
 from config import config
 from database import Database
 from utils.logger import setup_logger
+from utils.cache import response_cache
+from services.accident_index import live_accident_index
+from services.duplicate_index import duplicate_index
+from services.heatmap_tiles import heatmap_tiles
+from services.rollup_service import RollupService
+from services.image_pipeline import image_pipeline
+from services.zone_service import zone_service
+from services.vector_tiles import vector_tiles
+from services.alert_broker import alert_broker
+from services.alert_index import alert_index
+from services.emergency_index import emergency_index
+from services.routing_service import routing_service
+from services.safe_route import safe_route
+from services.notification_dispatcher import notification_dispatcher
+from services.alert_expiry import alert_expiry
+from utils.blob_store import dedupe_upload_tree
+from utils.road_graph import RoadGraph
+from utils.file_handler import send_upload, strip_metadata
 
 # Import blueprints
 from routes.auth import auth_bp
@@ -20,6 +39,9 @@ from routes.admin import admin_bp
 from routes.export import export_bp
 from routes.stats import stats_bp
 from routes.backup import backup_bp
+from routes.tiles import tiles_bp
+from routes.notifications import notifications_bp
+from routes.routing import routing_bp
 
 def create_app(config_name='development'):
     """Application factory"""
@@ -44,6 +66,8 @@ def create_app(config_name='development'):
             key_func=get_remote_address,
             default_limits=[app.config['RATE_LIMIT_DEFAULT']]
         )
+        # A map view fetches dozens of tiles per pan
+        limiter.limit(app.config['VECTOR_TILE_RATE_LIMIT'])(tiles_bp)
     
     # Initialize database connection pool
     try:
@@ -52,6 +76,38 @@ def create_app(config_name='development'):
     except Exception as e:
         app.logger.error(f"Failed to initialize database: {e}")
     
+    # Response cache, invalidated by model write events
+    response_cache.init_app(app)
+    response_cache.invalidate_on('alert.created', 'alerts')
+    response_cache.invalidate_on('alert.created_batch', 'alerts')
+    response_cache.invalidate_on('alert.deactivated', 'alerts')
+    response_cache.invalidate_on('alert.expired', 'alerts')
+    response_cache.invalidate_on('awareness.changed', 'awareness')
+    response_cache.invalidate_on('accident.created', 'heatmap', 'leaderboard')
+    response_cache.invalidate_on('accident.created_batch', 'heatmap', 'leaderboard')
+    response_cache.invalidate_on('accident.deleted', 'heatmap', 'leaderboard')
+    response_cache.invalidate_on(
+        'accident.updated', 'heatmap', when=lambda fields, **payload: 'severity' in fields
+    )
+    
+    # In-memory indexes fed by model write events
+    live_accident_index.init_app(app)
+    duplicate_index.init_app(app)
+    heatmap_tiles.init_app(app)
+    vector_tiles.init_app(app)
+    alert_broker.init_app(app)
+    alert_index.init_app(app)
+    emergency_index.init_app(app)
+    routing_service.init_app(app)
+    safe_route.init_app(app)
+    RollupService.init_app(app)
+    
+    # Background workers
+    image_pipeline.init_app(app)
+    zone_service.init_app(app)
+    notification_dispatcher.init_app(app)
+    alert_expiry.init_app(app)
+    
     # Register blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(accidents_bp)
@@ -62,12 +118,89 @@ def create_app(config_name='development'):
     app.register_blueprint(export_bp)
     app.register_blueprint(stats_bp)
     app.register_blueprint(backup_bp)
+    app.register_blueprint(tiles_bp)
+    app.register_blueprint(notifications_bp)
+    app.register_blueprint(routing_bp)
+    
+    # CLI commands
+    @app.cli.command('rebuild-rollups')
+    def rebuild_rollups():
+        """Recompute analytics rollups from the accidents table"""
+        count = RollupService.rebuild()
+        print(f"Rebuilt {count} rollup buckets")
+    
+    @app.cli.command('rebuild-zones')
+    def rebuild_zones():
+        """Recompute accident-prone zones"""
+        count = zone_service.refresh()
+        print(f"Computed {count} accident-prone zones")
+    
+    @app.cli.command('archive-alerts')
+    def archive_alerts():
+        """Move old inactive alerts to alerts_archive"""
+        count = alert_expiry.archive()
+        print(f"Archived {count} alerts")
+    
+    @app.cli.command('build-road-graph')
+    @click.argument('source')
+    @click.argument('destination')
+    @click.option('--landmarks', default=16, show_default=True,
+                  help='Landmark junctions for route search bounds; 0 to skip')
+    def build_road_graph(source, destination, landmarks):
+        """Build a routing graph from an OpenStreetMap XML extract"""
+        graph = RoadGraph.from_osm(source)
+        if landmarks:
+            graph.prepare_landmarks(landmarks)
+        graph.save(destination)
+        print(f"Wrote {len(graph)} junctions and {graph.edge_count} road segments to {destination}")
+    
+    @app.cli.command('backfill-image-derivatives')
+    def backfill_image_derivatives():
+        """Queue derivative generation for images uploaded before it existed"""
+        query = """
+            SELECT a.id, a.image_path
+            FROM accidents a
+            LEFT JOIN accident_images i ON i.accident_id = a.id
+            WHERE a.image_path IS NOT NULL AND i.id IS NULL
+        """
+        rows = Database.execute_query(query, fetch_all=True) or []
+        for row in rows:
+            image_pipeline.enqueue(row['id'], row['image_path'])
+        print(f"Queued {len(rows)} images")
+    
+    @app.cli.command('dedupe-uploads')
+    def dedupe_uploads():
+        """Move existing uploads into the content-addressed store"""
+        stats = dedupe_upload_tree('accidents')
+        print(
+            f"Migrated {stats['migrated']} images, merged {stats['duplicates']} duplicates "
+            f"({stats['bytes_saved']} bytes saved); {stats['missing']} missing, "
+            f"{stats['orphans']} unreferenced files left in place"
+        )
+    
+    @app.cli.command('strip-upload-metadata')
+    def strip_upload_metadata():
+        """Strip EXIF metadata from accident images stored before uploads were cleaned"""
+        query = "SELECT DISTINCT image_path FROM accidents WHERE image_path IS NOT NULL"
+        rows = Database.execute_query(query, fetch_all=True) or []
+        stripped = failed = 0
+        for row in rows:
+            full_path = os.path.join(app.config['UPLOAD_FOLDER'], row['image_path'])
+            if not os.path.exists(full_path):
+                continue
+            try:
+                strip_metadata(full_path)
+                stripped += 1
+            except Exception as e:
+                failed += 1
+                app.logger.warning(f"Could not strip {row['image_path']}: {e}")
+        print(f"Stripped {stripped} images; {failed} could not be read")
     
     # Serve uploaded files
     @app.route('/uploads/<path:filename>')
     def uploaded_file(filename):
         """Serve uploaded files"""
-        return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+        return send_upload(filename)
     
     # Health check endpoint
     @app.route('/health')
@@ -76,7 +209,20 @@ def create_app(config_name='development'):
         db_status = Database.test_connection()
         return {
             "status": "healthy" if db_status else "unhealthy",
-            "database": "connected" if db_status else "disconnected"
+            "database": "connected" if db_status else "disconnected",
+            "pool": Database.pool_stats(),
+            "live_index": live_accident_index.stats(),
+            "duplicate_index": duplicate_index.stats(),
+            "heatmap_tiles": heatmap_tiles.stats(),
+            "vector_tiles": vector_tiles.stats(),
+            "alert_stream": alert_broker.stats(),
+            "alert_index": alert_index.stats(),
+            "emergency_index": emergency_index.stats(),
+            "routing": routing_service.stats(),
+            "safe_routes": safe_route.stats(),
+            "notifications": notification_dispatcher.stats(),
+            "alert_expiry": alert_expiry.stats(),
+            "cache": response_cache.stats()
         }, 200 if db_status else 503
     
     # Root endpoint
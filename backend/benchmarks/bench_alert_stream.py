@@ -0,0 +1,140 @@
+"""
+Benchmark alert fan-out: geo-indexed broker vs scanning every subscriber
+
+Usage (from the backend directory):
+    python benchmarks/bench_alert_stream.py [--subscribers 10000] [--alerts 1000]
+    python benchmarks/bench_alert_stream.py --connect http://localhost:5000 [--subscribers 10000]
+
+--connect opens that many idle /api/alerts/stream connections against a
+running server from a single thread and reports how many it holds open;
+raise the open file limit (ulimit -n) on both sides first.
+"""
+import argparse
+import os
+import random
+import selectors
+import socket
+import sys
+import time
+import tracemalloc
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.alert_broker import AlertBroker
+from utils.geolocation import haversine_distance
+
+# Roughly the Delhi NCR bounding box
+MIN_LAT, MAX_LAT = 28.40, 28.90
+MIN_LON, MAX_LON = 76.85, 77.40
+
+def random_point():
+    return random.uniform(MIN_LAT, MAX_LAT), random.uniform(MIN_LON, MAX_LON)
+
+def build_broker(count):
+    broker = AlertBroker(max_subscribers=count, queue_size=1000)
+    subscribers = []
+    for _ in range(count):
+        latitude, longitude = random_point()
+        subscribers.append(broker.subscribe(latitude, longitude, random.choice([2, 5, 10])))
+    return broker, subscribers
+
+def time_publish(fn, alerts):
+    samples = []
+    for alert_id in range(1, alerts + 1):
+        latitude, longitude = random_point()
+        started = time.perf_counter()
+        fn({'id': alert_id, 'latitude': latitude, 'longitude': longitude, 'message': 'bench'})
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        'mean_ms': sum(samples) / len(samples),
+        'p50_ms': samples[len(samples) // 2],
+        'p99_ms': samples[int(len(samples) * 0.99) - 1]
+    }
+
+def bench_broker(args):
+    tracemalloc.start()
+    started = time.perf_counter()
+    broker, subscribers = build_broker(args.subscribers)
+    elapsed = time.perf_counter() - started
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"Subscribed {args.subscribers} streams in {elapsed:.2f}s, "
+          f"{memory / args.subscribers / 1024:.1f} KiB each")
+
+    def scan(alert):
+        return [
+            subscriber for subscriber in subscribers
+            if haversine_distance(subscriber.latitude, subscriber.longitude,
+                                  alert['latitude'], alert['longitude']) <= subscriber.radius_km
+        ]
+
+    result = time_publish(lambda a: broker.match(a['latitude'], a['longitude']), args.alerts)
+    print(f"match, grid: mean {result['mean_ms']:.3f}ms  p50 {result['p50_ms']:.3f}ms  "
+          f"p99 {result['p99_ms']:.3f}ms")
+
+    result = time_publish(scan, args.alerts)
+    print(f"match, scan: mean {result['mean_ms']:.3f}ms  p50 {result['p50_ms']:.3f}ms  "
+          f"p99 {result['p99_ms']:.3f}ms")
+
+    result = time_publish(broker.publish, args.alerts)
+    print(f"publish:     mean {result['mean_ms']:.3f}ms  p50 {result['p50_ms']:.3f}ms  "
+          f"p99 {result['p99_ms']:.3f}ms  ({broker.delivered / args.alerts:.0f} deliveries per alert)")
+
+def bench_connections(args):
+    url = urlparse(args.connect)
+    host, port = url.hostname, url.port or 80
+    selector = selectors.DefaultSelector()
+    opened = failed = 0
+
+    started = time.perf_counter()
+    for _ in range(args.subscribers):
+        latitude, longitude = random_point()
+        request = (
+            f"GET /api/alerts/stream?latitude={latitude:.5f}&longitude={longitude:.5f}&radius=5 HTTP/1.1\r\n"
+            f"Host: {host}\r\nAccept: text/event-stream\r\n\r\n"
+        ).encode()
+        try:
+            sock = socket.create_connection((host, port), timeout=10)
+            sock.sendall(request)
+            sock.setblocking(False)
+            selector.register(sock, selectors.EVENT_READ, bytearray())
+            opened += 1
+        except OSError:
+            failed += 1
+    print(f"Opened {opened} connections ({failed} failed) in {time.perf_counter() - started:.1f}s")
+
+    # Read until every stream has sent its headers, then hold them idle
+    deadline = time.monotonic() + args.hold
+    streaming = 0
+    while time.monotonic() < deadline:
+        for key, _ in selector.select(timeout=1):
+            try:
+                data = key.fileobj.recv(4096)
+            except OSError:
+                data = b''
+            if not data:
+                selector.unregister(key.fileobj)
+                key.fileobj.close()
+                continue
+            if not key.data and data.startswith(b'HTTP/1.1 200'):
+                streaming += 1
+            key.data.extend(data[:1])
+    print(f"{streaming} streams answered 200, {len(selector.get_map())} still open after {args.hold}s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--subscribers', type=int, default=10_000)
+    parser.add_argument('--alerts', type=int, default=1000)
+    parser.add_argument('--connect', help='Base URL of a running server')
+    parser.add_argument('--hold', type=int, default=60, help='Seconds to hold --connect streams')
+    args = parser.parse_args()
+
+    if args.connect:
+        bench_connections(args)
+    else:
+        bench_broker(args)
+
+if __name__ == '__main__':
+    main()
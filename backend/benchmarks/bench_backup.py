@@ -0,0 +1,48 @@
+"""
+Benchmark streaming backup and restore against the configured database
+
+Usage (from the backend directory):
+    python benchmarks/bench_backup.py [--compression gzip|zstd] [--restore]
+
+Load the accidents table first (e.g. 1M rows) to measure at scale.
+--restore re-imports the backup with INSERT IGNORE, which exercises the
+read path without changing existing rows.
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.backup import BackupUtility
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--compression', default='gzip', choices=['gzip', 'zstd'])
+    parser.add_argument('--restore', action='store_true')
+    args = parser.parse_args()
+    
+    backup_dir = tempfile.mkdtemp(prefix='safe_route_bench_')
+    
+    started = time.perf_counter()
+    filename = BackupUtility.create_backup(backup_dir, compression=args.compression)
+    elapsed = time.perf_counter() - started
+    size_mb = os.path.getsize(os.path.join(backup_dir, filename)) / (1024 * 1024)
+    print(f"backup:  {elapsed:.1f}s  {size_mb:.1f} MB on disk  peak RSS {peak_rss_mb():.0f} MB")
+    
+    if args.restore:
+        started = time.perf_counter()
+        restored = BackupUtility.restore_backup(filename, backup_dir)
+        elapsed = time.perf_counter() - started
+        print(f"restore: {elapsed:.1f}s  {restored}  peak RSS {peak_rss_mb():.0f} MB")
+    
+    print(f"files left in {backup_dir}")
+
+if __name__ == '__main__':
+    main()
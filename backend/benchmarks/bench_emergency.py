@@ -0,0 +1,74 @@
+"""
+Benchmark emergency service lookups: KD-tree vs scanning and sorting every service
+
+Usage (from the backend directory):
+    python benchmarks/bench_emergency.py [--services 100000] [--queries 2000] [--k 3]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.geolocation import haversine_many
+from utils.spatial import SphericalKDTree
+
+# Roughly mainland India
+MIN_LAT, MAX_LAT = 8.0, 35.0
+MIN_LON, MAX_LON = 68.0, 97.0
+
+def random_point():
+    return random.uniform(MIN_LAT, MAX_LAT), random.uniform(MIN_LON, MAX_LON)
+
+def time_queries(fn, queries):
+    points = [random_point() for _ in range(queries)]
+    samples = []
+    for latitude, longitude in points:
+        started = time.perf_counter()
+        fn(latitude, longitude)
+        samples.append((time.perf_counter() - started) * 1e6)
+    samples.sort()
+    return {
+        'mean_us': sum(samples) / len(samples),
+        'p50_us': samples[len(samples) // 2],
+        'p99_us': samples[int(len(samples) * 0.99) - 1]
+    }
+
+def report(name, result):
+    print(f"{name:18} mean {result['mean_us']:8.1f}us  p50 {result['p50_us']:8.1f}us  "
+          f"p99 {result['p99_us']:8.1f}us")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--services', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--k', type=int, default=3)
+    parser.add_argument('--radius', type=float, default=10.0)
+    args = parser.parse_args()
+
+    lats = np.random.uniform(MIN_LAT, MAX_LAT, args.services)
+    lons = np.random.uniform(MIN_LON, MAX_LON, args.services)
+
+    started = time.perf_counter()
+    tree = SphericalKDTree(lats, lons)
+    print(f"Built KD-tree over {args.services} services in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    def scan_nearest(latitude, longitude):
+        distances = haversine_many(latitude, longitude, lats, lons)
+        return np.argsort(distances)[:args.k]
+
+    def scan_within(latitude, longitude):
+        distances = haversine_many(latitude, longitude, lats, lons)
+        inside = np.nonzero(distances <= args.radius)[0]
+        return inside[np.argsort(distances[inside])]
+
+    report(f"k={args.k}, KD-tree", time_queries(lambda a, b: tree.nearest(a, b, args.k), args.queries))
+    report(f"k={args.k}, scan", time_queries(scan_nearest, args.queries))
+    report(f"{args.radius:g}km, KD-tree", time_queries(lambda a, b: tree.within(a, b, args.radius), args.queries))
+    report(f"{args.radius:g}km, scan", time_queries(scan_within, args.queries))
+
+if __name__ == '__main__':
+    main()
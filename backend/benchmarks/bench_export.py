@@ -0,0 +1,70 @@
+"""
+Check that the streamed accidents CSV export keeps memory flat
+
+Usage (from the backend directory):
+    python benchmarks/bench_export.py [--rows 1000000] [--max-rss-mb 64]
+    python benchmarks/bench_export.py --db             # export the configured database
+
+Without --db, Database.stream_query is fed synthetic rows in place of the
+unbuffered cursor, so the CSV side runs on any machine. Exits non-zero
+when peak RSS grows by more than --max-rss-mb during the export.
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from services.export_service import ExportService
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def synthetic_rows(count, seed=1):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        yield {
+            'id': i + 1,
+            'timestamp': start + timedelta(seconds=i * 30),
+            'latitude': round(28.4 + rng.random() * 0.4, 8),
+            'longitude': round(76.9 + rng.random() * 0.5, 8),
+            'accident_type': rng.choice(['collision', 'rollover', 'pedestrian']),
+            'severity': rng.choice(['low', 'medium', 'high']),
+            'description': 'Synthetic report, two vehicles, lane blocked' if i % 3 else None,
+            'status': 'reported',
+            'reported_by': f'user{i % 1000}'
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1000000, help='Synthetic rows to export')
+    parser.add_argument('--max-rss-mb', type=float, default=64.0, help='Allowed peak RSS growth')
+    parser.add_argument('--db', action='store_true', help='Export the configured database instead')
+    args = parser.parse_args()
+
+    if not args.db:
+        rows = args.rows
+        Database.stream_query = staticmethod(lambda query, params=None, batch_size=1000: synthetic_rows(rows))
+
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    chunks = size = 0
+    for chunk in ExportService.iter_accidents_csv():
+        chunks += 1
+        size += len(chunk)
+    elapsed = time.perf_counter() - started
+    growth = peak_rss_mb() - baseline
+
+    print(f"exported {size / (1024 * 1024):.1f} MB of CSV in {chunks} chunks, {elapsed:.1f}s")
+    print(f"peak RSS grew {growth:.1f} MB (ceiling {args.max_rss_mb:g} MB)")
+    if growth > args.max_rss_mb:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""
+Benchmark scalar vs vectorized haversine distance
+
+Usage (from the backend directory):
+    python benchmarks/bench_haversine.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.geolocation import haversine_distance, haversine_many, within_radius_mask
+
+def main():
+    lat, lon = 28.6139, 77.2090
+
+    for n in (10, 1_000, 100_000):
+        lats = [lat + random.uniform(-0.5, 0.5) for _ in range(n)]
+        lons = [lon + random.uniform(-0.5, 0.5) for _ in range(n)]
+        repeat = max(1, 100_000 // n)
+
+        scalar = timeit.timeit(
+            lambda: [haversine_distance(lat, lon, a, b) for a, b in zip(lats, lons)],
+            number=repeat
+        ) / repeat
+        vector = timeit.timeit(lambda: haversine_many(lat, lon, lats, lons), number=repeat) / repeat
+        mask = timeit.timeit(lambda: within_radius_mask(lat, lon, lats, lons, 10), number=repeat) / repeat
+
+        print(
+            f"n={n:>7}: scalar loop {scalar * 1e6:10.1f}us  "
+            f"haversine_many {vector * 1e6:10.1f}us  "
+            f"within_radius_mask {mask * 1e6:10.1f}us"
+        )
+
+if __name__ == '__main__':
+    main()
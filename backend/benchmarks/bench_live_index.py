@@ -0,0 +1,92 @@
+"""
+Benchmark live accident radius queries: in-memory grid vs MySQL
+
+Usage (from the backend directory):
+    python benchmarks/bench_live_index.py [--rows 1000000] [--queries 1000] [--sql]
+
+--sql also times Accident.get_all against the configured database with the
+index disabled; load the accidents table with a comparable row count first.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.accident_index import LiveAccidentIndex
+
+# Roughly the Delhi NCR bounding box
+MIN_LAT, MAX_LAT = 28.40, 28.90
+MIN_LON, MAX_LON = 76.85, 77.40
+
+def build_index(rows):
+    index = LiveAccidentIndex(window_hours=24)
+    now = datetime.now()
+    severities = ['low', 'medium', 'high']
+    types = ['collision', 'fire', 'injury', 'pedestrian', 'vehicle_breakdown', 'other']
+
+    for accident_id in range(1, rows + 1):
+        index._add({
+            'id': accident_id,
+            'user_id': 1,
+            'latitude': random.uniform(MIN_LAT, MAX_LAT),
+            'longitude': random.uniform(MIN_LON, MAX_LON),
+            'accident_type': random.choice(types),
+            'severity': random.choice(severities),
+            'status': 'reported',
+            'timestamp': now - timedelta(seconds=random.randint(0, 23 * 3600)),
+            'username': 'bench'
+        })
+    index._loaded = True
+    return index
+
+def random_filters(start_date):
+    return {
+        'latitude': random.uniform(MIN_LAT, MAX_LAT),
+        'longitude': random.uniform(MIN_LON, MAX_LON),
+        'radius': random.choice([1, 2, 5]),
+        'start_date': start_date
+    }
+
+def time_queries(fn, queries, start_date):
+    samples = []
+    for _ in range(queries):
+        filters = random_filters(start_date)
+        started = time.perf_counter()
+        fn(filters)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        'mean_ms': sum(samples) / len(samples),
+        'p50_ms': samples[len(samples) // 2],
+        'p99_ms': samples[int(len(samples) * 0.99) - 1]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--sql', action='store_true')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = build_index(args.rows)
+    print(f"Built index of {args.rows} accidents in {time.perf_counter() - started:.1f}s")
+
+    start_date = (datetime.now() - timedelta(hours=12)).strftime('%Y-%m-%d %H:%M:%S')
+    result = time_queries(lambda f: index.lookup(f, limit=20), args.queries, start_date)
+    print(f"grid index: mean {result['mean_ms']:.3f}ms  p50 {result['p50_ms']:.3f}ms  p99 {result['p99_ms']:.3f}ms")
+
+    if args.sql:
+        from models.accident import Accident
+        from services.accident_index import live_accident_index
+
+        live_accident_index.enabled = False
+        result = time_queries(lambda f: Accident.get_all(f, limit=20), args.queries, start_date)
+        print(f"mysql:      mean {result['mean_ms']:.3f}ms  p50 {result['p50_ms']:.3f}ms  p99 {result['p99_ms']:.3f}ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark nearby-alert lookups: R-tree of alert circles vs scanning every alert
+
+Usage (from the backend directory):
+    python benchmarks/bench_nearby_alerts.py [--alerts 5000] [--queries 10000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.alert_index import ActiveAlertIndex
+from utils.geolocation import haversine_many
+
+# Roughly the Delhi NCR bounding box
+MIN_LAT, MAX_LAT = 28.40, 28.90
+MIN_LON, MAX_LON = 76.85, 77.40
+
+def random_point():
+    return random.uniform(MIN_LAT, MAX_LAT), random.uniform(MIN_LON, MAX_LON)
+
+def build_alerts(count):
+    now = datetime.now()
+    alerts = []
+    for alert_id in range(1, count + 1):
+        latitude, longitude = random_point()
+        alerts.append({
+            'id': alert_id, 'latitude': latitude, 'longitude': longitude,
+            'radius': random.choice([1.0, 2.0, 5.0]), 'created_at': now,
+            'expires_at': now + timedelta(hours=24), 'message': 'bench'
+        })
+    return alerts
+
+def time_queries(fn, queries):
+    points = [random_point() for _ in range(queries)]
+    samples = []
+    for latitude, longitude in points:
+        started = time.perf_counter()
+        fn(latitude, longitude)
+        samples.append((time.perf_counter() - started) * 1e6)
+    samples.sort()
+    return {
+        'mean_us': sum(samples) / len(samples),
+        'p50_us': samples[len(samples) // 2],
+        'p99_us': samples[int(len(samples) * 0.99) - 1]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--alerts', type=int, default=5000)
+    parser.add_argument('--queries', type=int, default=10000)
+    args = parser.parse_args()
+
+    alerts = build_alerts(args.alerts)
+    index = ActiveAlertIndex(refresh_seconds=float('inf'))
+    index._loaded_at = time.monotonic()
+    index._on_created_batch(alerts)
+
+    started = time.perf_counter()
+    index.covering(*random_point())
+    print(f"Packed {args.alerts} alert circles in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    lats = [a['latitude'] for a in alerts]
+    lons = [a['longitude'] for a in alerts]
+    radii = [a['radius'] for a in alerts]
+
+    def scan(latitude, longitude):
+        distances = haversine_many(latitude, longitude, lats, lons)
+        return [alerts[i] for i, d in enumerate(distances) if d <= radii[i]]
+
+    for name, fn in [('R-tree', index.covering), ('scan', scan)]:
+        result = time_queries(fn, args.queries)
+        print(f"{name:7} mean {result['mean_us']:.1f}us  p50 {result['p50_us']:.1f}us  "
+              f"p99 {result['p99_us']:.1f}us")
+
+if __name__ == '__main__':
+    main()
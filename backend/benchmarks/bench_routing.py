@@ -0,0 +1,214 @@
+"""
+Benchmark drive-time and safe-route queries on a synthetic city-sized road graph
+
+Usage (from the backend directory):
+    python benchmarks/bench_routing.py [--size 300] [--queries 50]
+    python benchmarks/bench_routing.py --size 500 --landmarks 16 --accidents 20000
+    python benchmarks/bench_routing.py --graph data/city.npz
+
+Without --graph the city is a jittered size x size street grid (about
+150 m blocks) cut by a river with a bridge every 2 km, plus a ring road
+and a few fast arterials, so straight-line and road distance disagree.
+
+The safe-route section scatters --accidents severity-weighted accidents
+over the city the way services.safe_route scores them, then times
+risk-penalised A* between random junctions anywhere in the city.
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.geolocation import EARTH_RADIUS_KM, haversine_many
+from utils.road_graph import RoadGraph
+
+ORIGIN_LAT, ORIGIN_LON = 28.45, 76.95
+BLOCK_DEG = 0.00135
+
+def synthetic_city(size, seed=1):
+    """Build a grid city with a river, bridges, a ring road and arterials"""
+    rng = random.Random(seed)
+    lats, lons = [], []
+    for row in range(size):
+        for col in range(size):
+            lats.append(ORIGIN_LAT + row * BLOCK_DEG + rng.uniform(-0.0002, 0.0002))
+            lons.append(ORIGIN_LON + col * BLOCK_DEG + rng.uniform(-0.0002, 0.0002))
+
+    river = size // 2
+    bridge_every = 15
+    centre = (size - 1) / 2
+    ring = size * 0.35
+
+    sources, targets, speeds = [], [], []
+
+    def add(a, b, speed, oneway=False):
+        sources.append(a)
+        targets.append(b)
+        speeds.append(speed)
+        if not oneway:
+            sources.append(b)
+            targets.append(a)
+            speeds.append(speed)
+
+    for row in range(size):
+        for col in range(size):
+            node = row * size + col
+            if col + 1 < size:
+                arterial = row % 20 == 0
+                add(node, node + 1, 45 if arterial else 20, oneway=not arterial and rng.random() < 0.1)
+            if row + 1 < size:
+                # Only bridges cross the river
+                if row == river and col % bridge_every:
+                    continue
+                arterial = col % 20 == 0
+                add(node, node + size, 45 if arterial else 20, oneway=not arterial and rng.random() < 0.1)
+
+    # Ring road: link consecutive grid nodes near the ring at motorway speed
+    steps = int(2 * math.pi * ring)
+    ring_nodes = []
+    for step in range(steps):
+        angle = 2 * math.pi * step / steps
+        row = int(round(centre + ring * math.sin(angle)))
+        col = int(round(centre + ring * math.cos(angle)))
+        node = row * size + col
+        if not ring_nodes or ring_nodes[-1] != node:
+            ring_nodes.append(node)
+    for a, b in zip(ring_nodes, ring_nodes[1:] + ring_nodes[:1]):
+        add(a, b, 70)
+
+    lats, lons = np.array(lats), np.array(lons)
+    sources, targets = np.array(sources), np.array(targets)
+    lat1, lat2 = np.radians(lats[sources]), np.radians(lats[targets])
+    dlon = np.radians(lons[targets] - lons[sources])
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    lengths_km = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+    seconds = lengths_km / np.array(speeds) * 3600
+    return RoadGraph(lats, lons, sources, targets, seconds, lengths_km * 1000)
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return (
+        sum(samples) / len(samples), samples[len(samples) // 2],
+        samples[int(len(samples) * 0.9) - 1], samples[int(len(samples) * 0.99) - 1]
+    )
+
+def report(name, samples):
+    mean, p50, p90, p99 = percentiles(samples)
+    print(f"{name:42} mean {mean:7.2f}ms  p50 {p50:7.2f}ms  p90 {p90:7.2f}ms  p99 {p99:7.2f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size', type=int, default=300, help='Grid side in junctions')
+    parser.add_argument('--graph', help='Prepared .npz graph instead of the synthetic city')
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--candidates', type=int, default=10, help='Services ranked per query')
+    parser.add_argument('--radius', type=float, default=10.0, help='Candidate radius in km')
+    parser.add_argument('--landmarks', type=int, default=16, help='ALT landmarks; 0 for great-circle bounds')
+    parser.add_argument('--accidents', type=int, default=5000, help='Accidents scored onto edges')
+    parser.add_argument('--routes', type=int, default=200, help='Safe-route queries')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    graph = RoadGraph.load(args.graph) if args.graph else synthetic_city(args.size)
+    print(f"Graph: {len(graph)} nodes, {graph.edge_count} edges, built/loaded in "
+          f"{time.perf_counter() - started:.1f}s")
+
+    if args.landmarks and graph.bounds is None:
+        started = time.perf_counter()
+        graph.prepare_landmarks(args.landmarks)
+        print(f"Prepared {args.landmarks} landmarks in {time.perf_counter() - started:.1f}s")
+
+    rng = random.Random(2)
+    nodes = len(graph)
+    graph.nearest_node(float(graph.lats[0]), float(graph.lons[0]))
+
+    ranking, pairs, snaps = [], [], []
+    disagree = 0
+    for _ in range(args.queries):
+        origin = rng.randrange(nodes)
+        distances = haversine_many(graph.lats[origin], graph.lons[origin], graph.lats, graph.lons)
+        pool = np.nonzero(distances <= args.radius)[0]
+        candidates = [int(n) for n in rng.sample(pool.tolist(), min(args.candidates, len(pool)))]
+
+        started = time.perf_counter()
+        graph.nearest_node(float(graph.lats[origin]), float(graph.lons[origin]))
+        snaps.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        times = graph.travel_times(origin, candidates, reverse=True)
+        ranking.append((time.perf_counter() - started) * 1000)
+
+        by_distance = min(candidates, key=lambda n: distances[n])
+        by_time = min(times, key=times.get) if times else by_distance
+        disagree += by_distance != by_time
+
+        target = candidates[0]
+        started = time.perf_counter()
+        graph.shortest_path(origin, target)
+        pairs.append((time.perf_counter() - started) * 1000)
+
+    report('snap to junction', snaps)
+    report(f"many-to-one, {args.candidates} services within {args.radius:g}km", ranking)
+    report('bidirectional one pair', pairs)
+    print(f"Drive time picked a different closest service than straight line in "
+          f"{disagree}/{args.queries} queries")
+
+    # Risk scores as services.safe_route builds them: severity weight on
+    # every edge within 100 m, accidents clustered around a few hotspots
+    risk = [0.0] * graph.edge_count
+    hotspots = [rng.randrange(nodes) for _ in range(50)]
+    updates = []
+    graph.edges_near(float(graph.lats[0]), float(graph.lons[0]), 0.1)
+    for _ in range(args.accidents):
+        node = rng.choice(hotspots) if rng.random() < 0.6 else rng.randrange(nodes)
+        lat = float(graph.lats[node]) + rng.gauss(0, 0.003)
+        lon = float(graph.lons[node]) + rng.gauss(0, 0.003)
+        weight = rng.choice((1, 1, 2, 4))
+        started = time.perf_counter()
+        for edge in graph.edges_near(lat, lon, 0.1).tolist():
+            risk[edge] += weight
+        updates.append((time.perf_counter() - started) * 1000)
+    report(f"score one accident ({args.accidents} total)", updates)
+
+    started = time.perf_counter()
+    landmarks = graph.bounds.landmarks if graph.bounds is not None else None
+    risk_bounds = graph.landmark_bounds(args.landmarks or 16, penalties=risk, penalty_weight=60.0, landmarks=landmarks)
+    print(f"Risk landmark bounds built in {time.perf_counter() - started:.1f}s")
+
+    fastest, safe, short = [], [], []
+    avoided = slower = 0.0
+    for _ in range(args.routes):
+        origin, target = rng.randrange(nodes), rng.randrange(nodes)
+
+        started = time.perf_counter()
+        _, fast_path = graph.astar(origin, target)
+        fastest.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        _, safe_path = graph.astar(origin, target, risk, 60.0, bounds=risk_bounds)
+        safe.append((time.perf_counter() - started) * 1000)
+        trip_km = haversine_many(graph.lats[origin], graph.lons[origin], graph.lats[[target]], graph.lons[[target]])[0]
+        if trip_km <= 20:
+            short.append(safe[-1])
+
+        fast_risk = sum(risk[e] for e in fast_path)
+        if fast_risk:
+            avoided += 1 - sum(risk[e] for e in safe_path) / fast_risk
+        fast_seconds = sum(graph.seconds[e] for e in fast_path)
+        if fast_seconds:
+            slower += sum(graph.seconds[e] for e in safe_path) / fast_seconds - 1
+
+    report('A* fastest route, random pair', fastest)
+    report('A* safe route (60s per accident)', safe)
+    if short:
+        report(f"  of which trips under 20km ({len(short)})", short)
+    print(f"Safe routes carried {avoided / args.routes:.0%} less risk for "
+          f"{slower / args.routes:.1%} more travel time on average")
+
+if __name__ == '__main__':
+    main()
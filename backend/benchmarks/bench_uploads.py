@@ -0,0 +1,79 @@
+"""
+Benchmark upload serving: send_from_directory vs send_upload
+
+Runs both routes through the Flask test client against a generated image
+and reports requests per second and bytes sent for a full download, a
+revalidation with If-None-Match and a 64KB range request. The X-Accel
+mode shows the cost left in Flask when a proxy copies the bytes.
+
+Usage (from the backend directory):
+    python benchmarks/bench_uploads.py --size-kb 512 --requests 2000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, send_from_directory
+from utils.file_handler import send_upload
+
+def make_app(upload_folder, sendfile=''):
+    app = Flask(__name__)
+    app.config.update(UPLOAD_FOLDER=upload_folder, UPLOADS_SENDFILE=sendfile,
+                      UPLOADS_ACCEL_PREFIX='/_protected_uploads/', UPLOADS_MAX_AGE=31536000)
+
+    @app.route('/old/<path:filename>')
+    def old_route(filename):
+        return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+
+    @app.route('/new/<path:filename>')
+    def new_route(filename):
+        return send_upload(filename)
+
+    return app
+
+def run(client, url, requests, headers=None):
+    sent = 0
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = client.get(url, headers=headers or {})
+        sent += len(response.get_data())
+        response.close()
+    elapsed = time.perf_counter() - start
+    return requests / elapsed, sent / requests, response.status_code
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size-kb', type=int, default=512)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    upload_folder = tempfile.mkdtemp()
+    name = 'ab' * 32 + '.jpg'
+    with open(os.path.join(upload_folder, name), 'wb') as f:
+        f.write(os.urandom(args.size_kb * 1024))
+
+    for label, sendfile in (('flask', ''), ('x-accel', 'x-accel')):
+        client = make_app(upload_folder, sendfile).test_client()
+        etag = client.get(f'/new/{name}').headers['ETag']
+        old_etag = client.get(f'/old/{name}').headers['ETag']
+
+        cases = [
+            ('full GET', {}, {}),
+            ('If-None-Match', {'If-None-Match': old_etag}, {'If-None-Match': etag}),
+            ('Range 64KB', {'Range': 'bytes=0-65535'}, {'Range': 'bytes=0-65535'}),
+        ]
+        print(f"--- send_upload mode: {label}")
+        for case, old_headers, new_headers in cases:
+            old_rps, old_bytes, old_status = run(client, f'/old/{name}', args.requests, old_headers)
+            new_rps, new_bytes, new_status = run(client, f'/new/{name}', args.requests, new_headers)
+            print(
+                f"{case:>14}: send_from_directory {old_rps:8.0f} req/s {old_bytes:9.0f} B ({old_status})  "
+                f"send_upload {new_rps:8.0f} req/s {new_bytes:9.0f} B ({new_status})"
+            )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark accident-prone zone clustering
+
+Generates synthetic hotspots plus background noise, then compares the old
+ROUND(latitude, 2)/ROUND(longitude, 2) grouping (emulated in NumPy) with
+the DBSCAN zone builder: run time and how many zones each hotspot is
+split across.
+
+Usage (from the backend directory):
+    python benchmarks/bench_zones.py --points 1000000 --hotspots 2000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.zone_service import build_zones
+from utils.clustering import dbscan
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--points', type=int, default=1_000_000)
+    parser.add_argument('--hotspots', type=int, default=2000)
+    parser.add_argument('--hotspot-share', type=float, default=0.7)
+    parser.add_argument('--eps-km', type=float, default=0.25)
+    parser.add_argument('--min-samples', type=int, default=10)
+    parser.add_argument('--min-accidents', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    low, high = [10.5, 76.5], [11.5, 77.5]
+    centers = rng.uniform(low, high, (args.hotspots, 2))
+    clustered = int(args.points * args.hotspot_share)
+    owner = rng.integers(args.hotspots, size=clustered)
+    points = np.vstack([
+        centers[owner] + rng.normal(0, 0.001, (clustered, 2)),
+        rng.uniform(low, high, (args.points - clustered, 2))
+    ])
+    lats, lons = points[:, 0], points[:, 1]
+    severities = rng.choice(['low', 'medium', 'high'], size=args.points, p=[0.5, 0.35, 0.15])
+    timestamps = [datetime(2024, 1, 1)] * args.points
+
+    start = time.perf_counter()
+    cells, cell_ids, cell_counts = np.unique(
+        np.stack([np.round(lats, 2), np.round(lons, 2)], axis=1),
+        axis=0, return_inverse=True, return_counts=True
+    )
+    cell_ids = cell_ids.ravel()
+    grid_time = time.perf_counter() - start
+    prone_cells = cell_counts >= args.min_accidents
+
+    start = time.perf_counter()
+    labels = dbscan(lats, lons, args.eps_km, args.min_samples)
+    dbscan_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    zones = build_zones(lats, lons, severities, timestamps, args.eps_km, args.min_samples, args.min_accidents)
+    build_time = time.perf_counter() - start
+
+    # How many zones does each hotspot end up split across?
+    grid_split = []
+    dbscan_split = []
+    for h in range(args.hotspots):
+        members = np.nonzero(owner == h)[0]
+        ids = cell_ids[members]
+        grid_split.append(len(np.unique(ids[prone_cells[ids]])))
+        member_labels = labels[members]
+        dbscan_split.append(len(np.unique(member_labels[member_labels >= 0])))
+
+    print(f"points={args.points} hotspots={args.hotspots} eps={args.eps_km}km min_samples={args.min_samples}")
+    print(f"ROUND grid:  {grid_time:6.2f}s  {int(prone_cells.sum()):>7} zones  "
+          f"{np.mean(np.array(grid_split) > 1) * 100:5.1f}% of hotspots split")
+    print(f"DBSCAN:      {dbscan_time:6.2f}s  {int(labels.max()) + 1:>7} clusters  "
+          f"{np.mean(np.array(dbscan_split) > 1) * 100:5.1f}% of hotspots split")
+    print(f"build_zones: {build_time:6.2f}s  {len(zones):>7} zones (hulls, scores, centroids included)")
+
+if __name__ == '__main__':
+    main()
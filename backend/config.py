@@ -15,6 +15,13 @@ class Config:
     DB_PASSWORD = os.getenv('DB_PASSWORD', '')
     DB_NAME = os.getenv('DB_NAME', 'safe_route')
     
+    # Database connection pool
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))  # connector caps this at 32
+    DB_POOL_MAX_OVERFLOW = int(os.getenv('DB_POOL_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))  # seconds to wait for a connection
+    DB_POOL_MAX_WAITERS = int(os.getenv('DB_POOL_MAX_WAITERS', 50))
+    DB_POOL_RESET_SESSION = os.getenv('DB_POOL_RESET_SESSION', 'True').lower() == 'true'
+    
     # JWT
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(seconds=int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', 3600)))
@@ -28,6 +35,22 @@ class Config:
     MAX_FILE_SIZE = int(os.getenv('MAX_FILE_SIZE', 5242880))  # 5MB default
     ALLOWED_EXTENSIONS = set(os.getenv('ALLOWED_EXTENSIONS', 'jpg,jpeg,png,gif').split(','))
     
+    # Serving uploads: stored names never change content, so they can be
+    # cached for a year. UPLOADS_SENDFILE hands the byte copying to a front
+    # proxy: '' (Flask sends the file), 'x-accel' (nginx) or 'x-sendfile'
+    UPLOADS_MAX_AGE = int(os.getenv('UPLOADS_MAX_AGE', 31536000))
+    UPLOADS_SENDFILE = os.getenv('UPLOADS_SENDFILE', '')
+    UPLOADS_ACCEL_PREFIX = os.getenv('UPLOADS_ACCEL_PREFIX', '/_protected_uploads/')
+    USE_X_SENDFILE = UPLOADS_SENDFILE == 'x-sendfile'
+    
+    # Background image processing
+    IMAGE_PIPELINE_ENABLED = os.getenv('IMAGE_PIPELINE_ENABLED', 'True').lower() == 'true'
+    IMAGE_PIPELINE_WORKERS = int(os.getenv('IMAGE_PIPELINE_WORKERS', 2))
+    IMAGE_PIPELINE_MAX_ATTEMPTS = int(os.getenv('IMAGE_PIPELINE_MAX_ATTEMPTS', 3))
+    IMAGE_PIPELINE_POLL_SECONDS = int(os.getenv('IMAGE_PIPELINE_POLL_SECONDS', 5))
+    IMAGE_PIPELINE_STALE_SECONDS = int(os.getenv('IMAGE_PIPELINE_STALE_SECONDS', 300))
+    IMAGE_DERIVATIVE_FORMATS = os.getenv('IMAGE_DERIVATIVE_FORMATS', 'webp,jpeg').split(',')
+    
     # Rate Limiting
     RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
     RATE_LIMIT_DEFAULT = os.getenv('RATE_LIMIT_DEFAULT', '100 per hour')
@@ -40,6 +63,94 @@ class Config:
     DEFAULT_RADIUS_KM = 10  # Default search radius in kilometers
     MAX_RADIUS_KM = 100
     
+    # Live accident index (in-memory grid for recent radius queries)
+    LIVE_INDEX_ENABLED = os.getenv('LIVE_INDEX_ENABLED', 'True').lower() == 'true'
+    LIVE_INDEX_WINDOW_HOURS = int(os.getenv('LIVE_INDEX_WINDOW_HOURS', 24))
+    LIVE_INDEX_CELL_DEG = float(os.getenv('LIVE_INDEX_CELL_DEG', 0.01))  # ~1km cells
+    
+    # Duplicate detection and cross-user incident merging
+    DUPLICATE_INDEX_ENABLED = os.getenv('DUPLICATE_INDEX_ENABLED', 'True').lower() == 'true'
+    DUPLICATE_WINDOW_MINUTES = int(os.getenv('DUPLICATE_WINDOW_MINUTES', 30))
+    DUPLICATE_OFFSET_DEG = float(os.getenv('DUPLICATE_OFFSET_DEG', 0.01))  # ~1km, same user
+    INCIDENT_MERGE_ENABLED = os.getenv('INCIDENT_MERGE_ENABLED', 'True').lower() == 'true'
+    INCIDENT_MERGE_RADIUS_KM = float(os.getenv('INCIDENT_MERGE_RADIUS_KM', 0.2))  # within DUPLICATE_OFFSET_DEG
+    
+    # Response cache for public read endpoints
+    CACHE_ENABLED = os.getenv('CACHE_ENABLED', 'True').lower() == 'true'
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')  # memory or redis
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    
+    # Analytics rollups
+    ROLLUPS_ENABLED = os.getenv('ROLLUPS_ENABLED', 'True').lower() == 'true'
+    
+    # Accident-prone zones (DBSCAN over recent accidents)
+    ZONES_ENABLED = os.getenv('ZONES_ENABLED', 'True').lower() == 'true'
+    ZONES_WINDOW_DAYS = int(os.getenv('ZONES_WINDOW_DAYS', 90))
+    ZONES_EPS_KM = float(os.getenv('ZONES_EPS_KM', 0.25))
+    ZONES_MIN_SAMPLES = int(os.getenv('ZONES_MIN_SAMPLES', 3))
+    ZONES_REFRESH_MINUTES = int(os.getenv('ZONES_REFRESH_MINUTES', 15))  # 0 disables the thread
+    
+    # Heatmap tile pyramid. Windows are in calendar days including today;
+    # requests deeper than the max zoom are cut from max-zoom tiles
+    HEATMAP_TILES_ENABLED = os.getenv('HEATMAP_TILES_ENABLED', 'True').lower() == 'true'
+    HEATMAP_TILE_WINDOWS = [int(d) for d in os.getenv('HEATMAP_TILE_WINDOWS', '1,7,30').split(',')]
+    HEATMAP_TILE_MAX_ZOOM = int(os.getenv('HEATMAP_TILE_MAX_ZOOM', 14))
+    HEATMAP_TILE_CELLS = int(os.getenv('HEATMAP_TILE_CELLS', 64))  # cells per tile side
+    
+    # Vector tiles (/tiles/<layer>/<z>/<x>/<y>.mvt). Zooms up to the cluster
+    # max zoom return clusters; deeper zooms return every point
+    VECTOR_TILES_ENABLED = os.getenv('VECTOR_TILES_ENABLED', 'True').lower() == 'true'
+    VECTOR_TILE_CLUSTER_MAX_ZOOM = int(os.getenv('VECTOR_TILE_CLUSTER_MAX_ZOOM', 12))
+    VECTOR_TILE_CLUSTER_CELLS = int(os.getenv('VECTOR_TILE_CLUSTER_CELLS', 16))  # cluster cells per tile side
+    VECTOR_TILE_ACCIDENT_DAYS = int(os.getenv('VECTOR_TILE_ACCIDENT_DAYS', 30))
+    VECTOR_TILE_TTL = int(os.getenv('VECTOR_TILE_TTL', 60))
+    VECTOR_TILE_CACHE_SIZE = int(os.getenv('VECTOR_TILE_CACHE_SIZE', 4096))  # tiles per layer
+    VECTOR_TILE_RATE_LIMIT = os.getenv('VECTOR_TILE_RATE_LIMIT', '3000 per hour')
+    
+    # Server-sent alert streams (/api/alerts/stream). Idle streams hold a
+    # connection each, so serve them from an async worker (see README)
+    ALERT_STREAM_ENABLED = os.getenv('ALERT_STREAM_ENABLED', 'True').lower() == 'true'
+    ALERT_STREAM_MAX_SUBSCRIBERS = int(os.getenv('ALERT_STREAM_MAX_SUBSCRIBERS', 10000))
+    ALERT_STREAM_QUEUE_SIZE = int(os.getenv('ALERT_STREAM_QUEUE_SIZE', 100))  # per stream
+    ALERT_STREAM_HEARTBEAT_SECONDS = int(os.getenv('ALERT_STREAM_HEARTBEAT_SECONDS', 20))
+    
+    # In-memory R-tree answering /api/alerts/nearby
+    ALERT_INDEX_ENABLED = os.getenv('ALERT_INDEX_ENABLED', 'True').lower() == 'true'
+    ALERT_INDEX_REFRESH_SECONDS = int(os.getenv('ALERT_INDEX_REFRESH_SECONDS', 30))  # full reload from MySQL
+    
+    # In-memory KD-trees answering /api/emergency lookups
+    EMERGENCY_INDEX_ENABLED = os.getenv('EMERGENCY_INDEX_ENABLED', 'True').lower() == 'true'
+    EMERGENCY_INDEX_REFRESH_SECONDS = int(os.getenv('EMERGENCY_INDEX_REFRESH_SECONDS', 300))  # full reload from MySQL
+    EMERGENCY_NEAREST_MAX_K = int(os.getenv('EMERGENCY_NEAREST_MAX_K', 50))
+    
+    # Offline road graph for drive-time estimates (build with flask build-road-graph)
+    ROAD_GRAPH_PATH = os.getenv('ROAD_GRAPH_PATH', '')
+    ROUTING_ACCESS_SPEED_KMH = float(os.getenv('ROUTING_ACCESS_SPEED_KMH', 15))  # to/from the nearest junction
+    ROUTING_MAX_SECONDS = int(os.getenv('ROUTING_MAX_SECONDS', 3600))  # search cut-off
+    
+    # Risk-aware routes over the road graph
+    ROUTE_RISK_ENABLED = os.getenv('ROUTE_RISK_ENABLED', 'True').lower() == 'true'
+    ROUTE_RISK_WINDOW_DAYS = int(os.getenv('ROUTE_RISK_WINDOW_DAYS', 90))  # accidents counted toward risk
+    ROUTE_RISK_RADIUS_M = float(os.getenv('ROUTE_RISK_RADIUS_M', 100))  # roads an accident marks as risky
+    ROUTE_RISK_PENALTY_SECONDS = float(os.getenv('ROUTE_RISK_PENALTY_SECONDS', 60))  # detour per accident at safety 1
+    ROUTE_RISK_BOUNDS_MINUTES = int(os.getenv('ROUTE_RISK_BOUNDS_MINUTES', 60))  # landmark bounds rebuild
+    ROUTE_MAX_SAFETY = float(os.getenv('ROUTE_MAX_SAFETY', 10))
+    
+    # Alert notifications for users inside an alert's radius
+    NOTIFICATIONS_ENABLED = os.getenv('NOTIFICATIONS_ENABLED', 'True').lower() == 'true'
+    NOTIFICATION_BATCH_SIZE = int(os.getenv('NOTIFICATION_BATCH_SIZE', 1000))  # rows per INSERT
+    USER_LOCATION_MAX_AGE_HOURS = int(os.getenv('USER_LOCATION_MAX_AGE_HOURS', 72))
+    
+    # Alert expiry and archival
+    ALERT_EXPIRY_ENABLED = os.getenv('ALERT_EXPIRY_ENABLED', 'True').lower() == 'true'
+    ALERT_EXPIRY_SYNC_SECONDS = int(os.getenv('ALERT_EXPIRY_SYNC_SECONDS', 60))  # pick up other processes' alerts
+    ALERT_EXPIRY_BATCH_SIZE = int(os.getenv('ALERT_EXPIRY_BATCH_SIZE', 1000))  # IDs per UPDATE
+    ALERT_ARCHIVE_AFTER_DAYS = int(os.getenv('ALERT_ARCHIVE_AFTER_DAYS', 7))  # 0 disables archival
+    ALERT_ARCHIVE_INTERVAL_MINUTES = int(os.getenv('ALERT_ARCHIVE_INTERVAL_MINUTES', 60))
+    
+    # Bulk ingestion
+    INGEST_MAX_BATCH = int(os.getenv('INGEST_MAX_BATCH', 10000))
+    
     # Alert Settings
     HIGH_SEVERITY_ALERT_RADIUS = 5  # km
     ACCIDENT_PRONE_THRESHOLD = 5  # Number of accidents to mark zone as prone
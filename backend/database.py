@@ -1,45 +1,275 @@
 import mysql.connector
 from mysql.connector import Error, pooling
+from mysql.connector.errors import PoolError
 from config import Config
 import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
 
+# Statements execute_many can return IDs for: no IGNORE, SELECT or ON DUPLICATE KEY
+RE_INSERT_VALUES = re.compile(r'\s*INSERT\s+INTO\s+\w+\s*\([^)]*\)\s*VALUES\s*\((?:(?!ON\s+DUPLICATE).)*$', re.I | re.S)
+
+class PoolMetrics:
+    """Thread-safe counters for connection pool usage"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        """Reset all counters"""
+        with self._lock:
+            self.checkouts = 0
+            self.overflow_checkouts = 0
+            self.in_use = 0
+            self.waiting = 0
+            self.exhaustion_events = 0
+            self.timeouts = 0
+            self.rejected = 0
+            self.wait_time_total = 0.0
+            self.wait_time_max = 0.0
+            self.checkout_time_total = 0.0
+            self.checkout_time_max = 0.0
+            self.released = 0
+    
+    def enter_wait(self, max_waiters):
+        """Register a waiter, returning False if the wait queue is full"""
+        with self._lock:
+            self.exhaustion_events += 1
+            if self.waiting >= max_waiters:
+                self.rejected += 1
+                return False
+            self.waiting += 1
+            return True
+    
+    def leave_wait(self, timed_out):
+        with self._lock:
+            self.waiting -= 1
+            if timed_out:
+                self.timeouts += 1
+    
+    def record_checkout(self, wait_seconds, overflow):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            if overflow:
+                self.overflow_checkouts += 1
+            self.wait_time_total += wait_seconds
+            self.wait_time_max = max(self.wait_time_max, wait_seconds)
+    
+    def record_release(self, held_seconds):
+        with self._lock:
+            self.in_use -= 1
+            self.released += 1
+            self.checkout_time_total += held_seconds
+            self.checkout_time_max = max(self.checkout_time_max, held_seconds)
+    
+    def snapshot(self):
+        """Get a copy of the current metrics"""
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'overflow_checkouts': self.overflow_checkouts,
+                'in_use': self.in_use,
+                'waiting': self.waiting,
+                'exhaustion_events': self.exhaustion_events,
+                'timeouts': self.timeouts,
+                'rejected': self.rejected,
+                'avg_wait_ms': round(self.wait_time_total / self.checkouts * 1000, 3) if self.checkouts else 0,
+                'max_wait_ms': round(self.wait_time_max * 1000, 3),
+                'avg_checkout_ms': round(self.checkout_time_total / self.released * 1000, 3) if self.released else 0,
+                'max_checkout_ms': round(self.checkout_time_max * 1000, 3)
+            }
+
+class _TrackedConnection:
+    """
+    Connection wrapper that gives the pool slot back on close()
+    
+    Overflow connections are real connections outside the MySQL pool and
+    are closed for good; pooled ones return to the pool as before.
+    """
+    
+    def __init__(self, connection, overflow, on_release):
+        self._connection = connection
+        self._overflow = overflow
+        self._on_release = on_release
+        self._checked_out_at = time.monotonic()
+        self._closed = False
+    
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+    
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._connection.close()
+        finally:
+            self._on_release(time.monotonic() - self._checked_out_at)
+    
+    def discard(self):
+        """
+        Drop the server connection, then give the slot back
+        
+        For connections left mid-result: mysql-connector refuses to reset
+        or reuse them ("Unread result found"), so the socket is closed and
+        the pool reconnects it on its next checkout.
+        """
+        try:
+            self._connection.disconnect()
+        except Error:
+            pass
+        try:
+            self.close()
+        except Error:
+            pass
+
 class Database:
     """Database connection manager with connection pooling"""
     
     _connection_pool = None
+    _slots = None
+    metrics = PoolMetrics()
+    
+    @classmethod
+    def _connect_args(cls):
+        return {
+            'host': Config.DB_HOST,
+            'port': Config.DB_PORT,
+            'database': Config.DB_NAME,
+            'user': Config.DB_USER,
+            'password': Config.DB_PASSWORD
+        }
     
     @classmethod
     def init_pool(cls):
         """Initialize connection pool"""
+        pool_size = min(Config.DB_POOL_SIZE, pooling.CNX_POOL_MAXSIZE)
+        if pool_size < Config.DB_POOL_SIZE:
+            logger.warning(
+                f"DB_POOL_SIZE {Config.DB_POOL_SIZE} exceeds the connector limit, "
+                f"using {pool_size}; raise DB_POOL_MAX_OVERFLOW instead"
+            )
+        
         try:
             cls._connection_pool = pooling.MySQLConnectionPool(
                 pool_name="safe_route_pool",
-                pool_size=5,
-                pool_reset_session=True,
-                host=Config.DB_HOST,
-                port=Config.DB_PORT,
-                database=Config.DB_NAME,
-                user=Config.DB_USER,
-                password=Config.DB_PASSWORD
+                pool_size=pool_size,
+                pool_reset_session=Config.DB_POOL_RESET_SESSION,
+                **cls._connect_args()
             )
+            cls._slots = threading.BoundedSemaphore(pool_size + Config.DB_POOL_MAX_OVERFLOW)
             logger.info("Database connection pool initialized")
         except Error as e:
             logger.error(f"Error creating connection pool: {e}")
             raise
     
+    @classmethod
+    def _acquire_slot(cls):
+        """
+        Reserve capacity for one connection, waiting up to DB_POOL_TIMEOUT
+        
+        Returns:
+            Seconds spent waiting
+        """
+        if cls._slots.acquire(blocking=False):
+            return 0.0
+        
+        if not cls.metrics.enter_wait(Config.DB_POOL_MAX_WAITERS):
+            raise PoolError("Connection pool exhausted and wait queue is full")
+        
+        started = time.monotonic()
+        acquired = False
+        try:
+            acquired = cls._slots.acquire(timeout=Config.DB_POOL_TIMEOUT)
+        finally:
+            cls.metrics.leave_wait(timed_out=not acquired)
+        
+        if not acquired:
+            raise PoolError(f"Timed out after {Config.DB_POOL_TIMEOUT}s waiting for a database connection")
+        
+        return time.monotonic() - started
+    
+    @classmethod
+    def _release_slot(cls, held_seconds):
+        cls._slots.release()
+        cls.metrics.record_release(held_seconds)
+    
     @classmethod
     def get_connection(cls):
-        """Get a connection from the pool"""
+        """
+        Get a connection from the pool
+        
+        Blocks for up to DB_POOL_TIMEOUT seconds when every pooled and
+        overflow connection is checked out. Callers must close() the
+        connection to hand the slot back.
+        """
         if cls._connection_pool is None:
             cls.init_pool()
         
+        wait_seconds = cls._acquire_slot()
+        
         try:
-            return cls._connection_pool.get_connection()
+            try:
+                connection = cls._connection_pool.get_connection()
+                overflow = False
+            except PoolError:
+                # All pooled connections are busy but we hold an overflow slot
+                connection = mysql.connector.connect(**cls._connect_args())
+                overflow = True
         except Error as e:
+            cls._slots.release()
             logger.error(f"Error getting connection from pool: {e}")
             raise
+        
+        cls.metrics.record_checkout(wait_seconds, overflow)
+        return _TrackedConnection(connection, overflow, cls._release_slot)
+    
+    @classmethod
+    def pool_stats(cls):
+        """Get pool configuration and usage metrics"""
+        stats = cls.metrics.snapshot()
+        stats.update({
+            'pool_size': cls._connection_pool.pool_size if cls._connection_pool else 0,
+            'max_overflow': Config.DB_POOL_MAX_OVERFLOW,
+            'timeout_seconds': Config.DB_POOL_TIMEOUT,
+            'max_waiters': Config.DB_POOL_MAX_WAITERS
+        })
+        return stats
+    
+    @classmethod
+    @contextmanager
+    def transaction(cls):
+        """
+        Run several statements on one connection as a single transaction
+        
+        Yields a dictionary cursor; commits when the block exits normally
+        and rolls back if it raises. Use SELECT ... FOR UPDATE inside it
+        for read-then-write updates.
+        """
+        connection = cls.get_connection()
+        cursor = None
+        try:
+            cursor = connection.cursor(dictionary=True)
+            if not connection.in_transaction:
+                connection.start_transaction()
+            yield cursor
+            connection.commit()
+        except Exception:
+            try:
+                connection.rollback()
+            except Error:
+                pass
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+            connection.close()
     
     @classmethod
     def execute_query(cls, query, params=None, fetch_one=False, fetch_all=False, commit=False):
@@ -89,8 +319,80 @@ class Database:
                 connection.close()
     
     @classmethod
-    def execute_many(cls, query, params_list):
-        """Execute multiple queries in a transaction"""
+    def stream_query(cls, query, params=None, batch_size=1000):
+        """
+        Stream rows of a query without loading the full result
+        
+        Uses an unbuffered cursor so rows are pulled from the server in
+        batches as the caller iterates. The connection stays checked out
+        until the generator is exhausted or closed. A generator closed
+        early (e.g. an aborted download) leaves rows unread, so its
+        connection is discarded rather than returned to the pool.
+        
+        Args:
+            query: SQL query string
+            params: Query parameters (tuple or dict)
+            batch_size: Rows fetched from the server per round
+            
+        Yields:
+            Row dicts
+        """
+        connection = None
+        cursor = None
+        exhausted = False
+        
+        try:
+            connection = cls.get_connection()
+            cursor = connection.cursor(dictionary=True, buffered=False)
+            cursor.execute(query, params or ())
+            
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+            exhausted = True
+                
+        except Error as e:
+            logger.error(f"Database error in stream_query: {e}")
+            raise
+        finally:
+            if cursor:
+                try:
+                    cursor.close()
+                except Error:
+                    pass
+            if connection:
+                if exhausted:
+                    connection.close()
+                else:
+                    connection.discard()
+    
+    @classmethod
+    def execute_many(cls, query, params_list, return_ids=False):
+        """
+        Execute multiple queries in a transaction
+        
+        Args:
+            query: SQL query string
+            params_list: List of parameter tuples
+            return_ids: For a plain INSERT ... VALUES, return the new row
+                        IDs. The connector rewrites it into one multi-row
+                        INSERT; InnoDB gives such a statement consecutive
+                        IDs starting at lastrowid in every
+                        innodb_autoinc_lock_mode, provided
+                        auto_increment_increment is 1 and every row is
+                        inserted. Both are checked before committing.
+            
+        Returns:
+            Affected row count, or list of inserted IDs with return_ids
+            
+        Raises:
+            ValueError: With return_ids, if the IDs cannot be derived
+        """
+        if return_ids and not RE_INSERT_VALUES.match(query):
+            raise ValueError("return_ids needs a plain INSERT ... VALUES statement")
+        
         connection = None
         cursor = None
         
@@ -99,9 +401,23 @@ class Database:
             cursor = connection.cursor()
             
             cursor.executemany(query, params_list)
+            rowcount, first_id = cursor.rowcount, cursor.lastrowid
+            
+            if return_ids:
+                cursor.execute("SELECT @@auto_increment_increment")
+                (step,) = cursor.fetchone()
+                if int(step) != 1 or rowcount != len(params_list):
+                    connection.rollback()
+                    raise ValueError(
+                        f"Cannot derive IDs for {len(params_list)} rows "
+                        f"(inserted {rowcount}, auto_increment_increment {step})"
+                    )
+            
             connection.commit()
             
-            return cursor.rowcount
+            if return_ids:
+                return list(range(first_id, first_id + rowcount))
+            return rowcount
             
         except Error as e:
             if connection:
@@ -1,13 +1,19 @@
 """Accident model"""
 from database import Database
+from utils import events
 from utils.geolocation import get_bounding_box
+from services.accident_index import live_accident_index
+from services.duplicate_index import duplicate_index
 from datetime import datetime
 
+SEVERITY_RANK = {'low': 0, 'medium': 1, 'high': 2}
+
 class Accident:
     """Accident report model"""
     
     @staticmethod
-    def create(user_id, latitude, longitude, accident_type, severity, description=None, image_path=None):
+    def create(user_id, latitude, longitude, accident_type, severity, description=None, image_path=None,
+               image_status=None):
         """
         Create a new accident report
         
@@ -19,26 +25,73 @@ class Accident:
             severity: Severity level
             description: Optional description
             image_path: Optional image path
+            image_status: Image processing state; defaults to 'ready' when
+                          an image is given and 'none' otherwise
             
         Returns:
             Accident ID if successful, None otherwise
         """
+        if image_status is None:
+            image_status = 'ready' if image_path else 'none'
+        
         query = """
             INSERT INTO accidents 
-            (user_id, latitude, longitude, accident_type, severity, description, image_path)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            (user_id, latitude, longitude, accident_type, severity, description, image_path, image_status)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
         """
         
         try:
             accident_id = Database.execute_query(
                 query,
-                (user_id, latitude, longitude, accident_type, severity, description, image_path),
+                (user_id, latitude, longitude, accident_type, severity, description, image_path, image_status),
                 commit=True
             )
-            return accident_id
         except Exception as e:
             print(f"Error creating accident: {e}")
             return None
+        
+        if events.has_listeners('accident.created'):
+            events.emit('accident.created', accident=Accident.find_by_id(accident_id))
+        
+        return accident_id
+    
+    @staticmethod
+    def create_many(user_id, reports, username=None):
+        """
+        Insert many accident reports with one multi-row INSERT
+        
+        Args:
+            user_id: ID of the submitting user
+            reports: List of dicts with latitude, longitude, accident_type,
+                     severity, description and timestamp
+            username: Submitter's username, copied onto the emitted rows
+            
+        Returns:
+            List of accident IDs in the same order as reports
+        """
+        if not reports:
+            return []
+        
+        query = """
+            INSERT INTO accidents 
+            (user_id, latitude, longitude, accident_type, severity, description, timestamp)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """
+        ids = Database.execute_many(query, [
+            (user_id, r['latitude'], r['longitude'], r['accident_type'], r['severity'],
+             r['description'], r['timestamp'])
+            for r in reports
+        ], return_ids=True)
+        
+        if events.has_listeners('accident.created_batch'):
+            accidents = [
+                dict(r, id=accident_id, user_id=user_id, username=username, image_path=None,
+                     image_status='none', status='reported')
+                for accident_id, r in zip(ids, reports)
+            ]
+            events.emit('accident.created_batch', accidents=accidents)
+        
+        return ids
     
     @staticmethod
     def find_by_id(accident_id):
@@ -52,7 +105,7 @@ class Accident:
         return Database.execute_query(query, (accident_id,), fetch_one=True)
     
     @staticmethod
-    def get_all(filters=None, limit=100, offset=0):
+    def get_all(filters=None, limit=100, offset=0, after=None):
         """
         Get all accidents with optional filters
         
@@ -61,10 +114,17 @@ class Accident:
                     start_date, end_date, latitude, longitude, radius
             limit: Maximum number of results
             offset: Offset for pagination
+            after: Optional (timestamp, id) keyset position; when given,
+                   returns rows strictly after it and ignores offset
             
         Returns:
             List of accidents
         """
+        # Recent radius queries are served from the in-memory index
+        accidents = live_accident_index.lookup(filters, limit, offset, after)
+        if accidents is not None:
+            return accidents
+        
         query = """
             SELECT a.*, u.username
             FROM accidents a
@@ -109,8 +169,16 @@ class Accident:
                             AND a.longitude BETWEEN %s AND %s"""
                 params.extend([min_lat, max_lat, min_lon, max_lon])
         
-        query += " ORDER BY a.timestamp DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
+        if after is not None:
+            # Keyset pagination over (timestamp, id) walks idx_timestamp
+            # directly instead of skipping OFFSET rows
+            query += " AND (a.timestamp < %s OR (a.timestamp = %s AND a.id < %s))"
+            params.extend([after[0], after[0], after[1]])
+            query += " ORDER BY a.timestamp DESC, a.id DESC LIMIT %s"
+            params.append(limit)
+        else:
+            query += " ORDER BY a.timestamp DESC LIMIT %s OFFSET %s"
+            params.extend([limit, offset])
         
         return Database.execute_query(query, tuple(params), fetch_all=True) or []
     
@@ -150,25 +218,154 @@ class Accident:
         query = "UPDATE accidents SET status = %s WHERE id = %s"
         try:
             Database.execute_query(query, (status, accident_id), commit=True)
-            return True
         except Exception:
             return False
+        
+        events.emit('accident.updated', accident_id=accident_id, fields={'status': status})
+        return True
+    
+    @staticmethod
+    def raise_severity(accident_id, severity):
+        """
+        Raise an accident's severity, never lowering it
+        
+        The row is locked while it is compared, so concurrent reports of
+        the same incident raise it once. accident.updated carries the
+        updated row and the previous severity for listeners that count
+        accidents by severity.
+        
+        Returns:
+            True if the severity changed
+        """
+        try:
+            with Database.transaction() as cursor:
+                cursor.execute("SELECT * FROM accidents WHERE id = %s FOR UPDATE", (accident_id,))
+                accident = cursor.fetchone()
+                if not accident or SEVERITY_RANK[accident['severity']] >= SEVERITY_RANK[severity]:
+                    return False
+                cursor.execute("UPDATE accidents SET severity = %s WHERE id = %s", (severity, accident_id))
+        except Exception as e:
+            print(f"Error raising severity: {e}")
+            return False
+        
+        events.emit(
+            'accident.updated', accident_id=accident_id, fields={'severity': severity},
+            accident=dict(accident, severity=severity), previous={'severity': accident['severity']}
+        )
+        return True
+    
+    @staticmethod
+    def update_image_status(accident_id, image_status):
+        """Update the image processing state of an accident"""
+        query = "UPDATE accidents SET image_status = %s WHERE id = %s"
+        try:
+            Database.execute_query(query, (image_status, accident_id), commit=True)
+        except Exception:
+            return False
+        
+        events.emit('accident.updated', accident_id=accident_id, fields={'image_status': image_status})
+        return True
+    
+    @staticmethod
+    def update_image_path(accident_id, image_path):
+        """Point an accident at a different stored image"""
+        query = "UPDATE accidents SET image_path = %s WHERE id = %s"
+        try:
+            Database.execute_query(query, (image_path, accident_id), commit=True)
+        except Exception:
+            return False
+        
+        events.emit('accident.updated', accident_id=accident_id, fields={'image_path': image_path})
+        return True
     
     @staticmethod
     def delete(accident_id):
         """Delete an accident"""
+        # Listeners such as the rollups need the row as it was before deletion
+        accident = None
+        if events.has_listeners('accident.deleted'):
+            accident = Accident.find_by_id(accident_id)
+        
         query = "DELETE FROM accidents WHERE id = %s"
         try:
             Database.execute_query(query, (accident_id,), commit=True)
-            return True
         except Exception:
             return False
+        
+        events.emit('accident.deleted', accident_id=accident_id, accident=accident)
+        return True
+    
+    @staticmethod
+    def add_report(accident_id, user_id, latitude, longitude, severity, description=None, image_path=None):
+        """
+        Merge another citizen's report of the same incident into an accident
+        
+        Args:
+            accident_id: Accident the report belongs to
+            user_id: ID of the reporting user
+            latitude: Reported latitude
+            longitude: Reported longitude
+            severity: Reported severity
+            description: Optional description
+            image_path: Optional image path
+            
+        Returns:
+            New report count, or None on failure
+        """
+        # The report row and the counter are written in one transaction;
+        # bumping the counter first locks the accident row
+        try:
+            with Database.transaction() as cursor:
+                cursor.execute(
+                    "UPDATE accidents SET report_count = report_count + 1 WHERE id = %s",
+                    (accident_id,)
+                )
+                if not cursor.rowcount:
+                    return None
+                
+                cursor.execute("""
+                    INSERT INTO accident_reports
+                    (accident_id, user_id, latitude, longitude, severity, description, image_path)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                """, (accident_id, user_id, latitude, longitude, severity, description, image_path))
+                report_id = cursor.lastrowid
+                
+                cursor.execute(
+                    "SELECT accident_type, report_count FROM accidents WHERE id = %s",
+                    (accident_id,)
+                )
+                row = cursor.fetchone()
+        except Exception as e:
+            print(f"Error merging report: {e}")
+            return None
+        
+        events.emit('accident.report_merged', accident_id=accident_id, report={
+            'id': report_id,
+            'user_id': user_id,
+            'latitude': latitude,
+            'longitude': longitude,
+            'accident_type': row['accident_type'],
+            'created_at': datetime.now()
+        })
+        events.emit('accident.updated', accident_id=accident_id, fields={'report_count': row['report_count']})
+        return row['report_count']
+    
+    @staticmethod
+    def get_report_image_paths(accident_id):
+        """Get image paths of reports merged into an accident"""
+        query = "SELECT image_path FROM accident_reports WHERE accident_id = %s AND image_path IS NOT NULL"
+        rows = Database.execute_query(query, (accident_id,), fetch_all=True) or []
+        return [row['image_path'] for row in rows]
     
     @staticmethod
     def check_duplicate(user_id, latitude, longitude, time_window_minutes=30):
         """
         Check for duplicate accident reports
         
+        Answered from the in-memory duplicate index when it is enabled
+        and the window fits inside DUPLICATE_WINDOW_MINUTES, otherwise
+        with a range query.
+        
         Args:
             user_id: User ID
             latitude: Accident latitude
@@ -178,6 +375,12 @@ class Accident:
         Returns:
             True if duplicate found, False otherwise
         """
+        window_seconds = time_window_minutes * 60
+        if duplicate_index.enabled and window_seconds <= duplicate_index.window_seconds:
+            return duplicate_index.find_duplicate(
+                user_id, latitude, longitude, window_seconds=window_seconds
+            ) is not None
+        
         query = """
             SELECT COUNT(*) as count
             FROM accidents
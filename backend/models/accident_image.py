@@ -0,0 +1,87 @@
+"""Accident image derivative model"""
+from database import Database
+
+class AccidentImage:
+    """Resized copies of an accident photo in several sizes and formats"""
+    
+    @staticmethod
+    def replace(accident_id, derivatives):
+        """
+        Record the derivatives of an accident image, replacing older ones
+        
+        Args:
+            accident_id: Accident the image belongs to
+            derivatives: List of dicts with keys variant, format,
+                         image_path, width, height, bytes
+        """
+        Database.execute_query(
+            "DELETE FROM accident_images WHERE accident_id = %s",
+            (accident_id,), commit=True
+        )
+        if not derivatives:
+            return
+        
+        query = """
+            INSERT INTO accident_images
+            (accident_id, variant, format, image_path, width, height, bytes)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """
+        Database.execute_many(query, [
+            (accident_id, d['variant'], d['format'], d['image_path'], d['width'], d['height'], d['bytes'])
+            for d in derivatives
+        ])
+    
+    @staticmethod
+    def copy_from_image(image_path, accident_id):
+        """
+        Reuse derivatives already generated for the same stored image
+        
+        Uploads are content-addressed, so another accident with the same
+        image_path has an identical photo.
+        
+        Args:
+            image_path: Relative path of the uploaded image
+            accident_id: Accident to attach the derivatives to
+            
+        Returns:
+            List of derivative rows, empty if none exist yet
+        """
+        query = """
+            SELECT i.variant, i.format, i.image_path, i.width, i.height, i.bytes
+            FROM accident_images i
+            WHERE i.accident_id = (
+                SELECT a.id FROM accidents a
+                WHERE a.image_path = %s AND a.id <> %s AND a.image_status = 'ready'
+                LIMIT 1
+            )
+        """
+        derivatives = Database.execute_query(query, (image_path, accident_id), fetch_all=True) or []
+        if derivatives:
+            AccidentImage.replace(accident_id, derivatives)
+        return derivatives
+    
+    @staticmethod
+    def get_for_accident(accident_id):
+        """Get all derivatives of one accident's image"""
+        query = "SELECT * FROM accident_images WHERE accident_id = %s"
+        return Database.execute_query(query, (accident_id,), fetch_all=True) or []
+    
+    @staticmethod
+    def get_for_accidents(accident_ids):
+        """
+        Get derivatives for many accidents in one query
+        
+        Returns:
+            Dict of accident ID to list of derivative rows
+        """
+        if not accident_ids:
+            return {}
+        
+        placeholders = ', '.join(['%s'] * len(accident_ids))
+        query = f"SELECT * FROM accident_images WHERE accident_id IN ({placeholders})"
+        rows = Database.execute_query(query, tuple(accident_ids), fetch_all=True) or []
+        
+        by_accident = {}
+        for row in rows:
+            by_accident.setdefault(row['accident_id'], []).append(row)
+        return by_accident
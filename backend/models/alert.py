@@ -1,6 +1,8 @@
 """Alert model"""
 from database import Database
-from utils.geolocation import get_bounding_box
+from services.alert_expiry import alert_expiry
+from utils import events
+from utils.geolocation import get_bounding_box, haversine_many
 from datetime import datetime, timedelta
 
 class Alert:
@@ -38,10 +40,56 @@ class Alert:
                 (accident_id, alert_type, severity, latitude, longitude, radius, message, expires_at),
                 commit=True
             )
-            return alert_id
         except Exception as e:
             print(f"Error creating alert: {e}")
             return None
+        
+        if events.has_listeners('alert.created'):
+            events.emit('alert.created', alert=Alert.get_by_id(alert_id))
+        
+        return alert_id
+    
+    @staticmethod
+    def create_many(alerts, expires_hours=24):
+        """
+        Create many alerts with one multi-row INSERT
+        
+        Args:
+            alerts: List of dicts with alert_type, severity, latitude,
+                    longitude, message and optional radius, accident_id
+            expires_hours: Hours until the alerts expire
+            
+        Returns:
+            List of alert IDs in the same order as alerts
+        """
+        if not alerts:
+            return []
+        
+        expires_at = datetime.now() + timedelta(hours=expires_hours)
+        rows = [
+            dict(a, radius=a.get('radius', 5.0), accident_id=a.get('accident_id'), expires_at=expires_at)
+            for a in alerts
+        ]
+        
+        query = """
+            INSERT INTO alerts 
+            (accident_id, alert_type, severity, latitude, longitude, radius, message, expires_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """
+        ids = Database.execute_many(query, [
+            (r['accident_id'], r['alert_type'], r['severity'], r['latitude'], r['longitude'],
+             r['radius'], r['message'], r['expires_at'])
+            for r in rows
+        ], return_ids=True)
+        
+        if events.has_listeners('alert.created_batch'):
+            now = datetime.now()
+            events.emit('alert.created_batch', alerts=[
+                dict(r, id=alert_id, created_at=now, is_active=True)
+                for alert_id, r in zip(ids, rows)
+            ])
+        
+        return ids
     
     @staticmethod
     def get_active_alerts(latitude=None, longitude=None, radius=None):
@@ -56,13 +104,14 @@ class Alert:
         Returns:
             List of active alerts
         """
-        query = """
-            SELECT * FROM alerts
-            WHERE is_active = TRUE
-            AND (expires_at IS NULL OR expires_at > NOW())
-        """
+        query = "SELECT * FROM alerts WHERE is_active = TRUE"
         params = []
         
+        # The expiry scheduler flips is_active when an alert expires;
+        # without it expires_at has to be checked on every read
+        if not alert_expiry.enabled:
+            query += " AND (expires_at IS NULL OR expires_at > NOW())"
+        
         if all(v is not None for v in [latitude, longitude, radius]):
             min_lat, max_lat, min_lon, max_lon = get_bounding_box(latitude, longitude, radius)
             query += """ AND latitude BETWEEN %s AND %s 
@@ -73,6 +122,36 @@ class Alert:
         
         return Database.execute_query(query, tuple(params), fetch_all=True) or []
     
+    @staticmethod
+    def get_covering(latitude, longitude, radius_km=0):
+        """
+        Get active alerts whose own radius reaches a location
+        
+        Args:
+            latitude: User latitude
+            longitude: User longitude
+            radius_km: Extra distance an alert's circle may be away
+            
+        Returns:
+            List of active alerts, newest first, with distance_km
+        """
+        alerts = Alert.get_active_alerts()
+        if not alerts:
+            return []
+        
+        distances = haversine_many(
+            latitude, longitude,
+            [float(a['latitude']) for a in alerts],
+            [float(a['longitude']) for a in alerts]
+        )
+        
+        results = []
+        for alert, distance in zip(alerts, distances):
+            if distance <= float(alert['radius'] or 0) + radius_km:
+                alert['distance_km'] = round(float(distance), 3)
+                results.append(alert)
+        return results
+    
     @staticmethod
     def get_by_id(alert_id):
         """Get alert by ID"""
@@ -85,9 +164,11 @@ class Alert:
         query = "UPDATE alerts SET is_active = FALSE WHERE id = %s"
         try:
             Database.execute_query(query, (alert_id,), commit=True)
-            return True
         except Exception:
             return False
+        
+        events.emit('alert.deactivated', alert_id=alert_id)
+        return True
     
     @staticmethod
     def cleanup_expired():
@@ -1,5 +1,6 @@
 """Awareness content model"""
 from database import Database
+from utils import events
 
 class AwarenessContent:
     """Road safety awareness content model"""
@@ -19,10 +20,12 @@ class AwarenessContent:
                 (title, content, category, created_by, is_published),
                 commit=True
             )
-            return content_id
         except Exception as e:
             print(f"Error creating awareness content: {e}")
             return None
+        
+        events.emit('awareness.changed', content_id=content_id)
+        return content_id
     
     @staticmethod
     def get_all(category=None, published_only=True):
@@ -67,9 +70,11 @@ class AwarenessContent:
         
         try:
             Database.execute_query(query, tuple(values), commit=True)
-            return True
         except Exception:
             return False
+        
+        events.emit('awareness.changed', content_id=content_id)
+        return True
     
     @staticmethod
     def delete(content_id):
@@ -77,9 +82,11 @@ class AwarenessContent:
         query = "DELETE FROM awareness_content WHERE id = %s"
         try:
             Database.execute_query(query, (content_id,), commit=True)
-            return True
         except Exception:
             return False
+        
+        events.emit('awareness.changed', content_id=content_id)
+        return True
     
     @staticmethod
     def get_categories():
@@ -1,10 +1,20 @@
 """Emergency services model"""
+import numpy as np
 from database import Database
-from utils.geolocation import get_bounding_box, haversine_distance
+from services.emergency_index import emergency_index
+from services.routing_service import routing_service
+from utils import events
+from utils.geolocation import get_bounding_box, haversine_many, within_radius_mask
+
+# Services that drive to the caller; the caller drives to the others
+INBOUND_TYPES = {'ambulance', 'police'}
 
 class EmergencyService:
     """Emergency services model (hospitals, police, ambulance)"""
     
+    # Straight-line candidates ranked per result when ranking by drive time
+    DRIVE_TIME_POOL = 4
+    
     @staticmethod
     def create(name, service_type, latitude, longitude, address=None, phone=None):
         """Create a new emergency service"""
@@ -20,13 +30,15 @@ class EmergencyService:
                 (name, service_type, latitude, longitude, address, phone),
                 commit=True
             )
-            return service_id
         except Exception as e:
             print(f"Error creating emergency service: {e}")
             return None
+        
+        events.emit('emergency_service.changed', service_id=service_id)
+        return service_id
     
     @staticmethod
-    def find_nearby(latitude, longitude, radius_km=10, service_type=None):
+    def find_nearby(latitude, longitude, radius_km=10, service_type=None, rank='distance'):
         """
         Find nearby emergency services
         
@@ -35,10 +47,23 @@ class EmergencyService:
             longitude: User longitude
             radius_km: Search radius in kilometers
             service_type: Optional filter by type (hospital, police, ambulance)
+            rank: 'distance', or 'drive_time' to order by estimated drive time
             
         Returns:
             List of nearby services with distances
         """
+        if emergency_index.enabled:
+            results = emergency_index.within(latitude, longitude, radius_km, service_type)
+        else:
+            results = EmergencyService._find_in_radius(latitude, longitude, radius_km, service_type)
+        
+        if rank == 'drive_time':
+            EmergencyService._rank_by_drive_time(latitude, longitude, results)
+        return results
+    
+    @staticmethod
+    def _find_in_radius(latitude, longitude, radius_km, service_type):
+        """Radius query against MySQL, used when the in-memory index is off"""
         # Use bounding box for initial filtering
         min_lat, max_lat, min_lon, max_lon = get_bounding_box(latitude, longitude, radius_km)
         
@@ -56,23 +81,97 @@ class EmergencyService:
         
         services = Database.execute_query(query, tuple(params), fetch_all=True) or []
         
-        # Calculate exact distances and filter by radius
+        if not services:
+            return []
+        
+        # Calculate exact distances and filter by radius in one pass
+        mask, distances = within_radius_mask(
+            latitude, longitude,
+            [float(s['latitude']) for s in services],
+            [float(s['longitude']) for s in services],
+            radius_km
+        )
+        
         results = []
-        for service in services:
-            distance = haversine_distance(
-                latitude, longitude,
-                float(service['latitude']), float(service['longitude'])
-            )
-            
-            if distance <= radius_km:
-                service['distance_km'] = round(distance, 2)
-                results.append(service)
+        for i in mask.nonzero()[0]:
+            service = services[i]
+            service['distance_km'] = round(float(distances[i]), 2)
+            results.append(service)
         
         # Sort by distance
         results.sort(key=lambda x: x['distance_km'])
         
         return results
     
+    @staticmethod
+    def find_nearest(latitude, longitude, k=3, service_type=None, max_distance_km=None, rank='distance'):
+        """
+        Find the k closest emergency services, however far away
+        
+        Args:
+            latitude: User latitude
+            longitude: User longitude
+            k: Number of services to return
+            service_type: Optional filter by type (hospital, police, ambulance)
+            max_distance_km: Optional cap on distance
+            rank: 'distance', or 'drive_time' for the k quickest to reach
+                  among the DRIVE_TIME_POOL * k closest in a straight line
+            
+        Returns:
+            List of services with distances, nearest first
+        """
+        if rank == 'drive_time':
+            results = EmergencyService.find_nearest(
+                latitude, longitude, k * EmergencyService.DRIVE_TIME_POOL, service_type, max_distance_km
+            )
+            EmergencyService._rank_by_drive_time(latitude, longitude, results)
+            return results[:k]
+        
+        if emergency_index.enabled:
+            return emergency_index.nearest(latitude, longitude, k, service_type, max_distance_km)
+        
+        services = EmergencyService.get_all(service_type)
+        if not services:
+            return []
+        
+        distances = haversine_many(
+            latitude, longitude,
+            [float(s['latitude']) for s in services],
+            [float(s['longitude']) for s in services]
+        )
+        
+        results = []
+        for i in np.argsort(distances, kind='stable')[:k]:
+            if max_distance_km is not None and distances[i] > max_distance_km:
+                break
+            service = services[i]
+            service['distance_km'] = round(float(distances[i]), 2)
+            results.append(service)
+        
+        return results
+    
+    @staticmethod
+    def _rank_by_drive_time(latitude, longitude, services):
+        """
+        Add drive_time_seconds to services and sort them by it in place
+        
+        Services the road graph cannot reach get None and go last, in
+        distance order.
+        """
+        for inbound in (True, False):
+            group = [s for s in services if (s['type'] in INBOUND_TYPES) == inbound]
+            times = routing_service.drive_times(
+                latitude, longitude,
+                [(s['latitude'], s['longitude']) for s in group],
+                inbound=inbound
+            )
+            for service, seconds in zip(group, times):
+                service['drive_time_seconds'] = round(seconds) if seconds is not None else None
+        
+        services.sort(key=lambda s: (
+            s['drive_time_seconds'] is None, s['drive_time_seconds'] or 0, s['distance_km']
+        ))
+    
     @staticmethod
     def get_all(service_type=None):
         """Get all emergency services"""
@@ -103,9 +202,11 @@ class EmergencyService:
         
         try:
             Database.execute_query(query, tuple(values), commit=True)
-            return True
         except Exception:
             return False
+        
+        events.emit('emergency_service.changed', service_id=service_id)
+        return True
     
     @staticmethod
     def delete(service_id):
@@ -113,6 +214,8 @@ class EmergencyService:
         query = "DELETE FROM emergency_services WHERE id = %s"
         try:
             Database.execute_query(query, (service_id,), commit=True)
-            return True
         except Exception:
             return False
+        
+        events.emit('emergency_service.changed', service_id=service_id)
+        return True
@@ -0,0 +1,94 @@
+"""Notification model"""
+from database import Database
+
+class Notification:
+    """In-app notifications sent to users"""
+    
+    @staticmethod
+    def create_many(rows, batch_size=1000):
+        """
+        Insert notifications with multi-row INSERTs
+        
+        Args:
+            rows: List of (user_id, alert_id, title, message) tuples
+            batch_size: Rows per INSERT statement
+            
+        Returns:
+            Number of notifications created
+        """
+        query = """
+            INSERT INTO notifications (user_id, alert_id, title, message)
+            VALUES (%s, %s, %s, %s)
+        """
+        created = 0
+        for start in range(0, len(rows), batch_size):
+            created += Database.execute_many(query, rows[start:start + batch_size])
+        return created
+    
+    @staticmethod
+    def get_for_user(user_id, unread_only=False, limit=20, offset=0):
+        """
+        Get a user's notifications, newest first
+        
+        Args:
+            user_id: Recipient user ID
+            unread_only: Only return unread notifications
+            limit: Maximum number of results
+            offset: Offset for pagination
+            
+        Returns:
+            List of notifications
+        """
+        query = """
+            SELECT id, alert_id, title, message, is_read, created_at
+            FROM notifications
+            WHERE user_id = %s
+        """
+        params = [user_id]
+        
+        if unread_only:
+            query += " AND is_read = FALSE"
+        
+        query += " ORDER BY created_at DESC, id DESC LIMIT %s OFFSET %s"
+        params.extend([limit, offset])
+        
+        return Database.execute_query(query, tuple(params), fetch_all=True) or []
+    
+    @staticmethod
+    def count_for_user(user_id, unread_only=False):
+        """Count a user's notifications"""
+        query = "SELECT COUNT(*) as count FROM notifications WHERE user_id = %s"
+        if unread_only:
+            query += " AND is_read = FALSE"
+        
+        result = Database.execute_query(query, (user_id,), fetch_one=True)
+        return result['count'] if result else 0
+    
+    @staticmethod
+    def mark_read(notification_id, user_id):
+        """
+        Mark one of a user's notifications as read
+        
+        Returns:
+            True if the notification exists and belongs to the user
+        """
+        query = "SELECT id FROM notifications WHERE id = %s AND user_id = %s"
+        if not Database.execute_query(query, (notification_id, user_id), fetch_one=True):
+            return False
+        
+        query = "UPDATE notifications SET is_read = TRUE WHERE id = %s"
+        try:
+            Database.execute_query(query, (notification_id,), commit=True)
+            return True
+        except Exception:
+            return False
+    
+    @staticmethod
+    def mark_all_read(user_id):
+        """Mark all of a user's notifications as read"""
+        query = "UPDATE notifications SET is_read = TRUE WHERE user_id = %s AND is_read = FALSE"
+        try:
+            Database.execute_query(query, (user_id,), commit=True)
+            return True
+        except Exception:
+            return False
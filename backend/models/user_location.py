@@ -0,0 +1,33 @@
+"""User location model"""
+from database import Database
+
+class UserLocation:
+    """Last known location of each user, used to target alert notifications"""
+    
+    @staticmethod
+    def update(user_id, latitude, longitude):
+        """Record a user's current location"""
+        query = """
+            INSERT INTO user_locations (user_id, latitude, longitude, updated_at)
+            VALUES (%s, %s, %s, NOW())
+            ON DUPLICATE KEY UPDATE
+                latitude = VALUES(latitude),
+                longitude = VALUES(longitude),
+                updated_at = NOW()
+        """
+        try:
+            Database.execute_query(query, (user_id, latitude, longitude), commit=True)
+            return True
+        except Exception as e:
+            print(f"Error updating user location: {e}")
+            return False
+    
+    @staticmethod
+    def get_updated_since(since):
+        """Get locations updated at or after a timestamp"""
+        query = """
+            SELECT user_id, latitude, longitude, updated_at
+            FROM user_locations
+            WHERE updated_at >= %s
+        """
+        return Database.execute_query(query, (since,), fetch_all=True) or []
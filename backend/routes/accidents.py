@@ -2,15 +2,39 @@
 from flask import Blueprint, request
 from models.accident import Accident
 from models.alert import Alert
+from models.accident_image import AccidentImage
+from models.user_location import UserLocation
 from utils.validators import validate_enum, sanitize_input
 from utils.geolocation import validate_coordinates
-from utils.file_handler import save_uploaded_file, get_file_url
-from utils.response import success_response, error_response, paginated_response, get_pagination_params
+from utils.file_handler import save_uploaded_file, get_file_url, delete_file
+from services.image_pipeline import image_pipeline
+from services.ingest_service import IngestService
+from services.duplicate_index import duplicate_index
+from utils.response import (
+    success_response, error_response, paginated_response, cursor_response,
+    get_pagination_params, encode_cursor, decode_cursor
+)
 from middleware.auth import token_required, role_required, get_current_user
+from config import Config
 from datetime import datetime
+import json
 
 accidents_bp = Blueprint('accidents', __name__, url_prefix='/api/accidents')
 
+def _add_image_urls(accidents):
+    """Attach image URLs and derivative srcsets, loading derivatives in one query"""
+    with_images = [a for a in accidents if a.get('image_path')]
+    derivatives = AccidentImage.get_for_accidents([a['id'] for a in with_images])
+    
+    for accident in with_images:
+        variants = derivatives.get(accident['id'])
+        if variants:
+            accident['images'] = get_file_url(accident['image_path'], variants)
+            accident['image_url'] = accident['images']['src']
+        else:
+            accident['images'] = None
+            accident['image_url'] = get_file_url(accident['image_path'])
+
 @accidents_bp.route('/report', methods=['POST'])
 @token_required
 def report_accident():
@@ -52,30 +76,74 @@ def report_accident():
         # Sanitize description
         description = sanitize_input(description, 1000)
         
+        # A report is the reporter's latest known location
+        UserLocation.update(user_id, latitude, longitude)
+        
         # Check for duplicate
         if Accident.check_duplicate(user_id, latitude, longitude):
             return error_response("Similar accident already reported recently", 400)
         
-        # Handle image upload
+        # Reports of the same incident by other citizens are merged into it
+        incident_id = None
+        if duplicate_index.enabled:
+            incident_id = duplicate_index.find_incident(latitude, longitude, accident_type)
+        
+        # Handle image upload; resized derivatives of a new accident's image
+        # are generated by the image pipeline, in the background when it is
+        # enabled. Merged reports keep only their own image, optimized now.
         image_path = None
         if 'image' in request.files:
             file = request.files['image']
             if file.filename:
-                success, result = save_uploaded_file(file, 'accidents')
+                success, result = save_uploaded_file(file, 'accidents', optimize=incident_id is not None)
                 if success:
                     image_path = result
                 else:
                     return error_response(f"Image upload failed: {result}", 400)
         
+        if incident_id:
+            report_count = Accident.add_report(
+                incident_id, user_id, latitude, longitude, severity, description, image_path
+            )
+            if report_count:
+                # A high-severity report escalates the incident and alerts
+                # nearby users, as it would have as a new accident
+                if severity == 'high' and Accident.raise_severity(incident_id, severity):
+                    Alert.create(
+                        alert_type='accident',
+                        severity=severity,
+                        latitude=latitude,
+                        longitude=longitude,
+                        message=f"High severity {accident_type} reported in your area",
+                        radius=5.0,
+                        accident_id=incident_id,
+                        expires_hours=24
+                    )
+                
+                return success_response({
+                    "accident_id": incident_id,
+                    "merged": True,
+                    "report_count": report_count
+                }, "Report merged into an existing incident")
+        
+        image_status = 'pending' if image_path else 'none'
+        
         # Create accident report
         accident_id = Accident.create(
             user_id, latitude, longitude,
-            accident_type, severity, description, image_path
+            accident_type, severity, description, image_path, image_status
         )
         
         if not accident_id:
+            # Drop the upload's blob reference, which nothing now holds
+            if image_path:
+                delete_file(image_path)
             return error_response("Failed to create accident report", 500)
         
+        images = None
+        if image_path:
+            image_status, images = image_pipeline.submit(accident_id, image_path)
+        
         # Create alert for high severity accidents
         if severity == 'high':
             Alert.create(
@@ -91,18 +159,66 @@ def report_accident():
         
         return success_response({
             "accident_id": accident_id,
-            "image_url": get_file_url(image_path) if image_path else None
+            "image_url": images['src'] if images else get_file_url(image_path),
+            "images": images,
+            "image_status": image_status
         }, "Accident reported successfully", 201)
         
     except Exception as e:
         return error_response(f"Failed to report accident: {str(e)}", 500)
 
+@accidents_bp.route('/batch', methods=['POST'])
+@role_required('admin', 'authority')
+def ingest_batch():
+    """
+    Bulk-ingest accident reports from a partner feed (admin/authority only)
+    
+    Accepts a JSON array (or {"accidents": [...]}) or NDJSON with one
+    report per line. Pass alerts=false to skip alert creation.
+    """
+    try:
+        if request.mimetype in ('application/x-ndjson', 'application/ndjson', 'application/jsonl'):
+            records = []
+            for line in request.get_data(as_text=True).splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    records.append(None)
+        else:
+            data = request.get_json(silent=True)
+            records = data.get('accidents') if isinstance(data, dict) else data
+        
+        if not isinstance(records, list) or not records:
+            return error_response("Expected a non-empty list of accidents", 400)
+        
+        if len(records) > Config.INGEST_MAX_BATCH:
+            return error_response(f"Batch too large (max {Config.INGEST_MAX_BATCH})", 413)
+        
+        create_alerts = request.args.get('alerts', 'true').lower() != 'false'
+        result = IngestService.ingest(get_current_user(), records, create_alerts)
+        
+        status_code = 201 if result['summary']['created'] else 200
+        return success_response(result, "Batch processed", status_code)
+        
+    except Exception as e:
+        return error_response(f"Failed to ingest batch: {str(e)}", 500)
+
 @accidents_bp.route('/live', methods=['GET'])
 def get_live_accidents():
-    """Get live accident data with filters"""
+    """
+    Get live accident data with filters
+    
+    Pagination is page/page_size by default. Passing a cursor parameter
+    (empty for the first page) switches to keyset pagination: the response
+    carries next_cursor, and the total is only counted when
+    include_total=true.
+    """
     try:
         # Get pagination params
         page, page_size, offset = get_pagination_params(request)
+        cursor = request.args.get('cursor')
         
         # Build filters
         filters = {}
@@ -133,14 +249,37 @@ def get_live_accidents():
             except ValueError:
                 return error_response("Invalid location parameters", 400)
         
+        if cursor is not None:
+            try:
+                after = decode_cursor(cursor) if cursor else None
+            except ValueError:
+                return error_response("Invalid cursor", 400)
+            
+            # Fetch one extra row to learn whether another page exists
+            accidents = Accident.get_all(filters, limit=page_size + 1, after=after)
+            next_cursor = None
+            if len(accidents) > page_size:
+                accidents = accidents[:page_size]
+                last = accidents[-1]
+                next_cursor = encode_cursor(last['timestamp'], last['id'])
+            
+            total_count = None
+            if request.args.get('include_total', '').lower() == 'true':
+                total_count = Accident.count(filters)
+            
+            _add_image_urls(accidents)
+            
+            return cursor_response(
+                accidents, page_size, next_cursor, total_count,
+                "Accidents retrieved successfully"
+            )
+        
         # Get accidents
         accidents = Accident.get_all(filters, limit=page_size, offset=offset)
         total_count = Accident.count(filters)
         
         # Add image URLs
-        for accident in accidents:
-            if accident.get('image_path'):
-                accident['image_url'] = get_file_url(accident['image_path'])
+        _add_image_urls(accidents)
         
         return paginated_response(
             accidents, page, page_size, total_count,
@@ -159,8 +298,7 @@ def get_accident(accident_id):
         if not accident:
             return error_response("Accident not found", 404)
         
-        if accident.get('image_path'):
-            accident['image_url'] = get_file_url(accident['image_path'])
+        _add_image_urls([accident])
         
         return success_response(accident, "Accident retrieved successfully")
         
@@ -198,11 +336,20 @@ def update_accident_status(accident_id):
 def delete_accident(accident_id):
     """Delete an accident (admin only)"""
     try:
+        accident = Accident.find_by_id(accident_id)
+        image_paths = Accident.get_report_image_paths(accident_id)
+        if accident and accident.get('image_path'):
+            image_paths.append(accident['image_path'])
+        
         success = Accident.delete(accident_id)
         
         if not success:
             return error_response("Failed to delete accident", 500)
         
+        # Shared uploads are only removed once no accident refers to them
+        for image_path in image_paths:
+            delete_file(image_path)
+        
         return success_response(None, "Accident deleted successfully")
         
     except Exception as e:
@@ -1,12 +1,18 @@
 """Alert routes"""
-from flask import Blueprint, request
+from flask import Blueprint, request, Response, stream_with_context
 from models.alert import Alert
+from services.alert_broker import alert_broker
+from services.alert_index import alert_index
 from utils.response import success_response, error_response
+from utils.cache import response_cache
+from utils.geolocation import validate_coordinates
 from middleware.auth import token_required, role_required
+from config import Config
 
 alerts_bp = Blueprint('alerts', __name__, url_prefix='/api/alerts')
 
 @alerts_bp.route('', methods=['GET'])
+@response_cache.cached('alerts', ttl=30)
 def get_alerts():
     """Get active alerts"""
     try:
@@ -33,11 +39,17 @@ def get_alerts():
 
 @alerts_bp.route('/nearby', methods=['GET'])
 def get_nearby_alerts():
-    """Get alerts near a specific location"""
+    """
+    Get active alerts covering a location
+    
+    An alert covers the location when the location is inside its own
+    radius; with radius (km, default 0) alerts whose circle comes within
+    that distance are included too.
+    """
     try:
         latitude = request.args.get('latitude')
         longitude = request.args.get('longitude')
-        radius = request.args.get('radius', 5)
+        radius = request.args.get('radius', 0)
         
         if not latitude or not longitude:
             return error_response("Missing latitude or longitude", 400)
@@ -49,13 +61,106 @@ def get_nearby_alerts():
         except ValueError:
             return error_response("Invalid location parameters", 400)
         
-        alerts = Alert.get_active_alerts(latitude, longitude, radius)
+        if not 0 <= radius <= Config.MAX_RADIUS_KM:
+            return error_response(f"Radius must be between 0 and {Config.MAX_RADIUS_KM} km", 400)
+        
+        if alert_index.enabled:
+            alerts = alert_index.covering(latitude, longitude, radius)
+        else:
+            alerts = Alert.get_covering(latitude, longitude, radius)
         
         return success_response(alerts, f"Found {len(alerts)} alerts nearby")
         
     except Exception as e:
         return error_response(f"Failed to get nearby alerts: {str(e)}", 500)
 
+@alerts_bp.route('/stream', methods=['GET'])
+def stream_alerts():
+    """
+    Stream new alerts as server-sent events
+    
+    With latitude/longitude (and radius, default 5 km) only alerts inside
+    that circle are sent; without them every alert is. Reconnecting
+    clients send Last-Event-ID (or last_event_id) and first receive the
+    active alerts they missed. A comment line is sent every
+    ALERT_STREAM_HEARTBEAT_SECONDS to keep idle connections open.
+    """
+    try:
+        if not alert_broker.enabled:
+            return error_response("Alert streaming is disabled", 404)
+        
+        latitude = request.args.get('latitude')
+        longitude = request.args.get('longitude')
+        radius = None
+        
+        if latitude or longitude:
+            is_valid, error = validate_coordinates(latitude, longitude)
+            if not is_valid:
+                return error_response(error, 400)
+            try:
+                latitude = float(latitude)
+                longitude = float(longitude)
+                radius = float(request.args.get('radius', 5))
+            except (TypeError, ValueError):
+                return error_response("Invalid location parameters", 400)
+            
+            if not 0 < radius <= Config.MAX_RADIUS_KM:
+                return error_response(f"Radius must be between 0 and {Config.MAX_RADIUS_KM} km", 400)
+        else:
+            latitude = longitude = None
+        
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            return error_response("Invalid Last-Event-ID", 400)
+        
+        subscriber = alert_broker.subscribe(latitude, longitude, radius)
+        if subscriber is None:
+            return error_response("Too many alert streams, retry later", 503)
+        
+        # Alerts created between a disconnect and this subscription
+        missed = []
+        if last_event_id is not None:
+            try:
+                missed = [
+                    alert for alert in Alert.get_active_alerts(latitude, longitude, radius)
+                    if alert['id'] > last_event_id and subscriber.matches(alert['latitude'], alert['longitude'])
+                ]
+            except Exception:
+                alert_broker.unsubscribe(subscriber)
+                raise
+            missed.sort(key=lambda a: a['id'])
+        
+        def generate():
+            try:
+                yield "retry: 5000\n: connected\n\n"
+                for alert in missed:
+                    yield alert_broker.format_event(alert)
+                
+                while True:
+                    message = subscriber.get(alert_broker.heartbeat_seconds)
+                    if message is not None:
+                        yield message
+                    elif subscriber.closed:
+                        return
+                    else:
+                        yield ": keepalive\n\n"
+            finally:
+                alert_broker.unsubscribe(subscriber)
+        
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'
+            }
+        )
+        
+    except Exception as e:
+        return error_response(f"Failed to open alert stream: {str(e)}", 500)
+
 @alerts_bp.route('/create', methods=['POST'])
 @role_required('admin', 'authority')
 def create_alert():
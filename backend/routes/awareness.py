@@ -2,12 +2,14 @@
 from flask import Blueprint, request
 from models.awareness import AwarenessContent
 from utils.response import success_response, error_response
+from utils.cache import response_cache
 from utils.validators import sanitize_input
 from middleware.auth import token_required, role_required, get_current_user
 
 awareness_bp = Blueprint('awareness', __name__, url_prefix='/api/awareness')
 
 @awareness_bp.route('', methods=['GET'])
+@response_cache.cached('awareness', ttl=600)
 def get_all_content():
     """Get all published awareness content"""
     try:
@@ -34,6 +36,7 @@ def get_content(content_id):
         return error_response(f"Failed to get content: {str(e)}", 500)
 
 @awareness_bp.route('/categories', methods=['GET'])
+@response_cache.cached('awareness', ttl=600)
 def get_categories():
     """Get all content categories"""
     try:
@@ -1,5 +1,6 @@
 """Backup routes"""
-from flask import Blueprint, send_file
+from flask import Blueprint, request, send_file
+from werkzeug.utils import secure_filename
 from utils.backup import BackupUtility
 from utils.response import success_response, error_response
 from middleware.auth import role_required
@@ -12,7 +13,13 @@ backup_bp = Blueprint('backup', __name__, url_prefix='/api/backup')
 def create_backup():
     """Create a new backup (admin only)"""
     try:
-        filename = BackupUtility.create_backup()
+        data = request.get_json(silent=True) or {}
+        compression = data.get('compression', 'gzip')
+        
+        if compression not in ['gzip', 'zstd']:
+            return error_response("Compression must be 'gzip' or 'zstd'", 400)
+        
+        filename = BackupUtility.create_backup(compression=compression)
         
         return success_response(
             {'filename': filename},
@@ -57,6 +64,30 @@ def download_backup(filename):
     except Exception as e:
         return error_response(f"Failed to download backup: {str(e)}", 500)
 
+@backup_bp.route('/restore/<filename>', methods=['POST'])
+@role_required('admin')
+def restore_backup(filename):
+    """Restore a streaming backup, keeping existing rows (admin only)"""
+    try:
+        filename = secure_filename(filename)
+        filepath = os.path.join('backups', filename)
+        
+        if not os.path.exists(filepath):
+            return error_response("Backup file not found", 404)
+        
+        data = request.get_json(silent=True) or {}
+        restored = BackupUtility.restore_backup(filename, tables=data.get('tables'))
+        
+        return success_response(
+            {'restored': restored},
+            "Backup restored successfully"
+        )
+        
+    except ValueError as e:
+        return error_response(str(e), 400)
+    except Exception as e:
+        return error_response(f"Failed to restore backup: {str(e)}", 500)
+
 @backup_bp.route('/cleanup', methods=['POST'])
 @role_required('admin')
 def cleanup_backups():
@@ -1,30 +1,64 @@
 """Emergency services routes"""
 from flask import Blueprint, request
 from models.emergency_service import EmergencyService
+from services.routing_service import routing_service
 from utils.response import success_response, error_response
 from middleware.auth import role_required
+from config import Config
 
 emergency_bp = Blueprint('emergency', __name__, url_prefix='/api/emergency')
 
+def _find_services(service_type=None):
+    """
+    Run the location query shared by the lookup routes
+    
+    With k, returns the k closest services (within radius, if given);
+    otherwise every service within radius (default 10 km). rank=drive_time
+    orders them by estimated drive time over the road graph instead of
+    straight-line distance.
+    
+    Raises:
+        ValueError: With the message for a 400 response
+    """
+    latitude = request.args.get('latitude')
+    longitude = request.args.get('longitude')
+    radius = request.args.get('radius')
+    k = request.args.get('k')
+    rank = request.args.get('rank', 'distance')
+    
+    if not latitude or not longitude:
+        raise ValueError("Missing latitude or longitude")
+    
+    try:
+        latitude = float(latitude)
+        longitude = float(longitude)
+        radius = float(radius) if radius is not None else None
+        k = int(k) if k is not None else None
+    except ValueError:
+        raise ValueError("Invalid location parameters")
+    
+    if rank not in ('distance', 'drive_time'):
+        raise ValueError("rank must be distance or drive_time")
+    if rank == 'drive_time' and not routing_service.available:
+        raise ValueError("Drive-time ranking needs a road graph (ROAD_GRAPH_PATH)")
+    
+    if k is not None:
+        if not 1 <= k <= Config.EMERGENCY_NEAREST_MAX_K:
+            raise ValueError(f"k must be between 1 and {Config.EMERGENCY_NEAREST_MAX_K}")
+        return EmergencyService.find_nearest(latitude, longitude, k, service_type, radius, rank)
+    
+    return EmergencyService.find_nearby(
+        latitude, longitude, 10 if radius is None else radius, service_type, rank
+    )
+
 @emergency_bp.route('/nearby', methods=['GET'])
 def get_nearby_services():
     """Get all nearby emergency services"""
     try:
-        latitude = request.args.get('latitude')
-        longitude = request.args.get('longitude')
-        radius = request.args.get('radius', 10)
-        
-        if not latitude or not longitude:
-            return error_response("Missing latitude or longitude", 400)
-        
         try:
-            latitude = float(latitude)
-            longitude = float(longitude)
-            radius = float(radius)
-        except ValueError:
-            return error_response("Invalid location parameters", 400)
-        
-        services = EmergencyService.find_nearby(latitude, longitude, radius)
+            services = _find_services()
+        except ValueError as e:
+            return error_response(str(e), 400)
         
         return success_response(services, f"Found {len(services)} emergency services nearby")
         
@@ -35,21 +69,10 @@ def get_nearby_services():
 def get_nearby_hospitals():
     """Get nearby hospitals"""
     try:
-        latitude = request.args.get('latitude')
-        longitude = request.args.get('longitude')
-        radius = request.args.get('radius', 10)
-        
-        if not latitude or not longitude:
-            return error_response("Missing latitude or longitude", 400)
-        
         try:
-            latitude = float(latitude)
-            longitude = float(longitude)
-            radius = float(radius)
-        except ValueError:
-            return error_response("Invalid location parameters", 400)
-        
-        hospitals = EmergencyService.find_nearby(latitude, longitude, radius, 'hospital')
+            hospitals = _find_services('hospital')
+        except ValueError as e:
+            return error_response(str(e), 400)
         
         return success_response(hospitals, f"Found {len(hospitals)} hospitals nearby")
         
@@ -60,21 +83,10 @@ def get_nearby_hospitals():
 def get_nearby_police():
     """Get nearby police stations"""
     try:
-        latitude = request.args.get('latitude')
-        longitude = request.args.get('longitude')
-        radius = request.args.get('radius', 10)
-        
-        if not latitude or not longitude:
-            return error_response("Missing latitude or longitude", 400)
-        
         try:
-            latitude = float(latitude)
-            longitude = float(longitude)
-            radius = float(radius)
-        except ValueError:
-            return error_response("Invalid location parameters", 400)
-        
-        police = EmergencyService.find_nearby(latitude, longitude, radius, 'police')
+            police = _find_services('police')
+        except ValueError as e:
+            return error_response(str(e), 400)
         
         return success_response(police, f"Found {len(police)} police stations nearby")
         
@@ -85,21 +97,10 @@ def get_nearby_police():
 def get_ambulance_services():
     """Get ambulance services"""
     try:
-        latitude = request.args.get('latitude')
-        longitude = request.args.get('longitude')
-        radius = request.args.get('radius', 10)
-        
-        if not latitude or not longitude:
-            return error_response("Missing latitude or longitude", 400)
-        
         try:
-            latitude = float(latitude)
-            longitude = float(longitude)
-            radius = float(radius)
-        except ValueError:
-            return error_response("Invalid location parameters", 400)
-        
-        ambulances = EmergencyService.find_nearby(latitude, longitude, radius, 'ambulance')
+            ambulances = _find_services('ambulance')
+        except ValueError as e:
+            return error_response(str(e), 400)
         
         return success_response(ambulances, f"Found {len(ambulances)} ambulance services nearby")
         
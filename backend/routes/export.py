@@ -1,7 +1,10 @@
 """Export routes for data download"""
-from flask import Blueprint, request, Response
+from flask import Blueprint, request, Response, stream_with_context
 from services.export_service import ExportService
+from services.heatmap_tiles import heatmap_tiles
 from utils.response import success_response, error_response
+from utils.cache import response_cache
+from utils.tiles import valid_tile
 from middleware.auth import role_required
 from datetime import datetime
 
@@ -27,14 +30,14 @@ def export_accidents_csv():
         if request.args.get('end_date'):
             filters['end_date'] = request.args.get('end_date')
         
-        # Generate CSV
-        csv_data = ExportService.export_accidents_csv(filters)
+        # Stream the CSV as it is generated instead of buffering it
+        csv_chunks = ExportService.iter_accidents_csv(filters)
         
         # Create response
         filename = f"accidents_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
         
         return Response(
-            csv_data,
+            stream_with_context(csv_chunks),
             mimetype='text/csv',
             headers={
                 'Content-Disposition': f'attachment; filename={filename}'
@@ -68,6 +71,7 @@ def export_analytics_csv():
         return error_response(f"Failed to export analytics: {str(e)}", 500)
 
 @export_bp.route('/heatmap', methods=['GET'])
+@response_cache.cached('heatmap', ttl=300, maxsize=64)
 def get_heatmap_data():
     """Get heatmap data for visualization"""
     try:
@@ -83,3 +87,41 @@ def get_heatmap_data():
         
     except Exception as e:
         return error_response(f"Failed to get heatmap data: {str(e)}", 500)
+
+@export_bp.route('/heatmap/tiles/<int:z>/<int:x>/<int:y>', methods=['GET'])
+def get_heatmap_tile(z, x, y):
+    """
+    Get the heatmap points of one z/x/y map tile
+    
+    Points are precomputed per zoom, so clients fetch only the tiles in
+    their viewport. days must be one of HEATMAP_TILE_WINDOWS. Responses
+    carry a strong ETag and answer If-None-Match with 304.
+    """
+    try:
+        if not heatmap_tiles.enabled:
+            return error_response("Heatmap tiles are disabled", 404)
+        
+        if not valid_tile(z, x, y):
+            return error_response("Invalid tile address", 400)
+        
+        try:
+            days = int(request.args.get('days', heatmap_tiles.windows[-1]))
+        except ValueError:
+            return error_response("Invalid days parameter", 400)
+        
+        if days not in heatmap_tiles.windows:
+            windows = ', '.join(str(w) for w in heatmap_tiles.windows)
+            return error_response(f"days must be one of: {windows}", 400)
+        
+        points, etag = heatmap_tiles.get_tile(days, z, x, y)
+        
+        response = success_response(
+            points,
+            f"Heatmap tile {z}/{x}/{y} for last {days} days"
+        )[0]
+        response.set_etag(f"{days}-{etag}")
+        response.headers['Cache-Control'] = 'public, max-age=60'
+        return response.make_conditional(request)
+        
+    except Exception as e:
+        return error_response(f"Failed to get heatmap tile: {str(e)}", 500)
@@ -0,0 +1,88 @@
+"""Notification routes"""
+from flask import Blueprint, request
+from models.notification import Notification
+from models.user_location import UserLocation
+from utils.geolocation import validate_coordinates
+from utils.response import success_response, error_response, paginated_response, get_pagination_params
+from middleware.auth import token_required, get_current_user
+
+notifications_bp = Blueprint('notifications', __name__, url_prefix='/api/notifications')
+
+@notifications_bp.route('', methods=['GET'])
+@token_required
+def get_notifications():
+    """Get the current user's notifications (unread=true for unread only)"""
+    try:
+        user_id = get_current_user()
+        page, page_size, offset = get_pagination_params(request)
+        unread_only = request.args.get('unread', '').lower() == 'true'
+        
+        notifications = Notification.get_for_user(user_id, unread_only, limit=page_size, offset=offset)
+        total_count = Notification.count_for_user(user_id, unread_only)
+        
+        return paginated_response(
+            notifications, page, page_size, total_count,
+            "Notifications retrieved successfully"
+        )
+        
+    except Exception as e:
+        return error_response(f"Failed to get notifications: {str(e)}", 500)
+
+@notifications_bp.route('/unread-count', methods=['GET'])
+@token_required
+def get_unread_count():
+    """Get the number of unread notifications"""
+    try:
+        count = Notification.count_for_user(get_current_user(), unread_only=True)
+        
+        return success_response({"unread_count": count}, "Unread count retrieved successfully")
+        
+    except Exception as e:
+        return error_response(f"Failed to get unread count: {str(e)}", 500)
+
+@notifications_bp.route('/<int:notification_id>/read', methods=['PUT'])
+@token_required
+def mark_notification_read(notification_id):
+    """Mark a notification as read"""
+    try:
+        if not Notification.mark_read(notification_id, get_current_user()):
+            return error_response("Notification not found", 404)
+        
+        return success_response(None, "Notification marked as read")
+        
+    except Exception as e:
+        return error_response(f"Failed to mark notification: {str(e)}", 500)
+
+@notifications_bp.route('/read-all', methods=['PUT'])
+@token_required
+def mark_all_notifications_read():
+    """Mark all of the current user's notifications as read"""
+    try:
+        if not Notification.mark_all_read(get_current_user()):
+            return error_response("Failed to mark notifications", 500)
+        
+        return success_response(None, "All notifications marked as read")
+        
+    except Exception as e:
+        return error_response(f"Failed to mark notifications: {str(e)}", 500)
+
+@notifications_bp.route('/location', methods=['PUT'])
+@token_required
+def update_location():
+    """Report the current user's location for nearby alert notifications"""
+    try:
+        data = request.get_json() or {}
+        latitude = data.get('latitude')
+        longitude = data.get('longitude')
+        
+        is_valid, error = validate_coordinates(latitude, longitude)
+        if not is_valid:
+            return error_response(error, 400)
+        
+        if not UserLocation.update(get_current_user(), float(latitude), float(longitude)):
+            return error_response("Failed to update location", 500)
+        
+        return success_response(None, "Location updated successfully")
+        
+    except Exception as e:
+        return error_response(f"Failed to update location: {str(e)}", 500)
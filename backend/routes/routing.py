@@ -0,0 +1,49 @@
+"""Safe route routes"""
+from flask import Blueprint, request
+from services.safe_route import safe_route
+from utils.response import success_response, error_response
+from utils.geolocation import validate_coordinates
+from config import Config
+
+routing_bp = Blueprint('routing', __name__, url_prefix='/api/routes')
+
+@routing_bp.route('/safe', methods=['GET'])
+def get_safe_route():
+    """Get the route balancing travel time against accident risk"""
+    try:
+        params = {}
+        for name in ('origin_lat', 'origin_lon', 'dest_lat', 'dest_lon'):
+            value = request.args.get(name)
+            if value is None:
+                return error_response(f"Missing {name}", 400)
+            params[name] = value
+
+        for prefix in ('origin', 'dest'):
+            is_valid, error = validate_coordinates(params[f'{prefix}_lat'], params[f'{prefix}_lon'])
+            if not is_valid:
+                return error_response(f"Invalid {prefix}: {error}", 400)
+
+        try:
+            safety = float(request.args.get('safety', 1))
+        except ValueError:
+            return error_response("Invalid safety", 400)
+        if not 0 <= safety <= Config.ROUTE_MAX_SAFETY:
+            return error_response(f"safety must be between 0 and {Config.ROUTE_MAX_SAFETY}", 400)
+
+        compare = request.args.get('compare', 'false').lower() in ('1', 'true', 'yes')
+
+        if not safe_route.enabled or not safe_route.available:
+            return error_response("Safe routing needs a road graph (ROAD_GRAPH_PATH)", 503)
+
+        route = safe_route.route(
+            float(params['origin_lat']), float(params['origin_lon']),
+            float(params['dest_lat']), float(params['dest_lon']),
+            safety=safety, compare=compare
+        )
+        if route is None:
+            return error_response("No road route between these points", 404)
+
+        return success_response(route, "Route computed successfully")
+
+    except Exception as e:
+        return error_response(f"Failed to compute route: {str(e)}", 500)
@@ -2,6 +2,7 @@
 from flask import Blueprint, request
 from services.user_stats_service import UserStatsService
 from utils.response import success_response, error_response
+from utils.cache import response_cache
 from middleware.auth import token_required, role_required, get_current_user
 
 stats_bp = Blueprint('stats', __name__, url_prefix='/api/stats')
@@ -32,6 +33,7 @@ def get_specific_user_stats(user_id):
         return error_response(f"Failed to get user stats: {str(e)}", 500)
 
 @stats_bp.route('/leaderboard', methods=['GET'])
+@response_cache.cached('leaderboard', ttl=120, maxsize=32)
 def get_leaderboard():
     """Get top contributing users leaderboard"""
     try:
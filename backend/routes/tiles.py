@@ -0,0 +1,38 @@
+"""Vector tile routes for the map layers"""
+from flask import Blueprint, request, Response
+from services.vector_tiles import vector_tiles, LAYERS
+from utils.response import error_response
+from utils.tiles import valid_tile
+
+tiles_bp = Blueprint('tiles', __name__, url_prefix='/tiles')
+
+MVT_MIMETYPE = 'application/vnd.mapbox-vector-tile'
+
+@tiles_bp.route('/<layer>/<int:z>/<int:x>/<int:y>.mvt', methods=['GET'])
+def get_vector_tile(layer, z, x, y):
+    """
+    Get a map layer as a Mapbox Vector Tile
+
+    Layers are accidents (last VECTOR_TILE_ACCIDENT_DAYS days), alerts
+    (active) and emergency_services. Low zooms return clusters with a
+    point_count. Responses carry a strong ETag for revalidation.
+    """
+    try:
+        if not vector_tiles.enabled:
+            return error_response("Vector tiles are disabled", 404)
+
+        if layer not in LAYERS:
+            return error_response(f"Unknown layer. Must be one of: {', '.join(LAYERS)}", 404)
+
+        if not valid_tile(z, x, y):
+            return error_response("Invalid tile address", 400)
+
+        body, etag = vector_tiles.get_tile(layer, z, x, y)
+
+        response = Response(body, mimetype=MVT_MIMETYPE)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = f'public, max-age={vector_tiles.ttl}'
+        return response.make_conditional(request)
+
+    except Exception as e:
+        return error_response(f"Failed to get vector tile: {str(e)}", 500)
@@ -28,6 +28,8 @@ CREATE TABLE IF NOT EXISTS accidents (
     severity ENUM('low', 'medium', 'high') NOT NULL,
     description TEXT,
     image_path VARCHAR(255),
+    image_status ENUM('none', 'pending', 'ready', 'failed') DEFAULT 'none',
+    report_count INT NOT NULL DEFAULT 1,
     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     status ENUM('reported', 'verified', 'resolved') DEFAULT 'reported',
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
@@ -35,7 +37,8 @@ CREATE TABLE IF NOT EXISTS accidents (
     INDEX idx_severity (severity),
     INDEX idx_type (accident_type),
     INDEX idx_timestamp (timestamp),
-    INDEX idx_status (status)
+    INDEX idx_status (status),
+    INDEX idx_image_path (image_path)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Alerts table
@@ -58,6 +61,23 @@ CREATE TABLE IF NOT EXISTS alerts (
     INDEX idx_created (created_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- Expired and dismissed alerts moved out of alerts by the expiry scheduler
+CREATE TABLE IF NOT EXISTS alerts_archive (
+    id INT PRIMARY KEY,
+    accident_id INT,
+    alert_type ENUM('accident', 'zone_warning', 'custom') NOT NULL,
+    severity ENUM('low', 'medium', 'high') NOT NULL,
+    latitude DECIMAL(10, 8) NOT NULL,
+    longitude DECIMAL(11, 8) NOT NULL,
+    radius DECIMAL(5, 2) DEFAULT 5.0,
+    message TEXT NOT NULL,
+    created_at TIMESTAMP NULL,
+    expires_at TIMESTAMP NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_accident (accident_id),
+    INDEX idx_created (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- Emergency services table (hospitals, police, ambulance)
 CREATE TABLE IF NOT EXISTS emergency_services (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -101,12 +121,111 @@ CREATE TABLE IF NOT EXISTS notifications (
     is_read BOOLEAN DEFAULT FALSE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-    FOREIGN KEY (alert_id) REFERENCES alerts(id) ON DELETE CASCADE,
-    INDEX idx_user (user_id),
-    INDEX idx_read (is_read),
+    FOREIGN KEY (alert_id) REFERENCES alerts(id) ON DELETE SET NULL,
+    INDEX idx_user_read (user_id, is_read, created_at),
     INDEX idx_created (created_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- Last known location of each user, used to target alert notifications
+CREATE TABLE IF NOT EXISTS user_locations (
+    user_id INT PRIMARY KEY,
+    latitude DECIMAL(10, 8) NOT NULL,
+    longitude DECIMAL(11, 8) NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    INDEX idx_updated (updated_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Hourly accident rollups for analytics (rebuild with: flask --app app rebuild-rollups)
+CREATE TABLE IF NOT EXISTS accident_rollups_hourly (
+    bucket_start DATETIME NOT NULL,
+    severity ENUM('low', 'medium', 'high') NOT NULL,
+    accident_type ENUM('collision', 'fire', 'injury', 'pedestrian', 'vehicle_breakdown', 'other') NOT NULL,
+    accident_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket_start, severity, accident_type)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Precomputed accident-prone zones (DBSCAN clusters), replaced on each refresh
+CREATE TABLE IF NOT EXISTS accident_zones (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    centroid_lat DECIMAL(10, 8) NOT NULL,
+    centroid_lon DECIMAL(11, 8) NOT NULL,
+    radius_km DECIMAL(8, 3) NOT NULL,
+    accident_count INT NOT NULL,
+    low_count INT NOT NULL DEFAULT 0,
+    medium_count INT NOT NULL DEFAULT 0,
+    high_count INT NOT NULL DEFAULT 0,
+    score INT NOT NULL,
+    polygon JSON NOT NULL,
+    min_lat DECIMAL(10, 8) NOT NULL,
+    max_lat DECIMAL(10, 8) NOT NULL,
+    min_lon DECIMAL(11, 8) NOT NULL,
+    max_lon DECIMAL(11, 8) NOT NULL,
+    last_accident_at TIMESTAMP NULL,
+    window_days INT NOT NULL,
+    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_score (score),
+    INDEX idx_count (accident_count)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Background image processing jobs
+CREATE TABLE IF NOT EXISTS image_jobs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    accident_id INT NOT NULL,
+    image_path VARCHAR(255) NOT NULL,
+    status ENUM('pending', 'processing', 'done', 'failed') DEFAULT 'pending',
+    attempts INT NOT NULL DEFAULT 0,
+    claimed_by VARCHAR(64),
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (accident_id) REFERENCES accidents(id) ON DELETE CASCADE,
+    INDEX idx_status (status, id),
+    INDEX idx_claimed (claimed_by)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Additional citizen reports merged into an existing accident
+CREATE TABLE IF NOT EXISTS accident_reports (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    accident_id INT NOT NULL,
+    user_id INT NOT NULL,
+    latitude DECIMAL(10, 8) NOT NULL,
+    longitude DECIMAL(11, 8) NOT NULL,
+    severity ENUM('low', 'medium', 'high') NOT NULL,
+    description TEXT,
+    image_path VARCHAR(255),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (accident_id) REFERENCES accidents(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    INDEX idx_accident (accident_id),
+    INDEX idx_created (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Resized derivatives of accident images (one row per size and format)
+CREATE TABLE IF NOT EXISTS accident_images (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    accident_id INT NOT NULL,
+    variant ENUM('thumb', 'medium', 'full') NOT NULL,
+    format VARCHAR(10) NOT NULL,
+    image_path VARCHAR(255) NOT NULL,
+    width INT NOT NULL,
+    height INT NOT NULL,
+    bytes INT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (accident_id) REFERENCES accidents(id) ON DELETE CASCADE,
+    UNIQUE KEY uniq_variant (accident_id, variant, format)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Content-addressed upload blobs with reference counts
+CREATE TABLE IF NOT EXISTS upload_blobs (
+    sha256 CHAR(64) PRIMARY KEY,
+    image_path VARCHAR(255) NOT NULL,
+    bytes BIGINT NOT NULL,
+    ref_count INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uniq_path (image_path)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- Insert sample emergency services data
 INSERT INTO emergency_services (name, type, latitude, longitude, address, phone) VALUES
 ('City General Hospital', 'hospital', 28.6139, 77.2090, '123 Main Street, Delhi', '+91-11-12345678'),
@@ -117,3 +236,12 @@ INSERT INTO emergency_services (name, type, latitude, longitude, address, phone)
 -- Password hash for 'admin123' using bcrypt
 INSERT INTO users (username, email, password_hash, role) VALUES
 ('admin', 'admin@saferoute.com', '$2b$12$LQv3c1yqBWVHxkd0LHAkCOYz6TtxMQJqhN8/LewY5GyYqgdMStzCS', 'admin');
+
+-- Upgrading an existing database: CREATE TABLE IF NOT EXISTS does not add
+-- columns to existing tables, so apply these once by hand.
+-- ALTER TABLE accidents ADD COLUMN image_status ENUM('none', 'pending', 'ready', 'failed') DEFAULT 'none' AFTER image_path;
+-- ALTER TABLE accidents ADD INDEX idx_image_path (image_path);
+-- ALTER TABLE accidents ADD COLUMN report_count INT NOT NULL DEFAULT 1 AFTER image_status;
+-- ALTER TABLE notifications ADD INDEX idx_user_read (user_id, is_read, created_at), DROP INDEX idx_user, DROP INDEX idx_read;
+-- Keep notifications when their alert is archived (check the constraint name with SHOW CREATE TABLE notifications):
+-- ALTER TABLE notifications DROP FOREIGN KEY notifications_ibfk_2, ADD FOREIGN KEY (alert_id) REFERENCES alerts(id) ON DELETE SET NULL;
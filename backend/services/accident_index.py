@@ -0,0 +1,258 @@
+"""In-memory spatial index of recent accidents for live map queries"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from dateutil import parser as date_parser
+from database import Database
+from utils import events
+from utils.spatial import GridIndex
+
+logger = logging.getLogger(__name__)
+
+class LiveAccidentIndex:
+    """
+    Grid index over accidents reported within a sliding time window
+
+    Radius queries whose date range falls inside the window are answered
+    in-process with exact haversine filtering; everything else falls back
+    to MySQL through Accident.get_all.
+    """
+
+    EVICT_INTERVAL_SECONDS = 60
+
+    def __init__(self, window_hours=24, cell_size_deg=0.01):
+        self.window_hours = window_hours
+        self.enabled = True
+        self._grid = GridIndex(cell_size_deg)
+        self._rows = {}
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        self._pending = None
+        self._last_evict = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        """Configure from the Flask app and subscribe to accident writes"""
+        self.enabled = app.config.get('LIVE_INDEX_ENABLED', True)
+        self.window_hours = app.config.get('LIVE_INDEX_WINDOW_HOURS', self.window_hours)
+        self._grid = GridIndex(app.config.get('LIVE_INDEX_CELL_DEG', self._grid.cell_size))
+        self._rows = {}
+        self._loaded = False
+        self._pending = None
+
+        if self.enabled:
+            events.subscribe('accident.created', self._on_created)
+            events.subscribe('accident.created_batch', self._on_created_batch)
+            events.subscribe('accident.updated', self._on_updated)
+            events.subscribe('accident.deleted', self._on_deleted)
+
+    @property
+    def horizon(self):
+        """Oldest timestamp held by the index"""
+        return datetime.now() - timedelta(hours=self.window_hours)
+
+    def _ensure_loaded(self):
+        """
+        Load the current window from the database on first use
+
+        Accident events that arrive while the SELECT runs are queued and
+        replayed on top of it; every handler is idempotent, so events for
+        writes the SELECT already saw do no harm.
+        """
+        if self._loaded:
+            return
+
+        with self._load_lock:
+            if self._loaded:
+                return
+
+            with self._lock:
+                self._pending = []
+
+            query = """
+                SELECT a.*, u.username
+                FROM accidents a
+                JOIN users u ON a.user_id = u.id
+                WHERE a.timestamp >= %s
+            """
+            try:
+                rows = Database.execute_query(query, (self.horizon,), fetch_all=True) or []
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                raise
+
+            with self._lock:
+                self._grid.clear()
+                self._rows = {}
+                for row in rows:
+                    self._add(row)
+                self._loaded = True
+                self._last_evict = time.monotonic()
+
+                pending, self._pending = self._pending, None
+                for handler, kwargs in pending:
+                    handler(**kwargs)
+
+        logger.info(f"Live accident index loaded {len(rows)} accidents")
+
+    def _add(self, row):
+        row = dict(row)
+        row.pop('email', None)
+        self._rows[row['id']] = row
+        self._grid.insert(row['id'], row['latitude'], row['longitude'])
+
+    def _evict_expired(self):
+        """Drop accidents that have aged out of the window"""
+        now = time.monotonic()
+        if now - self._last_evict < self.EVICT_INTERVAL_SECONDS:
+            return
+
+        horizon = self.horizon
+        expired = [
+            accident_id for accident_id, row in self._rows.items()
+            if row['timestamp'] and row['timestamp'] < horizon
+        ]
+        for accident_id in expired:
+            self._rows.pop(accident_id, None)
+            self._grid.remove(accident_id)
+        self._last_evict = now
+
+    def _deferred(self, handler, **kwargs):
+        """
+        Queue an event while the window is loading; call with the lock held
+
+        Returns:
+            True if the handler should not apply the event now
+        """
+        if self._pending is not None:
+            self._pending.append((handler, kwargs))
+            return True
+        return not self._loaded
+
+    def _on_created(self, accident, **kwargs):
+        if not accident:
+            return
+        with self._lock:
+            if self._deferred(self._on_created, accident=accident):
+                return
+            self._add(accident)
+
+    def _on_created_batch(self, accidents, **kwargs):
+        horizon = self.horizon
+        with self._lock:
+            if self._deferred(self._on_created_batch, accidents=accidents):
+                return
+            for accident in accidents:
+                # Partner feeds may carry incident times older than the window
+                if accident['timestamp'] >= horizon:
+                    self._add(accident)
+
+    def _on_updated(self, accident_id, fields, **kwargs):
+        with self._lock:
+            if self._deferred(self._on_updated, accident_id=accident_id, fields=fields):
+                return
+            row = self._rows.get(accident_id)
+            if row is not None:
+                row.update(fields)
+
+    def _on_deleted(self, accident_id, **kwargs):
+        with self._lock:
+            if self._deferred(self._on_deleted, accident_id=accident_id):
+                return
+            self._rows.pop(accident_id, None)
+            self._grid.remove(accident_id)
+
+    @staticmethod
+    def _parse_date(value):
+        try:
+            parsed = value if isinstance(value, datetime) else date_parser.parse(value)
+        except (ValueError, TypeError, OverflowError):
+            return None
+        # Stored timestamps are naive local time, like MySQL's session time
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone().replace(tzinfo=None)
+        return parsed
+
+    def _matches(self, row, filters, end_date):
+        if 'severity' in filters and row['severity'] != filters['severity']:
+            return False
+        if 'accident_type' in filters and row['accident_type'] != filters['accident_type']:
+            return False
+        if 'status' in filters and row['status'] != filters['status']:
+            return False
+        if end_date is not None and row['timestamp'] > end_date:
+            return False
+        return True
+
+    def lookup(self, filters, limit=100, offset=0, after=None):
+        """
+        Answer a radius query from memory if the date range allows it
+
+        Args:
+            filters: Accident.get_all filter dict
+            limit: Maximum number of results
+            offset: Offset for pagination
+            after: Optional (timestamp, id) keyset position
+
+        Returns:
+            List of accidents, or None if the query must go to MySQL
+        """
+        if not self.enabled or not filters:
+            return None
+        if not all(k in filters for k in ['latitude', 'longitude', 'radius']):
+            return None
+
+        start_date = self._parse_date(filters['start_date']) if 'start_date' in filters else None
+        end_date = self._parse_date(filters['end_date']) if 'end_date' in filters else None
+
+        # Only ranges entirely inside the window can be served from memory
+        if start_date is None or start_date < self.horizon or \
+                ('end_date' in filters and end_date is None):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        self._ensure_loaded()
+
+        with self._lock:
+            self._evict_expired()
+
+            matches = []
+            for accident_id, distance in self._grid.query_radius(
+                filters['latitude'], filters['longitude'], filters['radius']
+            ):
+                row = self._rows[accident_id]
+                if row['timestamp'] < start_date:
+                    continue
+                if self._matches(row, filters, end_date):
+                    matches.append(row)
+
+            matches.sort(key=lambda r: (r['timestamp'], r['id']), reverse=True)
+            if after is not None:
+                matches = [r for r in matches if (r['timestamp'], r['id']) < after]
+                offset = 0
+
+            self.hits += 1
+            return [dict(row) for row in matches[offset:offset + limit]]
+
+    def stats(self):
+        """Get index size and hit/miss counters"""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+            size = len(self._rows)
+        total = hits + misses
+        return {
+            'enabled': self.enabled,
+            'loaded': self._loaded,
+            'window_hours': self.window_hours,
+            'size': size,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else 0
+        }
+
+live_accident_index = LiveAccidentIndex()
@@ -0,0 +1,215 @@
+"""Geo-indexed fan-out of new alerts to streaming subscribers"""
+import itertools
+import logging
+import math
+import queue
+import threading
+from flask import json
+from utils import events
+from utils.geolocation import get_bounding_box, haversine_distance
+
+logger = logging.getLogger(__name__)
+
+class Subscriber:
+    """One open alert stream and its pending messages"""
+
+    __slots__ = ('id', 'latitude', 'longitude', 'radius_km', 'cells', 'closed', '_queue')
+
+    def __init__(self, subscriber_id, latitude, longitude, radius_km, queue_size):
+        self.id = subscriber_id
+        self.latitude = latitude
+        self.longitude = longitude
+        self.radius_km = radius_km
+        self.cells = ()
+        self.closed = False
+        self._queue = queue.Queue(maxsize=queue_size)
+
+    def matches(self, latitude, longitude):
+        if self.latitude is None:
+            return True
+        return haversine_distance(self.latitude, self.longitude, latitude, longitude) <= self.radius_km
+
+    def put(self, message):
+        """Queue a message; False if the subscriber has fallen too far behind"""
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except queue.Full:
+            return False
+
+    def get(self, timeout):
+        """Wait for the next message, or None after timeout seconds"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+class AlertBroker:
+    """
+    Pushes new alerts to the subscribers whose circle contains them
+
+    A subscriber's circle is listed in every grid cell its bounding box
+    overlaps, so an alert only checks the subscribers listed in its own
+    cell, however many streams are open. Subscribers without a location
+    receive every alert. Circles that would span more than max_cells
+    cells (near the poles, where a box of longitude grows without
+    bound) or that cross the antimeridian are kept with them and
+    filtered by distance instead.
+
+    When an alert expires, the subscribers whose area contains it get an
+    expired event carrying its ID so clients can take it off the map.
+
+    Messages are encoded once per alert and shared by every subscriber. A
+    subscriber whose queue fills up is dropped; its client reconnects with
+    Last-Event-ID and catches up from the database.
+    """
+
+    def __init__(self, cell_size_deg=0.05, max_subscribers=10000, queue_size=100, max_cells=4096):
+        self.enabled = True
+        self.cell_size = cell_size_deg
+        self.max_cells = max_cells
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self.heartbeat_seconds = 20
+        self._cells = {}
+        self._everywhere = set()
+        self._subscribers = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def init_app(self, app):
+        """Configure from the Flask app and subscribe to alert writes"""
+        self.enabled = app.config.get('ALERT_STREAM_ENABLED', True)
+        self.max_subscribers = app.config.get('ALERT_STREAM_MAX_SUBSCRIBERS', self.max_subscribers)
+        self.queue_size = app.config.get('ALERT_STREAM_QUEUE_SIZE', self.queue_size)
+        self.heartbeat_seconds = app.config.get('ALERT_STREAM_HEARTBEAT_SECONDS', self.heartbeat_seconds)
+
+        if self.enabled:
+            events.subscribe('alert.created', self._on_created)
+            events.subscribe('alert.created_batch', self._on_created_batch)
+            events.subscribe('alert.expired', self._on_expired)
+
+    def _cell(self, latitude, longitude):
+        return (math.floor(latitude / self.cell_size), math.floor(longitude / self.cell_size))
+
+    def _covered_cells(self, latitude, longitude, radius_km):
+        """Cells under a circle's bounding box, or None if there are too many to list"""
+        if abs(latitude) >= 90:
+            return None
+        min_lat, max_lat, min_lon, max_lon = get_bounding_box(latitude, longitude, radius_km)
+        if min_lon < -180 or max_lon > 180:
+            return None
+        row0, col0 = self._cell(max(min_lat, -90.0), min_lon)
+        row1, col1 = self._cell(min(max_lat, 90.0), max_lon)
+        if (row1 - row0 + 1) * (col1 - col0 + 1) > self.max_cells:
+            return None
+        return [(row, col) for row in range(row0, row1 + 1) for col in range(col0, col1 + 1)]
+
+    def subscribe(self, latitude=None, longitude=None, radius_km=None):
+        """
+        Open a subscription
+
+        Args:
+            latitude, longitude: Centre of the area of interest, or None
+                                 to receive every alert
+            radius_km: Radius of the area of interest
+
+        Returns:
+            Subscriber, or None if the node is at max_subscribers
+        """
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+
+            subscriber = Subscriber(next(self._ids), latitude, longitude, radius_km, self.queue_size)
+            self._subscribers[subscriber.id] = subscriber
+
+            cells = None if latitude is None else self._covered_cells(latitude, longitude, radius_km)
+            if cells is None:
+                # matches() still applies the circle, if any
+                self._everywhere.add(subscriber)
+            else:
+                subscriber.cells = cells
+                for cell in cells:
+                    self._cells.setdefault(cell, set()).add(subscriber)
+
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """Close a subscription; safe to call more than once"""
+        with self._lock:
+            subscriber.closed = True
+            if self._subscribers.pop(subscriber.id, None) is None:
+                return
+
+            self._everywhere.discard(subscriber)
+            for cell in subscriber.cells:
+                members = self._cells.get(cell)
+                if members is not None:
+                    members.discard(subscriber)
+                    if not members:
+                        del self._cells[cell]
+
+    def match(self, latitude, longitude):
+        """Get the subscribers whose area contains a coordinate"""
+        latitude, longitude = float(latitude), float(longitude)
+        with self._lock:
+            candidates = list(self._cells.get(self._cell(latitude, longitude), ()))
+            candidates.extend(self._everywhere)
+        return [s for s in candidates if s.matches(latitude, longitude)]
+
+    @staticmethod
+    def format_event(alert):
+        """Encode an alert as a server-sent event"""
+        return f"id: {alert['id']}\nevent: alert\ndata: {json.dumps(alert)}\n\n"
+
+    def publish(self, alert):
+        """Deliver an alert to every matching subscriber"""
+        self.published += 1
+        self._deliver(alert, self.format_event)
+
+    def publish_expired(self, alert):
+        """Tell every matching subscriber that an alert has expired"""
+        self._deliver(alert, lambda a: f"event: expired\ndata: {json.dumps({'id': a['id']})}\n\n")
+
+    def _deliver(self, alert, encode):
+        subscribers = self.match(alert['latitude'], alert['longitude'])
+        if not subscribers:
+            return
+
+        message = encode(alert)
+        for subscriber in subscribers:
+            if subscriber.put(message):
+                self.delivered += 1
+            else:
+                self.dropped += 1
+                self.unsubscribe(subscriber)
+
+    def _on_created(self, alert, **kwargs):
+        if alert:
+            self.publish(alert)
+
+    def _on_created_batch(self, alerts, **kwargs):
+        for alert in alerts:
+            self.publish(alert)
+
+    def _on_expired(self, alerts, **kwargs):
+        for alert in alerts:
+            self.publish_expired(alert)
+
+    def stats(self):
+        """Get subscriber and delivery counters"""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'subscribers': len(self._subscribers),
+                'cells': len(self._cells),
+                'published': self.published,
+                'delivered': self.delivered,
+                'dropped': self.dropped
+            }
+
+alert_broker = AlertBroker()
@@ -0,0 +1,227 @@
+"""Background expiry and archival of alerts"""
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from database import Database
+from utils import events
+
+logger = logging.getLogger(__name__)
+
+class AlertExpiryScheduler:
+    """
+    Deactivates alerts when their expires_at passes
+
+    Active alerts with an expiry sit in a min-heap keyed on expires_at. A
+    worker thread sleeps until the earliest one is due, flips everything
+    due in batched UPDATEs and emits alert.expired, so is_active alone
+    tells live rows from stale ones and readers can drop the expires_at
+    filter. Alerts are pushed onto the heap by the alert.created events;
+    alerts created by other processes are picked up every sync_seconds
+    by ID.
+
+    Inactive alerts older than archive_after_days are moved to
+    alerts_archive so the hot table only holds recent rows.
+    """
+
+    def __init__(self, sync_seconds=60, batch_size=1000, archive_after_days=7, archive_interval_minutes=60):
+        self.enabled = True
+        self.sync_seconds = sync_seconds
+        self.batch_size = batch_size
+        self.archive_after_days = archive_after_days
+        self.archive_interval_minutes = archive_interval_minutes
+        self._heap = []
+        self._scheduled = set()
+        self._cancelled = set()
+        self._last_id = 0
+        self._last_sync = float('-inf')
+        self._last_archive = float('-inf')
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._stopping = False
+        self.expired = 0
+        self.archived = 0
+
+    def init_app(self, app):
+        """Configure from the Flask app, subscribe to alert writes and start the worker"""
+        self.enabled = app.config.get('ALERT_EXPIRY_ENABLED', True)
+        self.sync_seconds = app.config.get('ALERT_EXPIRY_SYNC_SECONDS', self.sync_seconds)
+        self.batch_size = app.config.get('ALERT_EXPIRY_BATCH_SIZE', self.batch_size)
+        self.archive_after_days = app.config.get('ALERT_ARCHIVE_AFTER_DAYS', self.archive_after_days)
+        self.archive_interval_minutes = app.config.get(
+            'ALERT_ARCHIVE_INTERVAL_MINUTES', self.archive_interval_minutes
+        )
+
+        if self.enabled:
+            events.subscribe('alert.created', self._on_created)
+            events.subscribe('alert.created_batch', self._on_created_batch)
+            events.subscribe('alert.deactivated', self._on_deactivated)
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='alert-expiry', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Ask the worker thread to exit"""
+        self._stopping = True
+        self._wakeup.set()
+
+    def _push(self, alert):
+        if not alert.get('expires_at') or not alert.get('is_active', True):
+            return
+        entry = (alert['expires_at'], alert['id'], float(alert['latitude']), float(alert['longitude']))
+        with self._lock:
+            if alert['id'] in self._scheduled:
+                return
+            self._scheduled.add(alert['id'])
+            heapq.heappush(self._heap, entry)
+            earliest = self._heap[0] is entry
+        if earliest:
+            self._wakeup.set()
+
+    def _on_created(self, alert, **kwargs):
+        if alert:
+            self._push(alert)
+
+    def _on_created_batch(self, alerts, **kwargs):
+        for alert in alerts:
+            self._push(alert)
+
+    def _on_deactivated(self, alert_id, **kwargs):
+        # Only alerts still on the heap need skipping when they come due
+        with self._lock:
+            if alert_id in self._scheduled:
+                self._cancelled.add(alert_id)
+
+    def sync(self):
+        """Push active alerts with IDs above the last one seen onto the heap"""
+        query = """
+            SELECT id, latitude, longitude, expires_at
+            FROM alerts
+            WHERE id > %s AND is_active = TRUE AND expires_at IS NOT NULL
+            ORDER BY id
+        """
+        rows = Database.execute_query(query, (self._last_id,), fetch_all=True) or []
+        for row in rows:
+            self._push(row)
+        if rows:
+            self._last_id = rows[-1]['id']
+        self._last_sync = time.monotonic()
+
+    def _pop_due(self, now):
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                expires_at, alert_id, latitude, longitude = heapq.heappop(self._heap)
+                self._scheduled.discard(alert_id)
+                if alert_id in self._cancelled:
+                    self._cancelled.discard(alert_id)
+                    continue
+                due.append({
+                    'id': alert_id, 'latitude': latitude, 'longitude': longitude, 'expires_at': expires_at
+                })
+        return due
+
+    def expire_due(self):
+        """
+        Deactivate every alert whose expiry has passed
+
+        Returns:
+            Number of alerts expired
+        """
+        due = self._pop_due(datetime.now())
+        for start in range(0, len(due), self.batch_size):
+            batch = due[start:start + self.batch_size]
+            placeholders = ', '.join(['%s'] * len(batch))
+            query = f"UPDATE alerts SET is_active = FALSE WHERE id IN ({placeholders}) AND is_active = TRUE"
+            try:
+                Database.execute_query(query, tuple(a['id'] for a in batch), commit=True)
+            except Exception:
+                # Retry the rest on the next pass
+                for alert in due[start:]:
+                    self._push(alert)
+                raise
+
+            self.expired += len(batch)
+            events.emit('alert.expired', alerts=batch)
+
+        return len(due)
+
+    def archive(self):
+        """
+        Move inactive alerts older than archive_after_days to alerts_archive
+
+        Returns:
+            Number of alerts archived
+        """
+        cutoff = datetime.now() - timedelta(days=self.archive_after_days)
+        total = 0
+        while True:
+            rows = Database.execute_query("""
+                SELECT id FROM alerts
+                WHERE is_active = FALSE AND COALESCE(expires_at, created_at) < %s
+                ORDER BY id
+                LIMIT %s
+            """, (cutoff, self.batch_size), fetch_all=True) or []
+            if not rows:
+                break
+
+            ids = tuple(row['id'] for row in rows)
+            placeholders = ', '.join(['%s'] * len(ids))
+            Database.execute_query(f"""
+                INSERT IGNORE INTO alerts_archive
+                (id, accident_id, alert_type, severity, latitude, longitude, radius, message, created_at, expires_at)
+                SELECT id, accident_id, alert_type, severity, latitude, longitude, radius, message, created_at, expires_at
+                FROM alerts
+                WHERE id IN ({placeholders})
+            """, ids, commit=True)
+            Database.execute_query(f"DELETE FROM alerts WHERE id IN ({placeholders})", ids, commit=True)
+            total += len(ids)
+
+        self.archived += total
+        self._last_archive = time.monotonic()
+        return total
+
+    def _seconds_until_due(self):
+        with self._lock:
+            if not self._heap:
+                return None
+            return (self._heap[0][0] - datetime.now()).total_seconds()
+
+    def _run(self):
+        while not self._stopping:
+            failed = False
+            try:
+                if time.monotonic() - self._last_sync >= self.sync_seconds:
+                    self.sync()
+                self.expire_due()
+                if self.archive_after_days and \
+                        time.monotonic() - self._last_archive >= self.archive_interval_minutes * 60:
+                    self.archive()
+            except Exception as e:
+                logger.error(f"Alert expiry failed: {e}")
+                failed = True
+
+            wait = self.sync_seconds
+            until_due = self._seconds_until_due()
+            if until_due is not None and not failed:
+                wait = max(0.0, min(wait, until_due))
+            self._wakeup.wait(wait)
+            self._wakeup.clear()
+
+    def stats(self):
+        """Get heap size and counters"""
+        with self._lock:
+            scheduled = len(self._heap)
+            next_expiry = self._heap[0][0].isoformat() if self._heap else None
+        return {
+            'enabled': self.enabled,
+            'scheduled': scheduled,
+            'next_expiry': next_expiry,
+            'expired': self.expired,
+            'archived': self.archived
+        }
+
+alert_expiry = AlertExpiryScheduler()
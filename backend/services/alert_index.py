@@ -0,0 +1,191 @@
+"""In-memory R-tree of active alert circles"""
+import logging
+import threading
+import time
+from datetime import datetime
+from models.alert import Alert
+from utils import events
+from utils.geolocation import get_bounding_box, haversine_distance
+from utils.spatial import RTree
+
+logger = logging.getLogger(__name__)
+
+class ActiveAlertIndex:
+    """
+    Answers "which active alerts cover this position" from memory
+
+    Every active alert is held as the bounding box of its own radius in an
+    STR-packed RTree, so a lookup only measures the alerts whose box
+    contains the position and keeps those within their radius. Alert
+    writes in this process update the rows and mark the tree for a rebuild
+    on the next lookup. The whole set is reloaded every refresh_seconds to
+    pick up alerts created or dismissed by other processes.
+    """
+
+    def __init__(self, refresh_seconds=30):
+        self.enabled = True
+        self.refresh_seconds = refresh_seconds
+        self._rows = {}
+        self._tree = RTree()
+        self._dirty = False
+        self._loaded_at = None
+        self._pending = None
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self.lookups = 0
+        self.rebuilds = 0
+
+    def init_app(self, app):
+        """Configure from the Flask app and subscribe to alert writes"""
+        self.enabled = app.config.get('ALERT_INDEX_ENABLED', True)
+        self.refresh_seconds = app.config.get('ALERT_INDEX_REFRESH_SECONDS', self.refresh_seconds)
+
+        if self.enabled:
+            events.subscribe('alert.created', self._on_created)
+            events.subscribe('alert.created_batch', self._on_created_batch)
+            events.subscribe('alert.deactivated', self._on_deactivated)
+            events.subscribe('alert.expired', self._on_expired)
+
+    def _stale(self):
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_seconds
+
+    def _reload(self):
+        """
+        Reload the active alerts from the database
+
+        Only one thread reloads at a time; once the index is loaded, other
+        lookups keep serving the current rows meanwhile. Alert events that
+        arrive while the SELECT runs are replayed on top of its result, so
+        the snapshot cannot bring back an alert dismissed in between.
+        """
+        if not self._load_lock.acquire(blocking=self._loaded_at is None):
+            return
+        try:
+            if not self._stale():
+                return
+
+            with self._lock:
+                self._pending = []
+            try:
+                rows = Alert.get_active_alerts()
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                raise
+
+            with self._lock:
+                self._rows = {row['id']: row for row in rows}
+                self._dirty = True
+                self._loaded_at = time.monotonic()
+
+                pending, self._pending = self._pending, None
+                for handler, kwargs in pending:
+                    handler(**kwargs)
+        finally:
+            self._load_lock.release()
+
+        logger.info(f"Active alert index loaded {len(rows)} alerts")
+
+    def _rebuild(self):
+        """Repack the tree from the current rows; caller holds the lock"""
+        entries = []
+        for row in self._rows.values():
+            min_lat, max_lat, min_lon, max_lon = get_bounding_box(
+                float(row['latitude']), float(row['longitude']), float(row['radius'] or 0)
+            )
+            entries.append((min_lat, max_lat, min_lon, max_lon, row['id']))
+        self._tree = RTree(entries)
+        self._dirty = False
+        self.rebuilds += 1
+
+    def _record(self, handler, **kwargs):
+        """
+        Queue an event for replay while a reload runs; call with the lock held
+
+        Returns:
+            True if rows are loaded and the event should be applied to them
+        """
+        if self._pending is not None:
+            self._pending.append((handler, kwargs))
+        return self._loaded_at is not None
+
+    def _on_created(self, alert, **kwargs):
+        if not alert:
+            return
+        with self._lock:
+            if not self._record(self._on_created, alert=alert):
+                return
+            self._rows[alert['id']] = dict(alert)
+            self._dirty = True
+
+    def _on_created_batch(self, alerts, **kwargs):
+        with self._lock:
+            if not self._record(self._on_created_batch, alerts=alerts):
+                return
+            for alert in alerts:
+                self._rows[alert['id']] = dict(alert)
+            self._dirty = True
+
+    def _on_deactivated(self, alert_id, **kwargs):
+        with self._lock:
+            if not self._record(self._on_deactivated, alert_id=alert_id):
+                return
+            if self._rows.pop(alert_id, None) is not None:
+                self._dirty = True
+
+    def _on_expired(self, alerts, **kwargs):
+        with self._lock:
+            if not self._record(self._on_expired, alerts=alerts):
+                return
+            for alert in alerts:
+                if self._rows.pop(alert['id'], None) is not None:
+                    self._dirty = True
+
+    def covering(self, latitude, longitude, radius_km=0):
+        """
+        Get the active alerts whose circle reaches a position
+
+        Args:
+            latitude, longitude: Position to test
+            radius_km: Also include alerts whose circle comes within this
+                       distance of the position
+
+        Returns:
+            List of alerts, newest first, each with its distance_km from
+            the position
+        """
+        if self._stale():
+            self._reload()
+
+        now = datetime.now()
+        with self._lock:
+            if self._dirty:
+                self._rebuild()
+
+            min_lat, max_lat, min_lon, max_lon = get_bounding_box(latitude, longitude, radius_km)
+            matches = []
+            for entry in self._tree.query_bbox(min_lat, max_lat, min_lon, max_lon):
+                row = self._rows[entry[4]]
+                if row['expires_at'] is not None and row['expires_at'] <= now:
+                    continue
+                distance = haversine_distance(
+                    latitude, longitude, float(row['latitude']), float(row['longitude'])
+                )
+                if distance <= float(row['radius'] or 0) + radius_km:
+                    matches.append(dict(row, distance_km=round(distance, 3)))
+            self.lookups += 1
+
+        matches.sort(key=lambda a: (a['created_at'], a['id']), reverse=True)
+        return matches
+
+    def stats(self):
+        """Get index size and counters"""
+        return {
+            'enabled': self.enabled,
+            'loaded': self._loaded_at is not None,
+            'size': len(self._rows),
+            'lookups': self.lookups,
+            'rebuilds': self.rebuilds
+        }
+
+alert_index = ActiveAlertIndex()
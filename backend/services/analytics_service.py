@@ -1,5 +1,6 @@
 """Analytics service for dashboard statistics"""
 from database import Database
+from services.zone_service import zone_service
 from datetime import datetime, timedelta
 
 class AnalyticsService:
@@ -7,53 +8,55 @@ class AnalyticsService:
     
     @staticmethod
     def get_dashboard_stats():
-        """Get comprehensive dashboard statistics"""
-        stats = {}
+        """
+        Get comprehensive dashboard statistics
         
-        # Total accidents
-        query = "SELECT COUNT(*) as total FROM accidents"
-        result = Database.execute_query(query, fetch_one=True)
-        stats['total_accidents'] = result['total'] if result else 0
+        All accident figures come from a single pass over accidents grouped
+        by (severity, accident_type), at most 18 rows, folded in Python.
+        """
+        stats = {
+            'total_accidents': 0,
+            'today_accidents': 0,
+            'week_accidents': 0,
+            'severity_distribution': {},
+            'type_distribution': {}
+        }
         
-        # Today's accidents
-        query = "SELECT COUNT(*) as today FROM accidents WHERE DATE(timestamp) = CURDATE()"
-        result = Database.execute_query(query, fetch_one=True)
-        stats['today_accidents'] = result['today'] if result else 0
+        # The all-time totals need every row, so this is one full scan with
+        # no index; today and the last 7 days are counted in the same pass
+        query = """
+            SELECT 
+                severity,
+                accident_type,
+                COUNT(*) as total,
+                SUM(timestamp >= CURDATE() AND timestamp < CURDATE() + INTERVAL 1 DAY) as today,
+                SUM(timestamp >= DATE_SUB(NOW(), INTERVAL 7 DAY)) as week
+            FROM accidents
+            GROUP BY severity, accident_type
+        """
+        rows = Database.execute_query(query, fetch_all=True) or []
         
-        # This week's accidents
-        query = "SELECT COUNT(*) as week FROM accidents WHERE timestamp >= DATE_SUB(NOW(), INTERVAL 7 DAY)"
-        result = Database.execute_query(query, fetch_one=True)
-        stats['week_accidents'] = result['week'] if result else 0
+        severity_dist = stats['severity_distribution']
+        type_dist = stats['type_distribution']
+        for row in rows:
+            total = int(row['total'])
+            stats['total_accidents'] += total
+            stats['today_accidents'] += int(row['today'] or 0)
+            stats['week_accidents'] += int(row['week'] or 0)
+            severity_dist[row['severity']] = severity_dist.get(row['severity'], 0) + total
+            type_dist[row['accident_type']] = type_dist.get(row['accident_type'], 0) + total
         
         # Active alerts
         query = "SELECT COUNT(*) as active FROM alerts WHERE is_active = TRUE"
         result = Database.execute_query(query, fetch_one=True)
         stats['active_alerts'] = result['active'] if result else 0
         
-        # Severity distribution
-        query = """
-            SELECT severity, COUNT(*) as count 
-            FROM accidents 
-            GROUP BY severity
-        """
-        severity_dist = Database.execute_query(query, fetch_all=True) or []
-        stats['severity_distribution'] = {item['severity']: item['count'] for item in severity_dist}
-        
-        # Type distribution
-        query = """
-            SELECT accident_type, COUNT(*) as count 
-            FROM accidents 
-            GROUP BY accident_type
-        """
-        type_dist = Database.execute_query(query, fetch_all=True) or []
-        stats['type_distribution'] = {item['accident_type']: item['count'] for item in type_dist}
-        
         return stats
     
     @staticmethod
     def get_accident_timeline(period='daily', days=30):
         """
-        Get accident timeline data
+        Get accident timeline data from the hourly rollups
         
         Args:
             period: 'daily' or 'hourly'
@@ -62,21 +65,23 @@ class AnalyticsService:
         if period == 'hourly':
             query = """
                 SELECT 
-                    HOUR(timestamp) as hour,
-                    COUNT(*) as count
-                FROM accidents
-                WHERE timestamp >= DATE_SUB(NOW(), INTERVAL %s DAY)
-                GROUP BY HOUR(timestamp)
+                    HOUR(bucket_start) as hour,
+                    CAST(SUM(accident_count) AS SIGNED) as count
+                FROM accident_rollups_hourly
+                WHERE bucket_start >= DATE_SUB(NOW(), INTERVAL %s DAY)
+                GROUP BY HOUR(bucket_start)
+                HAVING count > 0
                 ORDER BY hour
             """
         else:  # daily
             query = """
                 SELECT 
-                    DATE(timestamp) as date,
-                    COUNT(*) as count
-                FROM accidents
-                WHERE timestamp >= DATE_SUB(NOW(), INTERVAL %s DAY)
-                GROUP BY DATE(timestamp)
+                    DATE(bucket_start) as date,
+                    CAST(SUM(accident_count) AS SIGNED) as count
+                FROM accident_rollups_hourly
+                WHERE bucket_start >= DATE_SUB(NOW(), INTERVAL %s DAY)
+                GROUP BY DATE(bucket_start)
+                HAVING count > 0
                 ORDER BY date
             """
         
@@ -87,25 +92,17 @@ class AnalyticsService:
         """
         Identify accident-prone zones using clustering
         
+        Zones for the configured window come from the precomputed
+        accident_zones table; other windows are clustered on demand.
+        
         Args:
             min_accidents: Minimum accidents to consider a zone prone
             days: Number of days to analyze
         """
-        query = """
-            SELECT 
-                ROUND(latitude, 2) as lat_zone,
-                ROUND(longitude, 2) as lon_zone,
-                COUNT(*) as accident_count,
-                AVG(latitude) as avg_lat,
-                AVG(longitude) as avg_lon
-            FROM accidents
-            WHERE timestamp >= DATE_SUB(NOW(), INTERVAL %s DAY)
-            GROUP BY lat_zone, lon_zone
-            HAVING accident_count >= %s
-            ORDER BY accident_count DESC
-        """
+        if zone_service.enabled and days == zone_service.window_days:
+            return zone_service.get_zones(min_accidents)
         
-        return Database.execute_query(query, (days, min_accidents), fetch_all=True) or []
+        return zone_service.compute_zones(days, min_accidents)
     
     @staticmethod
     def get_severity_by_type():
@@ -114,9 +111,10 @@ class AnalyticsService:
             SELECT 
                 accident_type,
                 severity,
-                COUNT(*) as count
-            FROM accidents
+                CAST(SUM(accident_count) AS SIGNED) as count
+            FROM accident_rollups_hourly
             GROUP BY accident_type, severity
+            HAVING count > 0
             ORDER BY accident_type, severity
         """
         
@@ -127,14 +125,15 @@ class AnalyticsService:
         """Get monthly accident statistics"""
         query = """
             SELECT 
-                DATE_FORMAT(timestamp, '%%Y-%%m') as month,
-                COUNT(*) as total,
-                SUM(CASE WHEN severity = 'high' THEN 1 ELSE 0 END) as high_severity,
-                SUM(CASE WHEN severity = 'medium' THEN 1 ELSE 0 END) as medium_severity,
-                SUM(CASE WHEN severity = 'low' THEN 1 ELSE 0 END) as low_severity
-            FROM accidents
-            WHERE timestamp >= DATE_SUB(NOW(), INTERVAL %s MONTH)
+                DATE_FORMAT(bucket_start, '%%Y-%%m') as month,
+                CAST(SUM(accident_count) AS SIGNED) as total,
+                CAST(SUM(CASE WHEN severity = 'high' THEN accident_count ELSE 0 END) AS SIGNED) as high_severity,
+                CAST(SUM(CASE WHEN severity = 'medium' THEN accident_count ELSE 0 END) AS SIGNED) as medium_severity,
+                CAST(SUM(CASE WHEN severity = 'low' THEN accident_count ELSE 0 END) AS SIGNED) as low_severity
+            FROM accident_rollups_hourly
+            WHERE bucket_start >= DATE_SUB(NOW(), INTERVAL %s MONTH)
             GROUP BY month
+            HAVING total > 0
             ORDER BY month
         """
         
@@ -145,10 +144,11 @@ class AnalyticsService:
         """Get peak accident hours"""
         query = """
             SELECT 
-                HOUR(timestamp) as hour,
-                COUNT(*) as count
-            FROM accidents
+                HOUR(bucket_start) as hour,
+                CAST(SUM(accident_count) AS SIGNED) as count
+            FROM accident_rollups_hourly
             GROUP BY hour
+            HAVING count > 0
             ORDER BY count DESC
             LIMIT 5
         """
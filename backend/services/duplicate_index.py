@@ -0,0 +1,276 @@
+"""Sliding-window index of recent reports for duplicate detection"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from database import Database
+from utils import events
+from utils.geolocation import haversine_distance
+from utils.spatial import GridIndex
+
+logger = logging.getLogger(__name__)
+
+class DuplicateIndex:
+    """
+    Recent accident reports bucketed by grid cell and time window
+
+    Each time bucket spans one duplicate window and holds a GridIndex
+    whose cells are as wide as the duplicate offset, so a lookup touches
+    at most 3 time buckets x 3x3 cells no matter how many reports are
+    held. Whole buckets are dropped as they age out.
+
+    The index is per process: with several app processes a report
+    written by another process inside the window is not seen.
+    """
+
+    def __init__(self, window_minutes=30, offset_deg=0.01, merge_radius_km=0.2):
+        self.enabled = True
+        self.merge_enabled = True
+        self.window_seconds = window_minutes * 60
+        self.offset_deg = offset_deg
+        self.merge_radius_km = merge_radius_km
+        self._buckets = {}
+        self._entries = {}
+        self._by_accident = {}
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        self._pending = None
+
+    def init_app(self, app):
+        """Configure from the Flask app and subscribe to accident writes"""
+        self.enabled = app.config.get('DUPLICATE_INDEX_ENABLED', True)
+        self.merge_enabled = app.config.get('INCIDENT_MERGE_ENABLED', True)
+        self.window_seconds = app.config.get('DUPLICATE_WINDOW_MINUTES', 30) * 60
+        self.offset_deg = app.config.get('DUPLICATE_OFFSET_DEG', self.offset_deg)
+        self.merge_radius_km = app.config.get('INCIDENT_MERGE_RADIUS_KM', self.merge_radius_km)
+        self._buckets = {}
+        self._entries = {}
+        self._by_accident = {}
+        self._loaded = False
+        self._pending = None
+
+        if self.enabled:
+            events.subscribe('accident.created', self._on_created)
+            events.subscribe('accident.created_batch', self._on_created_batch)
+            events.subscribe('accident.report_merged', self._on_report_merged)
+            events.subscribe('accident.deleted', self._on_deleted)
+
+    def _time_bucket(self, ts):
+        return int(ts // self.window_seconds)
+
+    @staticmethod
+    def _epoch(timestamp):
+        if timestamp is None:
+            return time.time()
+        if isinstance(timestamp, datetime):
+            return timestamp.timestamp()
+        return float(timestamp)
+
+    def _ensure_loaded(self):
+        """
+        Load reports inside the current window on first use
+
+        Accident events that arrive while the SELECTs run are queued and
+        replayed on top of them; adding a report is idempotent, so events
+        for writes the SELECTs already saw do no harm.
+        """
+        if self._loaded:
+            return
+
+        with self._load_lock:
+            if self._loaded:
+                return
+
+            with self._lock:
+                self._pending = []
+
+            horizon = datetime.now() - timedelta(seconds=self.window_seconds)
+            try:
+                accidents = Database.execute_query("""
+                    SELECT id, user_id, latitude, longitude, accident_type, timestamp
+                    FROM accidents
+                    WHERE timestamp >= %s
+                """, (horizon,), fetch_all=True) or []
+                reports = Database.execute_query("""
+                    SELECT r.id, r.accident_id, r.user_id, r.latitude, r.longitude, a.accident_type, r.created_at
+                    FROM accident_reports r
+                    JOIN accidents a ON a.id = r.accident_id
+                    WHERE r.created_at >= %s
+                """, (horizon,), fetch_all=True) or []
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                raise
+
+            with self._lock:
+                for row in accidents:
+                    self._add(('accident', row['id']), row['id'], row['user_id'], row['latitude'],
+                              row['longitude'], row['accident_type'], row['timestamp'])
+                for row in reports:
+                    self._add(('report', row['id']), row['accident_id'], row['user_id'], row['latitude'],
+                              row['longitude'], row['accident_type'], row['created_at'])
+                self._loaded = True
+
+                pending, self._pending = self._pending, None
+                for handler, kwargs in pending:
+                    handler(**kwargs)
+
+        logger.info(f"Duplicate index loaded {len(accidents) + len(reports)} recent reports")
+
+    def _add(self, key, accident_id, user_id, latitude, longitude, accident_type, timestamp):
+        ts = self._epoch(timestamp)
+        bucket = self._time_bucket(ts)
+        if bucket < self._time_bucket(time.time()) - 1:
+            return
+
+        grid = self._buckets.get(bucket)
+        if grid is None:
+            grid = self._buckets[bucket] = GridIndex(self.offset_deg)
+        grid.insert(key, latitude, longitude)
+
+        self._entries[key] = {
+            'accident_id': accident_id,
+            'user_id': user_id,
+            'accident_type': accident_type,
+            'ts': ts,
+            'bucket': bucket
+        }
+        self._by_accident.setdefault(accident_id, set()).add(key)
+
+    def _evict_expired(self, now):
+        oldest = self._time_bucket(now) - 1
+        for bucket in [b for b in self._buckets if b < oldest]:
+            grid = self._buckets.pop(bucket)
+            for key in grid.keys():
+                entry = self._entries.pop(key, None)
+                if entry:
+                    keys = self._by_accident.get(entry['accident_id'])
+                    if keys:
+                        keys.discard(key)
+                        if not keys:
+                            del self._by_accident[entry['accident_id']]
+
+    def _candidates(self, latitude, longitude, ts):
+        """Yield (key, entry, latitude, longitude) for reports near a point and time"""
+        latitude = float(latitude)
+        longitude = float(longitude)
+        bucket = self._time_bucket(ts)
+        off = self.offset_deg
+
+        for b in (bucket - 1, bucket, bucket + 1):
+            grid = self._buckets.get(b)
+            if grid is None:
+                continue
+            for key, lat, lon in grid.query_bbox(latitude - off, latitude + off, longitude - off, longitude + off):
+                entry = self._entries[key]
+                if abs(entry['ts'] - ts) <= self.window_seconds:
+                    yield key, entry, lat, lon
+
+    def find_duplicate(self, user_id, latitude, longitude, timestamp=None, window_seconds=None):
+        """
+        Find a report by the same user near this point within the window
+
+        Args:
+            window_seconds: Optional narrower window; it cannot be wider
+                            than the index's own window
+
+        Returns:
+            Accident ID of the earlier report, or None
+        """
+        self._ensure_loaded()
+        ts = self._epoch(timestamp)
+        window = self.window_seconds if window_seconds is None else min(window_seconds, self.window_seconds)
+
+        with self._lock:
+            self._evict_expired(time.time())
+            for _, entry, _, _ in self._candidates(latitude, longitude, ts):
+                if entry['user_id'] == user_id and abs(entry['ts'] - ts) <= window:
+                    return entry['accident_id']
+        return None
+
+    def find_incident(self, latitude, longitude, accident_type, timestamp=None):
+        """
+        Find a recent report of the same incident by any user
+
+        Returns:
+            Accident ID of the nearest report of the same type within the
+            merge radius, or None
+        """
+        if not self.merge_enabled:
+            return None
+
+        self._ensure_loaded()
+        ts = self._epoch(timestamp)
+        latitude = float(latitude)
+        longitude = float(longitude)
+
+        best = None
+        with self._lock:
+            self._evict_expired(time.time())
+            for _, entry, lat, lon in self._candidates(latitude, longitude, ts):
+                if entry['accident_type'] != accident_type:
+                    continue
+                distance = haversine_distance(latitude, longitude, lat, lon)
+                if distance <= self.merge_radius_km and (best is None or distance < best[0]):
+                    best = (distance, entry['accident_id'])
+
+        return best[1] if best else None
+
+    def _deferred(self, handler, **kwargs):
+        """
+        Queue an event while the window is loading; call with the lock held
+
+        Returns:
+            True if the handler should not apply the event now
+        """
+        if self._pending is not None:
+            self._pending.append((handler, kwargs))
+            return True
+        return not self._loaded
+
+    def _on_created(self, accident, **kwargs):
+        if not accident:
+            return
+        with self._lock:
+            if self._deferred(self._on_created, accident=accident):
+                return
+            self._add(('accident', accident['id']), accident['id'], accident['user_id'], accident['latitude'],
+                      accident['longitude'], accident['accident_type'], accident['timestamp'])
+
+    def _on_created_batch(self, accidents, **kwargs):
+        with self._lock:
+            if self._deferred(self._on_created_batch, accidents=accidents):
+                return
+            for accident in accidents:
+                self._add(('accident', accident['id']), accident['id'], accident['user_id'], accident['latitude'],
+                          accident['longitude'], accident['accident_type'], accident['timestamp'])
+
+    def _on_report_merged(self, accident_id, report, **kwargs):
+        with self._lock:
+            if self._deferred(self._on_report_merged, accident_id=accident_id, report=report):
+                return
+            self._add(('report', report['id']), accident_id, report['user_id'], report['latitude'],
+                      report['longitude'], report['accident_type'], report['created_at'])
+
+    def _on_deleted(self, accident_id, **kwargs):
+        with self._lock:
+            if self._deferred(self._on_deleted, accident_id=accident_id):
+                return
+            for key in self._by_accident.pop(accident_id, set()):
+                entry = self._entries.pop(key, None)
+                grid = self._buckets.get(entry['bucket']) if entry else None
+                if grid is not None:
+                    grid.remove(key)
+
+    def stats(self):
+        """Get index size"""
+        return {
+            'enabled': self.enabled,
+            'loaded': self._loaded,
+            'window_minutes': self.window_seconds // 60,
+            'size': len(self._entries),
+            'buckets': len(self._buckets)
+        }
+
+duplicate_index = DuplicateIndex()
@@ -0,0 +1,116 @@
+"""In-memory nearest-neighbour index of active emergency services"""
+import logging
+import threading
+import time
+from database import Database
+from utils import events
+from utils.spatial import SphericalKDTree
+
+logger = logging.getLogger(__name__)
+
+class EmergencyServiceIndex:
+    """
+    One SphericalKDTree per service type, plus one over every type
+
+    Answers k-nearest and radius queries without a radius guess or a
+    MySQL round trip. Any emergency_service.changed event marks the trees
+    stale and the next query reloads the active services and rebuilds
+    them; a reload also happens every refresh_seconds to pick up changes
+    made by other processes.
+    """
+
+    def __init__(self, refresh_seconds=300):
+        self.enabled = True
+        self.refresh_seconds = refresh_seconds
+        self._trees = {}
+        self._loaded_at = None
+        self._stale = True
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.rebuilds = 0
+
+    def init_app(self, app):
+        """Configure from the Flask app and subscribe to service writes"""
+        self.enabled = app.config.get('EMERGENCY_INDEX_ENABLED', True)
+        self.refresh_seconds = app.config.get('EMERGENCY_INDEX_REFRESH_SECONDS', self.refresh_seconds)
+
+        if self.enabled:
+            events.subscribe('emergency_service.changed', self._on_changed)
+
+    def _on_changed(self, service_id, **kwargs):
+        self._stale = True
+
+    def _rebuild(self):
+        """Reload active services and rebuild every tree"""
+        self._stale = False
+        rows = Database.execute_query(
+            "SELECT * FROM emergency_services WHERE is_active = TRUE", fetch_all=True
+        ) or []
+
+        by_type = {None: rows}
+        for row in rows:
+            by_type.setdefault(row['type'], []).append(row)
+
+        trees = {}
+        for service_type, members in by_type.items():
+            tree = SphericalKDTree(
+                [float(r['latitude']) for r in members],
+                [float(r['longitude']) for r in members]
+            )
+            trees[service_type] = (tree, members)
+
+        self._trees = trees
+        self._loaded_at = time.monotonic()
+        self.rebuilds += 1
+        logger.info(f"Emergency service index loaded {len(rows)} services")
+
+    def _tree(self, service_type):
+        with self._lock:
+            if self._stale or self._loaded_at is None or \
+                    time.monotonic() - self._loaded_at >= self.refresh_seconds:
+                self._rebuild()
+            self.queries += 1
+            return self._trees.get(service_type, (None, []))
+
+    @staticmethod
+    def _results(members, matches):
+        return [dict(members[i], distance_km=round(distance, 2)) for i, distance in matches]
+
+    def nearest(self, latitude, longitude, k, service_type=None, max_distance_km=None):
+        """
+        Find the k closest active services
+
+        Returns:
+            List of services with distance_km, nearest first
+        """
+        tree, members = self._tree(service_type)
+        if tree is None:
+            return []
+        return self._results(members, tree.nearest(latitude, longitude, k, max_distance_km))
+
+    def within(self, latitude, longitude, radius_km, service_type=None):
+        """
+        Find every active service within a radius
+
+        Returns:
+            List of services with distance_km, nearest first
+        """
+        tree, members = self._tree(service_type)
+        if tree is None:
+            return []
+        return self._results(members, tree.within(latitude, longitude, radius_km))
+
+    def stats(self):
+        """Get tree sizes and counters"""
+        return {
+            'enabled': self.enabled,
+            'loaded': self._loaded_at is not None,
+            'services': {
+                service_type or 'all': len(tree)
+                for service_type, (tree, _) in self._trees.items()
+            },
+            'queries': self.queries,
+            'rebuilds': self.rebuilds
+        }
+
+emergency_index = EmergencyServiceIndex()
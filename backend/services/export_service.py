@@ -7,18 +7,14 @@ from database import Database
 class ExportService:
     """Service for exporting data to various formats"""
     
+    CSV_HEADER = [
+        'ID', 'Timestamp', 'Latitude', 'Longitude', 
+        'Type', 'Severity', 'Description', 'Status', 'Reported By'
+    ]
+    
     @staticmethod
-    def export_accidents_csv(filters=None):
-        """
-        Export accidents to CSV format
-        
-        Args:
-            filters: Optional filters for accidents
-            
-        Returns:
-            CSV string
-        """
-        # Build query
+    def _accidents_export_query(filters=None):
+        """Build the accidents export query and its parameters"""
         query = """
             SELECT 
                 a.id,
@@ -55,21 +51,31 @@ class ExportService:
         
         query += " ORDER BY a.timestamp DESC"
         
-        # Get data
-        accidents = Database.execute_query(query, tuple(params), fetch_all=True) or []
+        return query, tuple(params)
+    
+    @staticmethod
+    def iter_accidents_csv(filters=None, rows_per_chunk=500):
+        """
+        Generate an accidents CSV export in chunks
+        
+        Rows are read through an unbuffered cursor and written out every
+        rows_per_chunk rows, so memory use does not grow with the export.
+        
+        Args:
+            filters: Optional filters for accidents
+            rows_per_chunk: Rows per yielded chunk
+            
+        Yields:
+            CSV text chunks, starting with the header row
+        """
+        query, params = ExportService._accidents_export_query(filters)
         
-        # Create CSV
         output = io.StringIO()
         writer = csv.writer(output)
+        writer.writerow(ExportService.CSV_HEADER)
         
-        # Write header
-        writer.writerow([
-            'ID', 'Timestamp', 'Latitude', 'Longitude', 
-            'Type', 'Severity', 'Description', 'Status', 'Reported By'
-        ])
-        
-        # Write data
-        for accident in accidents:
+        pending = 0
+        for accident in Database.stream_query(query, params):
             writer.writerow([
                 accident['id'],
                 accident['timestamp'],
@@ -81,8 +87,30 @@ class ExportService:
                 accident['status'],
                 accident['reported_by']
             ])
+            pending += 1
+            
+            if pending >= rows_per_chunk:
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate(0)
+                pending = 0
+        
+        remainder = output.getvalue()
+        if remainder:
+            yield remainder
+    
+    @staticmethod
+    def export_accidents_csv(filters=None):
+        """
+        Export accidents to CSV format
         
-        return output.getvalue()
+        Args:
+            filters: Optional filters for accidents
+            
+        Returns:
+            CSV string
+        """
+        return ''.join(ExportService.iter_accidents_csv(filters))
     
     @staticmethod
     def export_analytics_csv(start_date=None, end_date=None):
@@ -0,0 +1,372 @@
+"""Precomputed heatmap tile pyramid fed by accident events"""
+import hashlib
+import json
+import logging
+import threading
+from datetime import date, datetime, time, timedelta
+from database import Database
+from utils import events
+from utils.tiles import pixel, unproject
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_WEIGHTS = {'high': 3, 'medium': 2}
+
+class _Tile:
+    __slots__ = ('cells', 'encoded')
+
+    def __init__(self):
+        self.cells = {}
+        self.encoded = None
+
+class HeatmapTiles:
+    """
+    Accident counts aggregated per zoom level and keyed by z/x/y tile
+
+    Accidents are binned into cells 1/cells of a tile wide at max_zoom, and
+    each coarser zoom merges 2x2 cells, so an accident lands in exactly one
+    cell per zoom. One pyramid is kept per configured window of calendar
+    days (today included) and is updated in place as accidents are created
+    or deleted. The max_zoom cells of each day are kept as well, so a day
+    can be subtracted again when it leaves a window.
+
+    Serving a tile only reads that tile's cells. Tiles deeper than max_zoom
+    are cut from their max_zoom ancestor.
+    """
+
+    def __init__(self, windows=(1, 7, 30), max_zoom=14, cells=64):
+        self.enabled = True
+        self.windows = tuple(windows)
+        self.max_zoom = max_zoom
+        self.cells = cells
+        self._tiles = {window: {} for window in self.windows}
+        self._days = {}
+        self._today = None
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        self._pending = None
+
+    def init_app(self, app):
+        """Configure from the Flask app and subscribe to accident writes"""
+        self.enabled = app.config.get('HEATMAP_TILES_ENABLED', True)
+        self.windows = tuple(sorted(app.config.get('HEATMAP_TILE_WINDOWS', self.windows)))
+        self.max_zoom = app.config.get('HEATMAP_TILE_MAX_ZOOM', self.max_zoom)
+        self.cells = app.config.get('HEATMAP_TILE_CELLS', self.cells)
+        self._tiles = {window: {} for window in self.windows}
+        self._days = {}
+        self._loaded = False
+        self._pending = None
+
+        if self.enabled:
+            events.subscribe('accident.created', self._on_created)
+            events.subscribe('accident.created_batch', self._on_created_batch)
+            events.subscribe('accident.deleted', self._on_deleted)
+            events.subscribe('accident.updated', self._on_updated)
+
+    def _first_day(self, window, today):
+        return today - timedelta(days=window - 1)
+
+    def _ensure_loaded(self):
+        """
+        Build the pyramids from the widest window on first use
+
+        The scan runs without the tile lock; accident events that arrive
+        meanwhile are queued and replayed afterwards, skipping writes the
+        scan already counted.
+        """
+        if self._loaded:
+            return
+
+        with self._load_lock:
+            if self._loaded:
+                return
+
+            with self._lock:
+                self._pending = []
+
+            # Handlers only queue events until _loaded is set, so the day
+            # cells can be filled without holding the tile lock
+            seen = {}
+            try:
+                self._today = date.today()
+                self._days = {}
+                horizon = datetime.combine(self._first_day(max(self.windows), self._today), time.min)
+                query = """
+                    SELECT id, latitude, longitude, severity, timestamp
+                    FROM accidents
+                    WHERE timestamp >= %s
+                """
+                for row in Database.stream_query(query, (horizon,), batch_size=5000):
+                    self._count_day(row, 1)
+                    seen[row['id']] = row['severity']
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                raise
+
+            with self._lock:
+                for window in self.windows:
+                    self._tiles[window] = self._build(window)
+                self._loaded = True
+
+                pending, self._pending = self._pending, None
+                self._replay(pending, seen)
+
+        logger.info(f"Heatmap tiles loaded {len(seen)} accidents")
+
+    def _replay(self, pending, seen):
+        """
+        Apply events queued during the load; call with the lock held
+
+        Args:
+            pending: List of (event, kwargs) in arrival order
+            seen: Accident ID -> severity as counted by the load, updated
+                  as events are applied
+        """
+        self._roll()
+        for event, kwargs in pending:
+            if event == 'created':
+                for accident in kwargs['accidents']:
+                    if accident['id'] not in seen:
+                        seen[accident['id']] = accident.get('severity')
+                        self._add(accident, 1)
+            elif event == 'deleted':
+                accident_id, accident = kwargs['accident_id'], kwargs['accident']
+                if accident_id in seen:
+                    self._add(dict(accident, severity=seen.pop(accident_id)), -1)
+            elif event == 'updated':
+                accident = kwargs['accident']
+                severity = seen.get(accident['id'], accident['severity'])
+                if severity != accident['severity']:
+                    seen[accident['id']] = accident['severity']
+                    self._add(dict(accident, severity=severity), -1)
+                    self._add(accident, 1)
+
+    def _deferred(self, event, **kwargs):
+        """
+        Queue an event while the pyramids are loading; call with the lock held
+
+        Returns:
+            True if the handler should not apply the event now
+        """
+        if self._pending is not None:
+            self._pending.append((event, kwargs))
+            return True
+        return not self._loaded
+
+    def _apply(self, tiles, gx, gy, count, weight):
+        """Add a max_zoom cell delta to every zoom of one pyramid"""
+        for z in range(self.max_zoom, -1, -1):
+            shift = self.max_zoom - z
+            cx, cy = gx >> shift, gy >> shift
+            key = (z, cx // self.cells, cy // self.cells)
+
+            tile = tiles.get(key)
+            if tile is None:
+                tile = tiles[key] = _Tile()
+            cell = tile.cells.get((cx, cy))
+            if cell is None:
+                cell = tile.cells[(cx, cy)] = [0, 0]
+            cell[0] += count
+            cell[1] += weight
+            tile.encoded = None
+
+            if cell[0] <= 0:
+                del tile.cells[(cx, cy)]
+                if not tile.cells:
+                    del tiles[key]
+
+    def _count_day(self, accident, sign):
+        """
+        Count an accident in (sign=1) or out of (sign=-1) its day's cells
+
+        Returns:
+            Tuple (day, gx, gy, count, weight), or None if it is outside
+            the widest window
+        """
+        if accident.get('latitude') is None or accident.get('longitude') is None:
+            return None
+
+        timestamp = accident.get('timestamp')
+        day = timestamp.date() if isinstance(timestamp, datetime) else self._today
+        if day < self._first_day(max(self.windows), self._today) or day > self._today:
+            return None
+
+        gx, gy = pixel(accident['latitude'], accident['longitude'], self.max_zoom, self.cells)
+        count, weight = sign, sign * SEVERITY_WEIGHTS.get(accident.get('severity'), 1)
+
+        cells = self._days.setdefault(day, {})
+        cell = cells.setdefault((gx, gy), [0, 0])
+        cell[0] += count
+        cell[1] += weight
+        if cell[0] <= 0:
+            del cells[(gx, gy)]
+        return day, gx, gy, count, weight
+
+    def _add(self, accident, sign):
+        """Count an accident in or out of the day cells and every pyramid"""
+        counted = self._count_day(accident, sign)
+        if counted is None:
+            return
+
+        day, gx, gy, count, weight = counted
+        for window in self.windows:
+            if day >= self._first_day(window, self._today):
+                self._apply(self._tiles[window], gx, gy, count, weight)
+
+    def _build(self, window):
+        """Build one pyramid from the day cells, merging each zoom into the next"""
+        first = self._first_day(window, self._today)
+        level = {}
+        for day, cells in self._days.items():
+            if day < first:
+                continue
+            for key, (count, weight) in cells.items():
+                cell = level.get(key)
+                if cell is None:
+                    level[key] = [count, weight]
+                else:
+                    cell[0] += count
+                    cell[1] += weight
+
+        tiles = {}
+        for z in range(self.max_zoom, -1, -1):
+            parent = {}
+            for (cx, cy), cell in level.items():
+                key = (z, cx // self.cells, cy // self.cells)
+                tile = tiles.get(key)
+                if tile is None:
+                    tile = tiles[key] = _Tile()
+                tile.cells[(cx, cy)] = cell
+
+                merged = parent.get((cx >> 1, cy >> 1))
+                if merged is None:
+                    parent[(cx >> 1, cy >> 1)] = [cell[0], cell[1]]
+                else:
+                    merged[0] += cell[0]
+                    merged[1] += cell[1]
+            level = parent
+        return tiles
+
+    def _roll(self):
+        """Subtract days that have left each window since the last call"""
+        today = date.today()
+        if today == self._today:
+            return
+
+        for window in self.windows:
+            old_first = self._first_day(window, self._today)
+            new_first = self._first_day(window, today)
+            for day, cells in self._days.items():
+                if old_first <= day < new_first:
+                    for (gx, gy), (count, weight) in cells.items():
+                        self._apply(self._tiles[window], gx, gy, -count, -weight)
+
+        oldest = self._first_day(max(self.windows), today)
+        for day in [d for d in self._days if d < oldest]:
+            del self._days[day]
+        self._today = today
+
+    def _on_created(self, accident, **kwargs):
+        if not accident:
+            return
+        with self._lock:
+            if self._deferred('created', accidents=[accident]):
+                return
+            self._roll()
+            self._add(accident, 1)
+
+    def _on_created_batch(self, accidents, **kwargs):
+        with self._lock:
+            if self._deferred('created', accidents=accidents):
+                return
+            self._roll()
+            for accident in accidents:
+                self._add(accident, 1)
+
+    def _on_deleted(self, accident_id, accident=None, **kwargs):
+        if not accident:
+            return
+        with self._lock:
+            if self._deferred('deleted', accident_id=accident_id, accident=accident):
+                return
+            self._roll()
+            self._add(accident, -1)
+
+    def _on_updated(self, accident_id, fields, accident=None, previous=None, **kwargs):
+        # A raised severity changes the accident's weight
+        if 'severity' not in fields or not accident or not previous:
+            return
+        with self._lock:
+            if self._deferred('updated', accident=accident):
+                return
+            self._roll()
+            self._add(dict(accident, severity=previous['severity']), -1)
+            self._add(accident, 1)
+
+    def _encode(self, cell_zoom, cells):
+        """Turn (cell, [count, weight]) pairs into heatmap points and an ETag"""
+        n = (1 << cell_zoom) * self.cells
+        points = []
+        for (cx, cy), (count, weight) in sorted(cells):
+            lat, lng = unproject((cx + 0.5) / n, (cy + 0.5) / n)
+            points.append({
+                'lat': round(lat, 6),
+                'lng': round(lng, 6),
+                'intensity': count,
+                'weight': weight
+            })
+        digest = hashlib.sha1(json.dumps(points, separators=(',', ':')).encode()).hexdigest()
+        return points, digest
+
+    def get_tile(self, days, z, x, y):
+        """
+        Get the heatmap points of one tile
+
+        Args:
+            days: One of the configured windows
+            z, x, y: Tile address
+
+        Returns:
+            Tuple (points, etag); points have lat, lng, intensity and weight
+        """
+        self._ensure_loaded()
+
+        with self._lock:
+            self._roll()
+            tiles = self._tiles[days]
+
+            if z <= self.max_zoom:
+                tile = tiles.get((z, x, y))
+                if tile is None:
+                    return self._encode(z, [])
+                if tile.encoded is None:
+                    tile.encoded = self._encode(z, tile.cells.items())
+                return tile.encoded
+
+            # Overzoom: keep the ancestor's cells whose centres fall in this tile
+            shift = z - self.max_zoom
+            tile = tiles.get((self.max_zoom, x >> shift, y >> shift))
+            if tile is None:
+                return self._encode(self.max_zoom, [])
+            scale = 1 << shift
+            cells = [
+                (key, value) for key, value in tile.cells.items()
+                if int((key[0] + 0.5) * scale) // self.cells == x
+                and int((key[1] + 0.5) * scale) // self.cells == y
+            ]
+            return self._encode(self.max_zoom, cells)
+
+    def stats(self):
+        """Get pyramid sizes per window"""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'loaded': self._loaded,
+                'max_zoom': self.max_zoom,
+                'days': len(self._days),
+                'tiles': {window: len(tiles) for window, tiles in self._tiles.items()}
+            }
+
+heatmap_tiles = HeatmapTiles()
@@ -0,0 +1,234 @@
+"""Background image processing for accident photos"""
+import logging
+import os
+import threading
+import uuid
+from config import Config
+from database import Database
+from models.accident import Accident
+from models.accident_image import AccidentImage
+from utils import events
+from utils.file_handler import generate_image_derivatives, get_file_url
+
+logger = logging.getLogger(__name__)
+
+class ImagePipeline:
+    """
+    Processes uploaded accident images off the request thread
+    
+    Jobs are rows in the image_jobs table, so they survive restarts and
+    can be shared by several app processes. A fixed number of worker
+    threads claim pending jobs one at a time; enqueue() wakes them
+    immediately and they also poll, so jobs left behind by a crashed
+    process are picked up once they go stale.
+    """
+    
+    def __init__(self):
+        self.enabled = False
+        self.workers = 2
+        self.max_attempts = 3
+        self.poll_seconds = 5
+        self.stale_seconds = 300
+        self._wakeup = threading.Event()
+        self._threads = []
+        self._stopping = False
+    
+    def init_app(self, app):
+        """Configure from the Flask app and start the worker threads"""
+        self.enabled = app.config.get('IMAGE_PIPELINE_ENABLED', True)
+        self.workers = app.config.get('IMAGE_PIPELINE_WORKERS', self.workers)
+        self.max_attempts = app.config.get('IMAGE_PIPELINE_MAX_ATTEMPTS', self.max_attempts)
+        self.poll_seconds = app.config.get('IMAGE_PIPELINE_POLL_SECONDS', self.poll_seconds)
+        self.stale_seconds = app.config.get('IMAGE_PIPELINE_STALE_SECONDS', self.stale_seconds)
+        
+        if self.enabled and not self._threads:
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._run,
+                    name=f"image-pipeline-{i}",
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+    
+    def stop(self):
+        """Ask worker threads to exit after their current job"""
+        self._stopping = True
+        self._wakeup.set()
+    
+    def enqueue(self, accident_id, image_path):
+        """
+        Queue an uploaded image for processing
+        
+        Args:
+            accident_id: Accident the image belongs to
+            image_path: Relative path of the raw upload
+        
+        Returns:
+            Job ID
+        """
+        query = "INSERT INTO image_jobs (accident_id, image_path) VALUES (%s, %s)"
+        job_id = Database.execute_query(query, (accident_id, image_path), commit=True)
+        self._wakeup.set()
+        return job_id
+    
+    def _claim(self):
+        """Atomically claim the oldest pending job, or return None"""
+        token = uuid.uuid4().hex
+        
+        query = """
+            UPDATE image_jobs
+            SET status = 'processing', claimed_by = %s, attempts = attempts + 1
+            WHERE status = 'pending'
+            ORDER BY id
+            LIMIT 1
+        """
+        Database.execute_query(query, (token,), commit=True)
+        
+        query = "SELECT * FROM image_jobs WHERE claimed_by = %s AND status = 'processing'"
+        return Database.execute_query(query, (token,), fetch_one=True)
+    
+    def _requeue_stale(self):
+        """Return jobs abandoned by a crashed worker to the queue"""
+        query = """
+            UPDATE image_jobs
+            SET status = 'pending', claimed_by = NULL
+            WHERE status = 'processing'
+            AND updated_at < DATE_SUB(NOW(), INTERVAL %s SECOND)
+        """
+        Database.execute_query(query, (self.stale_seconds,), commit=True)
+    
+    def process(self, job):
+        """
+        Run the processing steps for one job
+        
+        Generates the thumbnail, medium and full size derivatives and
+        records them against the accident.
+        
+        Returns:
+            List of derivative rows
+            
+        Raises:
+            Exception if the image cannot be processed
+        """
+        # Identical uploads share a blob, so earlier derivatives can be reused
+        derivatives = AccidentImage.copy_from_image(job['image_path'], job['accident_id'])
+        if derivatives:
+            return derivatives
+        
+        filepath = os.path.join(Config.UPLOAD_FOLDER, job['image_path'])
+        if not os.path.exists(filepath):
+            raise FileNotFoundError(job['image_path'])
+        
+        # Failures raise, so the job is retried or marked failed rather
+        # than published as ready with nothing to serve
+        derivatives = generate_image_derivatives(job['image_path'])
+        if not derivatives:
+            raise RuntimeError("No derivative image formats can be encoded")
+        AccidentImage.replace(job['accident_id'], derivatives)
+        return derivatives
+    
+    def submit(self, accident_id, image_path):
+        """
+        Arrange for an accident's image to be processed
+        
+        Derivatives of an identical earlier upload are reused immediately;
+        otherwise the image is queued, or processed inline when the
+        pipeline is disabled.
+        
+        Returns:
+            Tuple of (image_status, srcset map or None)
+        """
+        derivatives = AccidentImage.copy_from_image(image_path, accident_id)
+        if derivatives:
+            Accident.update_image_status(accident_id, 'ready')
+            return 'ready', get_file_url(image_path, derivatives)
+        
+        if not self.enabled:
+            return self.process_now(accident_id, image_path)
+        
+        try:
+            self.enqueue(accident_id, image_path)
+        except Exception as e:
+            # The raw upload is still served; only derivatives are lost
+            logger.error(f"Failed to queue image for accident {accident_id}: {e}")
+            Accident.update_image_status(accident_id, 'failed')
+            return 'failed', None
+        return 'pending', None
+    
+    def process_now(self, accident_id, image_path):
+        """
+        Process an image on the calling thread, for when the pipeline is disabled
+        
+        Returns:
+            Tuple of (image_status, srcset map or None)
+        """
+        try:
+            derivatives = self.process({'accident_id': accident_id, 'image_path': image_path})
+        except Exception as e:
+            logger.error(f"Image processing failed for accident {accident_id}: {e}")
+            Accident.update_image_status(accident_id, 'failed')
+            return 'failed', None
+        
+        Accident.update_image_status(accident_id, 'ready')
+        events.emit('accident.image_ready', accident_id=accident_id, image_path=image_path)
+        return 'ready', get_file_url(image_path, derivatives)
+    
+    def _finish(self, job, error=None):
+        if error is None:
+            Database.execute_query(
+                "UPDATE image_jobs SET status = 'done', last_error = NULL WHERE id = %s",
+                (job['id'],), commit=True
+            )
+            Accident.update_image_status(job['accident_id'], 'ready')
+            events.emit('accident.image_ready', accident_id=job['accident_id'], image_path=job['image_path'])
+            return
+        
+        # Retry until attempts run out, then give up on the image
+        status = 'pending' if job['attempts'] < self.max_attempts else 'failed'
+        Database.execute_query(
+            "UPDATE image_jobs SET status = %s, claimed_by = NULL, last_error = %s WHERE id = %s",
+            (status, str(error)[:1000], job['id']), commit=True
+        )
+        if status == 'failed':
+            Accident.update_image_status(job['accident_id'], 'failed')
+    
+    def run_once(self):
+        """
+        Claim and process a single job
+        
+        Returns:
+            True if a job was processed, False if the queue was empty
+        """
+        job = self._claim()
+        if not job:
+            return False
+        
+        try:
+            self.process(job)
+        except Exception as e:
+            logger.error(f"Image job {job['id']} failed: {e}")
+            self._finish(job, error=e)
+        else:
+            self._finish(job)
+        return True
+    
+    def _run(self):
+        while not self._stopping:
+            try:
+                self._requeue_stale()
+                while not self._stopping and self.run_once():
+                    pass
+            except Exception as e:
+                logger.error(f"Image pipeline worker error: {e}")
+            
+            self._wakeup.wait(self.poll_seconds)
+            self._wakeup.clear()
+    
+    def stats(self):
+        """Get job counts by status"""
+        query = "SELECT status, COUNT(*) as count FROM image_jobs GROUP BY status"
+        rows = Database.execute_query(query, fetch_all=True) or []
+        return {row['status']: row['count'] for row in rows}
+
+image_pipeline = ImagePipeline()
@@ -0,0 +1,226 @@
+"""Bulk accident ingestion for partner feeds"""
+import logging
+from datetime import datetime, timedelta
+from dateutil import parser as date_parser
+from config import Config
+from database import Database
+from models.accident import Accident
+from models.alert import Alert
+from models.user import User
+from utils.geolocation import validate_coordinates
+from utils.spatial import GridIndex
+from utils.validators import validate_enum, sanitize_input
+
+logger = logging.getLogger(__name__)
+
+ACCIDENT_TYPES = ['collision', 'fire', 'injury', 'pedestrian', 'vehicle_breakdown', 'other']
+SEVERITIES = ['low', 'medium', 'high']
+
+# Same duplicate rule as Accident.check_duplicate: same submitter, within
+# 0.01 degrees and 30 minutes
+DUPLICATE_OFFSET_DEG = 0.01
+DUPLICATE_WINDOW = timedelta(minutes=30)
+
+class IngestService:
+    """Validates, deduplicates and bulk-inserts batches of accident reports"""
+    
+    INSERT_CHUNK_SIZE = 1000
+    
+    @staticmethod
+    def _parse_timestamp(value, now):
+        if value in (None, ''):
+            return now, None
+        try:
+            parsed = value if isinstance(value, datetime) else date_parser.parse(str(value))
+        except (ValueError, TypeError, OverflowError):
+            return None, "Invalid timestamp"
+        # Stored timestamps are naive local time
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone().replace(tzinfo=None)
+        if parsed > now + timedelta(minutes=5):
+            return None, "Timestamp is in the future"
+        return parsed, None
+    
+    @staticmethod
+    def validate(record, now=None):
+        """
+        Validate and normalize one incoming report
+        
+        Returns:
+            Tuple of (report dict or None, error message or None)
+        """
+        now = now or datetime.now()
+        if not isinstance(record, dict):
+            return None, "Record must be a JSON object"
+        
+        latitude = record.get('latitude')
+        longitude = record.get('longitude')
+        accident_type = record.get('accident_type')
+        severity = record.get('severity')
+        
+        if latitude is None or longitude is None or not accident_type or not severity:
+            return None, "Missing required fields"
+        
+        is_valid, error = validate_coordinates(latitude, longitude)
+        if not is_valid:
+            return None, error
+        
+        is_valid, error = validate_enum(accident_type, ACCIDENT_TYPES, "Accident type")
+        if not is_valid:
+            return None, error
+        
+        is_valid, error = validate_enum(severity, SEVERITIES, "Severity")
+        if not is_valid:
+            return None, error
+        
+        timestamp, error = IngestService._parse_timestamp(record.get('timestamp'), now)
+        if error:
+            return None, error
+        
+        description = record.get('description')
+        if description is not None and not isinstance(description, str):
+            return None, "Description must be a string"
+        
+        return {
+            'latitude': float(latitude),
+            'longitude': float(longitude),
+            'accident_type': accident_type,
+            'severity': severity,
+            'description': sanitize_input(description or '', 1000),
+            'timestamp': timestamp
+        }, None
+    
+    @staticmethod
+    def _existing_reports(user_id, reports):
+        """Load the submitter's accidents that could duplicate any report, in one query"""
+        query = """
+            SELECT id, latitude, longitude, timestamp
+            FROM accidents
+            WHERE user_id = %s
+            AND latitude BETWEEN %s AND %s
+            AND longitude BETWEEN %s AND %s
+            AND timestamp BETWEEN %s AND %s
+        """
+        params = (
+            user_id,
+            min(r['latitude'] for r in reports) - DUPLICATE_OFFSET_DEG,
+            max(r['latitude'] for r in reports) + DUPLICATE_OFFSET_DEG,
+            min(r['longitude'] for r in reports) - DUPLICATE_OFFSET_DEG,
+            max(r['longitude'] for r in reports) + DUPLICATE_OFFSET_DEG,
+            min(r['timestamp'] for r in reports) - DUPLICATE_WINDOW,
+            max(r['timestamp'] for r in reports) + DUPLICATE_WINDOW,
+        )
+        return Database.execute_query(query, params, fetch_all=True) or []
+    
+    @staticmethod
+    def find_duplicates(user_id, reports):
+        """
+        Find reports that duplicate an earlier report in the batch or an
+        existing accident
+        
+        Args:
+            user_id: Submitter ID
+            reports: List of (index, report) pairs
+            
+        Returns:
+            Dict of batch index to the duplicated accident ID, or to
+            'batch:<index>' for a duplicate within the batch
+        """
+        if not reports:
+            return {}
+        
+        grid = GridIndex(DUPLICATE_OFFSET_DEG)
+        timestamps = {}
+        for row in IngestService._existing_reports(user_id, [r for _, r in reports]):
+            grid.insert(row['id'], float(row['latitude']), float(row['longitude']))
+            timestamps[row['id']] = row['timestamp']
+        
+        duplicates = {}
+        for index, report in reports:
+            lat, lon = report['latitude'], report['longitude']
+            candidates = grid.query_bbox(
+                lat - DUPLICATE_OFFSET_DEG, lat + DUPLICATE_OFFSET_DEG,
+                lon - DUPLICATE_OFFSET_DEG, lon + DUPLICATE_OFFSET_DEG
+            )
+            match = next((
+                key for key, _, _ in candidates
+                if abs(timestamps[key] - report['timestamp']) <= DUPLICATE_WINDOW
+            ), None)
+            
+            if match is not None:
+                duplicates[index] = match
+            else:
+                key = f"batch:{index}"
+                grid.insert(key, lat, lon)
+                timestamps[key] = report['timestamp']
+        
+        return duplicates
+    
+    @staticmethod
+    def ingest(user_id, records, create_alerts=True):
+        """
+        Validate, deduplicate and insert a batch of accident reports
+        
+        Args:
+            user_id: ID of the submitting (partner) user
+            records: List of report dicts
+            create_alerts: Create alerts for high severity reports
+            
+        Returns:
+            Dict with per-row results and a summary of counts
+        """
+        now = datetime.now()
+        results = [None] * len(records)
+        valid = []
+        
+        for index, record in enumerate(records):
+            report, error = IngestService.validate(record, now)
+            if error:
+                results[index] = {'index': index, 'status': 'invalid', 'error': error}
+            else:
+                valid.append((index, report))
+        
+        duplicates = IngestService.find_duplicates(user_id, valid)
+        for index, duplicate_of in duplicates.items():
+            results[index] = {'index': index, 'status': 'duplicate', 'duplicate_of': duplicate_of}
+        
+        to_insert = [(index, report) for index, report in valid if index not in duplicates]
+        user = User.find_by_id(user_id)
+        username = user['username'] if user else None
+        
+        alerts = []
+        for start in range(0, len(to_insert), IngestService.INSERT_CHUNK_SIZE):
+            chunk = to_insert[start:start + IngestService.INSERT_CHUNK_SIZE]
+            try:
+                ids = Accident.create_many(user_id, [report for _, report in chunk], username)
+            except Exception as e:
+                logger.error(f"Batch insert failed: {e}")
+                for index, _ in chunk:
+                    results[index] = {'index': index, 'status': 'error', 'error': 'Insert failed'}
+                continue
+            
+            for (index, report), accident_id in zip(chunk, ids):
+                results[index] = {'index': index, 'status': 'created', 'accident_id': accident_id}
+                if create_alerts and report['severity'] == 'high':
+                    alerts.append({
+                        'alert_type': 'accident',
+                        'severity': report['severity'],
+                        'latitude': report['latitude'],
+                        'longitude': report['longitude'],
+                        'message': f"High severity {report['accident_type']} reported in your area",
+                        'radius': Config.HIGH_SEVERITY_ALERT_RADIUS,
+                        'accident_id': accident_id
+                    })
+        
+        alert_ids = []
+        for start in range(0, len(alerts), IngestService.INSERT_CHUNK_SIZE):
+            try:
+                alert_ids.extend(Alert.create_many(alerts[start:start + IngestService.INSERT_CHUNK_SIZE]))
+            except Exception as e:
+                logger.error(f"Batch alert insert failed: {e}")
+        
+        summary = {'received': len(records), 'alerts_created': len(alert_ids)}
+        for status in ('created', 'duplicate', 'invalid', 'error'):
+            summary[status] = sum(1 for r in results if r['status'] == status)
+        
+        return {'summary': summary, 'results': results}
@@ -0,0 +1,137 @@
+"""Fan-out of new alerts into per-user notifications"""
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from models.notification import Notification
+from models.user_location import UserLocation
+from utils import events
+from utils.spatial import GridIndex
+
+logger = logging.getLogger(__name__)
+
+ALERT_TITLES = {
+    'accident': 'Accident reported near you',
+    'zone_warning': 'Accident-prone zone near you',
+    'custom': 'Safety alert near you'
+}
+
+class NotificationDispatcher:
+    """
+    Writes a notification for every user inside a new alert's radius
+
+    Users' last known locations are kept in a GridIndex, so finding the
+    recipients of an alert only touches the cells its circle overlaps.
+    Before each alert the index picks up locations written since the last
+    sync (by any process) and drops those older than max_age_hours.
+
+    Alerts are queued by the alert.created and alert.created_batch
+    handlers and dispatched by a worker thread, so the request that
+    created the alert does not wait for the inserts. The queue is in
+    memory; alerts still queued when the process exits are not notified.
+    """
+
+    EVICT_INTERVAL_SECONDS = 300
+
+    def __init__(self, batch_size=1000, max_age_hours=72, cell_size_deg=0.05):
+        self.enabled = True
+        self.batch_size = batch_size
+        self.max_age_hours = max_age_hours
+        self._grid = GridIndex(cell_size_deg)
+        self._updated = {}
+        self._synced_at = None
+        self._last_evict = 0.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self.dispatched = 0
+        self.notifications = 0
+        self.failures = 0
+
+    def init_app(self, app):
+        """Configure from the Flask app, subscribe to alerts and start the worker"""
+        self.enabled = app.config.get('NOTIFICATIONS_ENABLED', True)
+        self.batch_size = app.config.get('NOTIFICATION_BATCH_SIZE', self.batch_size)
+        self.max_age_hours = app.config.get('USER_LOCATION_MAX_AGE_HOURS', self.max_age_hours)
+
+        if self.enabled:
+            events.subscribe('alert.created', self._on_created)
+            events.subscribe('alert.created_batch', self._on_created_batch)
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='notification-dispatcher', daemon=True)
+                self._thread.start()
+
+    def _on_created(self, alert, **kwargs):
+        if alert:
+            self._queue.put(alert)
+
+    def _on_created_batch(self, alerts, **kwargs):
+        for alert in alerts:
+            self._queue.put(alert)
+
+    def _sync(self):
+        """Pull location updates into the grid and drop stale locations"""
+        horizon = datetime.now() - timedelta(hours=self.max_age_hours)
+
+        # Resume from the newest timestamp seen, so the app and database
+        # clocks never have to agree
+        for row in UserLocation.get_updated_since(self._synced_at or horizon):
+            self._grid.insert(row['user_id'], row['latitude'], row['longitude'])
+            self._updated[row['user_id']] = row['updated_at']
+            if self._synced_at is None or row['updated_at'] > self._synced_at:
+                self._synced_at = row['updated_at']
+
+        now = time.monotonic()
+        if now - self._last_evict >= self.EVICT_INTERVAL_SECONDS:
+            for user_id in [u for u, updated in self._updated.items() if updated < horizon]:
+                self._grid.remove(user_id)
+                del self._updated[user_id]
+            self._last_evict = now
+
+    def recipients(self, alert):
+        """Get the IDs of users whose last location is inside an alert's radius"""
+        self._sync()
+        return [
+            user_id for user_id, _ in
+            self._grid.query_radius(
+                float(alert['latitude']), float(alert['longitude']), float(alert.get('radius') or 5.0)
+            )
+        ]
+
+    def dispatch(self, alert):
+        """
+        Create the notifications for one alert
+
+        Returns:
+            Number of notifications created
+        """
+        title = ALERT_TITLES.get(alert.get('alert_type'), ALERT_TITLES['custom'])
+        rows = [(user_id, alert['id'], title, alert['message']) for user_id in self.recipients(alert)]
+        created = Notification.create_many(rows, self.batch_size) if rows else 0
+
+        self.dispatched += 1
+        self.notifications += created
+        return created
+
+    def _run(self):
+        while True:
+            alert = self._queue.get()
+            try:
+                self.dispatch(alert)
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Notification dispatch failed for alert {alert.get('id')}: {e}")
+
+    def stats(self):
+        """Get queue depth and dispatch counters"""
+        return {
+            'enabled': self.enabled,
+            'queued': self._queue.qsize(),
+            'users_indexed': len(self._grid),
+            'alerts_dispatched': self.dispatched,
+            'notifications_created': self.notifications,
+            'failures': self.failures
+        }
+
+notification_dispatcher = NotificationDispatcher()
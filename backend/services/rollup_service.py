@@ -0,0 +1,218 @@
+"""Hourly accident rollups backing the admin analytics endpoints"""
+import logging
+from datetime import datetime, timedelta
+from database import Database
+from utils import events
+
+logger = logging.getLogger(__name__)
+
+# Hours recounted per statement by recount()
+RECOUNT_CHUNK = 500
+
+# Truncate a timestamp to the start of its hour without DATE_FORMAT, whose
+# % placeholders clash with the connector's parameter syntax
+HOUR_BUCKET_SQL = "TIMESTAMP(DATE({col}), MAKETIME(HOUR({col}), 0, 0))"
+
+class RollupService:
+    """
+    Maintains accident_rollups_hourly, one row per (hour, severity, type)
+
+    Rows are adjusted incrementally as accidents are created, deleted or
+    have their severity raised; rebuild() recomputes everything from the
+    accidents table for backfill. Status changes do not touch any rollup
+    dimension and are ignored.
+    """
+
+    @staticmethod
+    def init_app(app):
+        """Subscribe to accident write events"""
+        if not app.config.get('ROLLUPS_ENABLED', True):
+            return
+        events.subscribe('accident.created', RollupService._on_created)
+        events.subscribe('accident.created_batch', RollupService._on_created_batch)
+        events.subscribe('accident.deleted', RollupService._on_deleted)
+        events.subscribe('accident.updated', RollupService._on_updated)
+
+    @staticmethod
+    def _on_created(accident, **kwargs):
+        if accident:
+            RollupService.record(accident['timestamp'], accident['severity'], accident['accident_type'], 1)
+
+    @staticmethod
+    def _on_created_batch(accidents, **kwargs):
+        RollupService.record_many([
+            (a['timestamp'], a['severity'], a['accident_type'], 1) for a in accidents
+        ])
+
+    @staticmethod
+    def _on_deleted(accident=None, **kwargs):
+        if accident:
+            RollupService.record(accident['timestamp'], accident['severity'], accident['accident_type'], -1)
+    
+    @staticmethod
+    def _on_updated(fields, accident=None, previous=None, **kwargs):
+        # A raised severity moves the accident between severity buckets
+        if 'severity' in fields and accident and previous:
+            RollupService.record_many([
+                (accident['timestamp'], previous['severity'], accident['accident_type'], -1),
+                (accident['timestamp'], accident['severity'], accident['accident_type'], 1)
+            ])
+
+    @staticmethod
+    def record(timestamp, severity, accident_type, delta):
+        """
+        Adjust the rollup bucket for one accident
+
+        Args:
+            timestamp: Accident timestamp
+            severity: Accident severity
+            accident_type: Accident type
+            delta: +1 for a new accident, -1 for a removed one
+        """
+        bucket = HOUR_BUCKET_SQL.format(col='%s')
+        query = f"""
+            INSERT INTO accident_rollups_hourly
+            (bucket_start, severity, accident_type, accident_count)
+            VALUES ({bucket}, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE accident_count = accident_count + VALUES(accident_count)
+        """
+        Database.execute_query(
+            query,
+            (timestamp, timestamp, severity, accident_type, delta),
+            commit=True
+        )
+
+    @staticmethod
+    def record_many(entries):
+        """
+        Adjust rollup buckets for many accidents in one statement
+
+        Args:
+            entries: List of (timestamp, severity, accident_type, delta)
+        """
+        if not entries:
+            return
+
+        bucket = HOUR_BUCKET_SQL.format(col='%s')
+        query = f"""
+            INSERT INTO accident_rollups_hourly
+            (bucket_start, severity, accident_type, accident_count)
+            VALUES ({bucket}, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE accident_count = accident_count + VALUES(accident_count)
+        """
+        Database.execute_many(query, [
+            (timestamp, timestamp, severity, accident_type, delta)
+            for timestamp, severity, accident_type, delta in entries
+        ])
+
+    @staticmethod
+    def trailing_hour():
+        """Start of the previous hour, the oldest bucket still taking new reports"""
+        return datetime.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=1)
+
+    @staticmethod
+    def recount(bucket_starts=(), since=None):
+        """
+        Recompute the rollup rows of some hours from the accidents table
+
+        Each chunk of hours is deleted and recounted in one transaction.
+        Recounting the trailing hour also restores increments lost to a
+        failed event handler.
+
+        Args:
+            bucket_starts: Hour bucket starts to recount
+            since: Also recount every hour from this bucket start on
+        """
+        hours = sorted(set(bucket_starts))
+        if since is not None:
+            hours = [hour for hour in hours if hour < since]
+
+        for start in range(0, len(hours), RECOUNT_CHUNK):
+            chunk = hours[start:start + RECOUNT_CHUNK]
+            RollupService._recount(
+                ' OR '.join(['bucket_start = %s'] * len(chunk)), chunk,
+                ' OR '.join(['(timestamp >= %s AND timestamp < %s + INTERVAL 1 HOUR)'] * len(chunk)),
+                [value for hour in chunk for value in (hour, hour)]
+            )
+        if since is not None:
+            RollupService._recount('bucket_start >= %s', [since], 'timestamp >= %s', [since])
+
+    @staticmethod
+    def _recount(rollup_where, rollup_params, accident_where, accident_params):
+        bucket = HOUR_BUCKET_SQL.format(col='timestamp')
+        with Database.transaction() as cursor:
+            cursor.execute(
+                f"DELETE FROM accident_rollups_hourly WHERE {rollup_where}",
+                tuple(rollup_params)
+            )
+            cursor.execute(f"""
+                INSERT INTO accident_rollups_hourly
+                (bucket_start, severity, accident_type, accident_count)
+                SELECT {bucket}, severity, accident_type, COUNT(*)
+                FROM accidents
+                WHERE {accident_where}
+                GROUP BY 1, 2, 3
+            """, tuple(accident_params))
+
+    @staticmethod
+    def rebuild():
+        """
+        Recompute all rollups from the accidents table
+
+        The new rollups are built in a side table and swapped in with an
+        atomic RENAME, so readers never see a partially built table. The
+        live counts are copied in the same transaction as the accidents
+        are counted. After the swap, every hour whose live counts changed
+        in between, and the trailing hour, is recounted from accidents.
+        Reports arriving during a rebuild are therefore not lost. An
+        increment that lands after the copy for an accident the count
+        already saw is not counted twice, as it would be if the
+        difference were added instead.
+
+        Returns:
+            Number of rollup rows written
+        """
+        bucket = HOUR_BUCKET_SQL.format(col='timestamp')
+
+        for table in ('accident_rollups_hourly_new', 'accident_rollups_hourly_base'):
+            Database.execute_query(f"DROP TABLE IF EXISTS {table}", commit=True)
+            Database.execute_query(f"CREATE TABLE {table} LIKE accident_rollups_hourly", commit=True)
+
+        with Database.transaction() as cursor:
+            cursor.execute(f"""
+                INSERT INTO accident_rollups_hourly_new
+                (bucket_start, severity, accident_type, accident_count)
+                SELECT {bucket}, severity, accident_type, COUNT(*)
+                FROM accidents
+                WHERE timestamp IS NOT NULL
+                GROUP BY 1, 2, 3
+            """)
+            cursor.execute("INSERT INTO accident_rollups_hourly_base SELECT * FROM accident_rollups_hourly")
+
+        Database.execute_query("""
+            RENAME TABLE accident_rollups_hourly TO accident_rollups_hourly_old,
+                         accident_rollups_hourly_new TO accident_rollups_hourly
+        """, commit=True)
+
+        # Hours that took increments during the rebuild
+        rows = Database.execute_query("""
+            SELECT DISTINCT o.bucket_start
+            FROM accident_rollups_hourly_old o
+            LEFT JOIN accident_rollups_hourly_base b
+                ON b.bucket_start = o.bucket_start
+                AND b.severity = o.severity
+                AND b.accident_type = o.accident_type
+            WHERE o.accident_count <> COALESCE(b.accident_count, 0)
+        """, fetch_all=True) or []
+        RollupService.recount([row['bucket_start'] for row in rows], since=RollupService.trailing_hour())
+
+        Database.execute_query("DROP TABLE accident_rollups_hourly_old", commit=True)
+        Database.execute_query("DROP TABLE accident_rollups_hourly_base", commit=True)
+
+        result = Database.execute_query(
+            "SELECT COUNT(*) as count FROM accident_rollups_hourly",
+            fetch_one=True
+        )
+        count = result['count'] if result else 0
+        logger.info(f"Rebuilt accident rollups ({count} buckets)")
+        return count
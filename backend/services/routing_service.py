@@ -0,0 +1,108 @@
+"""Drive-time estimates over an offline road graph"""
+import logging
+import os
+import threading
+from utils.road_graph import RoadGraph
+
+logger = logging.getLogger(__name__)
+
+class RoutingService:
+    """
+    Estimates drive times over a prepared RoadGraph
+
+    The graph is loaded from graph_path on first use and never touches the
+    network. A drive time is the road time between the junctions nearest
+    each end plus the straight-line distance to those junctions at
+    access_speed_kmh, which covers driveways and the last stretch of road.
+    """
+
+    def __init__(self, graph_path=None, access_speed_kmh=15, max_seconds=3600):
+        self.graph_path = graph_path
+        self.access_speed_kmh = access_speed_kmh
+        self.max_seconds = max_seconds
+        self._graph = None
+        self._failed = False
+        self._lock = threading.Lock()
+        self.queries = 0
+
+    def init_app(self, app):
+        """Configure from the Flask app"""
+        self.graph_path = app.config.get('ROAD_GRAPH_PATH') or None
+        self.access_speed_kmh = app.config.get('ROUTING_ACCESS_SPEED_KMH', self.access_speed_kmh)
+        self.max_seconds = app.config.get('ROUTING_MAX_SECONDS', self.max_seconds)
+        self._graph = None
+        self._failed = False
+
+    @property
+    def available(self):
+        """Whether a road graph is configured and loadable"""
+        return self.graph is not None
+
+    @property
+    def graph(self):
+        """The loaded RoadGraph, or None without a usable graph file"""
+        if self._graph is None and self.graph_path and not self._failed:
+            with self._lock:
+                if self._graph is None and not self._failed:
+                    try:
+                        self._graph = RoadGraph.load(self.graph_path)
+                        logger.info(
+                            f"Road graph loaded from {self.graph_path}: "
+                            f"{len(self._graph)} nodes, {self._graph.edge_count} edges"
+                        )
+                    except (OSError, ValueError, KeyError) as e:
+                        self._failed = True
+                        logger.error(f"Failed to load road graph {self.graph_path}: {e}")
+        return self._graph
+
+    def access_seconds(self, distance_km):
+        """Time to cover the gap between a point and its nearest junction"""
+        return distance_km / self.access_speed_kmh * 3600
+
+    def drive_times(self, latitude, longitude, points, inbound=False):
+        """
+        Estimate drive times between one location and many points
+
+        Args:
+            latitude, longitude: The shared end, e.g. the caller
+            points: List of (latitude, longitude)
+            inbound: Time trips from each point to the location (an
+                     ambulance coming to the caller) rather than from the
+                     location to each point
+
+        Returns:
+            List of seconds parallel to points; None where a point is not
+            reachable within max_seconds
+        """
+        graph = self.graph
+        if graph is None or not points:
+            return [None] * len(points)
+
+        origin, origin_km = graph.nearest_node(latitude, longitude)
+        snapped = [graph.nearest_node(float(lat), float(lon)) for lat, lon in points]
+        times = graph.travel_times(
+            origin, {node for node, _ in snapped}, reverse=inbound, max_seconds=self.max_seconds
+        )
+        self.queries += 1
+
+        results = []
+        for node, distance_km in snapped:
+            seconds = times.get(node)
+            if seconds is not None:
+                seconds += self.access_seconds(origin_km) + self.access_seconds(distance_km)
+            results.append(seconds)
+        return results
+
+    def stats(self):
+        """Get graph size and query counter"""
+        graph = self._graph
+        return {
+            'configured': bool(self.graph_path),
+            'loaded': graph is not None,
+            'graph': os.path.basename(self.graph_path) if self.graph_path else None,
+            'nodes': len(graph) if graph is not None else 0,
+            'edges': graph.edge_count if graph is not None else 0,
+            'queries': self.queries
+        }
+
+routing_service = RoutingService()
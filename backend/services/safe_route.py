@@ -0,0 +1,386 @@
+"""Routes that trade travel time against accident risk"""
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from database import Database
+from models.alert import Alert
+from services.routing_service import routing_service
+from services.zone_service import SEVERITY_WEIGHTS
+from utils import events
+from utils.route_bounds import load_bounds
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+logger = logging.getLogger(__name__)
+
+# Risk per kilometer of road inside an alert, relative to one accident of
+# the same severity on the road
+ALERT_RISK_PER_KM = 3
+
+class SafeRouteService:
+    """
+    Finds routes minimizing travel time plus weighted accident risk
+
+    Every edge of the road graph carries a risk score. An accident adds
+    its severity weight to each edge passing within risk_radius_m of it for
+    window_days; an active alert adds ALERT_RISK_PER_KM times its severity
+    weight per kilometer of each edge inside its radius. Scores are built
+    once from the database on first use, then adjusted in place by the
+    accident and alert write events, remembering which edges each record
+    touched so a delete, deactivation or expiry subtracts exactly what was
+    added. Accidents that fall out of the window are dropped every
+    EVICT_INTERVAL_SECONDS.
+
+    A route minimizes seconds + safety * penalty_seconds * risk over the
+    graph by bidirectional A*, so safety 0 is the fastest route and each
+    unit of safety is willing to spend penalty_seconds to avoid one
+    accident's worth of risk. Travel-time landmarks alone bound such
+    searches poorly, so every bounds_minutes a child process (see
+    utils.route_bounds) rebuilds landmark bounds over the saved graph from
+    the accidents that will still be inside the window at the next
+    rebuild. Scores only grow past that snapshot until then;
+    deleting one of its accidents drops the bounds until the next rebuild.
+    """
+
+    EVICT_INTERVAL_SECONDS = 600
+    LANDMARKS = 16
+
+    def __init__(self, window_days=90, risk_radius_m=100, penalty_seconds=60, bounds_minutes=60):
+        self.enabled = True
+        self.window_days = window_days
+        self.risk_radius_m = risk_radius_m
+        self.penalty_seconds = penalty_seconds
+        self.bounds_minutes = bounds_minutes
+        self._graph = None
+        self._risk = None
+        self._accidents = {}
+        self._alerts = {}
+        self._last_evict = float('-inf')
+        self._bounds = None
+        self._bounds_ids = set()
+        self._pending_ids = set()
+        self._bounds_built_at = float('-inf')
+        self._bounds_thread = None
+        self._lock = threading.RLock()
+        self.routes = 0
+        self.updates = 0
+
+    def init_app(self, app):
+        """Configure from the Flask app and subscribe to accident and alert writes"""
+        self.enabled = app.config.get('ROUTE_RISK_ENABLED', True)
+        self.window_days = app.config.get('ROUTE_RISK_WINDOW_DAYS', self.window_days)
+        self.risk_radius_m = app.config.get('ROUTE_RISK_RADIUS_M', self.risk_radius_m)
+        self.penalty_seconds = app.config.get('ROUTE_RISK_PENALTY_SECONDS', self.penalty_seconds)
+        self.bounds_minutes = app.config.get('ROUTE_RISK_BOUNDS_MINUTES', self.bounds_minutes)
+
+        if self.enabled:
+            events.subscribe('accident.created', self._on_accident_created)
+            events.subscribe('accident.created_batch', self._on_accidents_created)
+            events.subscribe('accident.deleted', self._on_accident_deleted)
+            events.subscribe('accident.updated', self._on_accident_updated)
+            events.subscribe('alert.created', self._on_alert_created)
+            events.subscribe('alert.created_batch', self._on_alerts_created)
+            events.subscribe('alert.deactivated', self._on_alert_removed)
+            events.subscribe('alert.expired', self._on_alerts_expired)
+
+    @property
+    def available(self):
+        """Whether a road graph is configured and loadable"""
+        return routing_service.available
+
+    # Risk scores
+
+    def _load(self, graph):
+        """Score every edge from recent accidents and active alerts; caller holds the lock"""
+        self._graph = graph
+        self._risk = [0.0] * graph.edge_count
+        self._accidents = {}
+        self._alerts = {}
+        self._bounds = None
+        self._bounds_ids = set()
+        self._bounds_built_at = float('-inf')
+
+        horizon = datetime.now() - timedelta(days=self.window_days)
+        query = """
+            SELECT id, latitude, longitude, severity, timestamp
+            FROM accidents
+            WHERE timestamp >= %s
+        """
+        for row in Database.stream_query(query, (horizon,), batch_size=5000):
+            self._add_accident(row)
+        for row in Alert.get_active_alerts():
+            self._add_alert(row)
+
+        self._last_evict = time.monotonic()
+        logger.info(
+            f"Route risk scored {graph.edge_count} edges from "
+            f"{len(self._accidents)} accidents and {len(self._alerts)} alerts"
+        )
+
+    def _ready(self):
+        """Load scores against the current graph if needed; returns the graph or None"""
+        graph = routing_service.graph
+        if graph is None:
+            return None
+        with self._lock:
+            if self._graph is not graph:
+                self._load(graph)
+            elif time.monotonic() - self._last_evict >= self.EVICT_INTERVAL_SECONDS:
+                self.evict()
+            if time.monotonic() - self._bounds_built_at >= self.bounds_minutes * 60 and \
+                    (self._bounds_thread is None or not self._bounds_thread.is_alive()):
+                self._bounds_built_at = time.monotonic()
+                self._bounds_thread = threading.Thread(
+                    target=self._rebuild_bounds, args=(graph,), name='route-bounds', daemon=True
+                )
+                self._bounds_thread.start()
+        return graph
+
+    def _rebuild_bounds(self, graph):
+        """Build landmark bounds over travel time plus the accident risk that outlasts the next rebuild"""
+        started = time.monotonic()
+        keep_after = datetime.now() - timedelta(days=self.window_days) + timedelta(minutes=self.bounds_minutes)
+        with self._lock:
+            if self._graph is not graph:
+                return
+            base = np.zeros(graph.edge_count)
+            ids = set()
+            for accident_id, (edges, amounts, timestamp) in self._accidents.items():
+                if timestamp >= keep_after:
+                    np.add.at(base, edges, amounts)
+                    ids.add(accident_id)
+            self._pending_ids = ids
+
+        # Two full searches per landmark would hold the GIL (or, under
+        # gevent, the whole worker) for tens of seconds, so a child process
+        # searches the saved graph while this thread only waits on it
+        try:
+            with tempfile.TemporaryDirectory(prefix='route-bounds-') as workdir:
+                penalties_path = os.path.join(workdir, 'penalties.npy')
+                output_path = os.path.join(workdir, 'bounds.npz')
+                np.save(penalties_path, base)
+                subprocess.run(
+                    [
+                        sys.executable, '-m', 'utils.route_bounds',
+                        routing_service.graph_path, penalties_path, output_path,
+                        '--penalty-weight', str(self.penalty_seconds),
+                        '--landmarks', str(self.LANDMARKS)
+                    ],
+                    cwd=BACKEND_DIR, check=True, capture_output=True, text=True
+                )
+                bounds = load_bounds(output_path, self.penalty_seconds)
+        except subprocess.CalledProcessError as e:
+            # The child's last stderr line carries its exception
+            detail = e.stderr.strip().splitlines()
+            logger.error(f"Route risk bounds rebuild failed: {detail[-1] if detail else e}")
+            return
+        except Exception as e:
+            logger.error(f"Route risk bounds rebuild failed: {e}")
+            return
+
+        with self._lock:
+            # A snapshot accident deleted meanwhile leaves these tables too high
+            if self._graph is graph and self._pending_ids is ids:
+                self._bounds = bounds
+                self._bounds_ids = ids
+            self._pending_ids = set()
+        logger.info(
+            f"Route risk bounds rebuilt over {len(ids)} accidents in {time.monotonic() - started:.1f}s"
+        )
+
+    def _apply(self, edges, amounts, sign):
+        risk = self._risk
+        for edge, amount in zip(edges, amounts):
+            value = risk[edge] + sign * amount
+            risk[edge] = value if value > 1e-9 else 0.0
+
+    def _add_accident(self, accident):
+        if accident['id'] in self._accidents:
+            return
+        weight = SEVERITY_WEIGHTS.get(accident.get('severity'), 1)
+        edges = self._graph.edges_near(
+            float(accident['latitude']), float(accident['longitude']), self.risk_radius_m / 1000
+        ).tolist()
+        amounts = [weight] * len(edges)
+        self._apply(edges, amounts, 1)
+        self._accidents[accident['id']] = (edges, amounts, accident.get('timestamp') or datetime.now())
+        self.updates += 1
+
+    def _add_alert(self, alert):
+        if alert['id'] in self._alerts or not alert.get('is_active', True):
+            return
+        weight = SEVERITY_WEIGHTS.get(alert.get('severity'), 1) * ALERT_RISK_PER_KM
+        edges = self._graph.edges_near(
+            float(alert['latitude']), float(alert['longitude']), float(alert['radius'] or 0)
+        )
+        amounts = (self._graph.edge_length[edges] / 1000 * weight).tolist()
+        edges = edges.tolist()
+        self._apply(edges, amounts, 1)
+        self._alerts[alert['id']] = (edges, amounts)
+        self.updates += 1
+
+    def _remove(self, records, record_id):
+        record = records.pop(record_id, None)
+        if record is None:
+            return
+        self._apply(record[0], record[1], -1)
+        self.updates += 1
+
+        if records is self._accidents:
+            # Bounds must not exceed the scores, so drop any built with this accident
+            if record_id in self._bounds_ids:
+                self._bounds = None
+                self._bounds_ids = set()
+                self._bounds_built_at = float('-inf')
+            if record_id in self._pending_ids:
+                self._pending_ids = set()
+
+    def evict(self):
+        """
+        Drop accidents older than window_days from the scores
+
+        Returns:
+            Number of accidents dropped
+        """
+        horizon = datetime.now() - timedelta(days=self.window_days)
+        with self._lock:
+            stale = [
+                accident_id for accident_id, (_, _, timestamp) in self._accidents.items()
+                if timestamp < horizon
+            ]
+            for accident_id in stale:
+                self._remove(self._accidents, accident_id)
+            self._last_evict = time.monotonic()
+        return len(stale)
+
+    def _on_accident_created(self, accident, **kwargs):
+        if accident:
+            self._on_accidents_created([accident])
+
+    def _on_accidents_created(self, accidents, **kwargs):
+        with self._lock:
+            if self._graph is None:
+                return
+            for accident in accidents:
+                self._add_accident(accident)
+
+    def _on_accident_deleted(self, accident_id, **kwargs):
+        with self._lock:
+            if self._graph is not None:
+                self._remove(self._accidents, accident_id)
+
+    def _on_accident_updated(self, accident_id, fields, accident=None, **kwargs):
+        # A raised severity re-weights the accident's edges
+        if 'severity' not in fields or not accident:
+            return
+        with self._lock:
+            if self._graph is not None and accident_id in self._accidents:
+                self._remove(self._accidents, accident_id)
+                self._add_accident(accident)
+
+    def _on_alert_created(self, alert, **kwargs):
+        if alert:
+            self._on_alerts_created([alert])
+
+    def _on_alerts_created(self, alerts, **kwargs):
+        with self._lock:
+            if self._graph is None:
+                return
+            for alert in alerts:
+                self._add_alert(alert)
+
+    def _on_alert_removed(self, alert_id, **kwargs):
+        with self._lock:
+            if self._graph is not None:
+                self._remove(self._alerts, alert_id)
+
+    def _on_alerts_expired(self, alerts, **kwargs):
+        with self._lock:
+            if self._graph is not None:
+                for alert in alerts:
+                    self._remove(self._alerts, alert['id'])
+
+    # Routing
+
+    def _summary(self, graph, edges, origin_km, destination_km):
+        seconds = sum(graph.seconds[edge] for edge in edges)
+        seconds += routing_service.access_seconds(origin_km) + routing_service.access_seconds(destination_km)
+        return {
+            'duration_seconds': round(seconds),
+            'distance_km': round(float(graph.edge_length[edges].sum()) / 1000 + origin_km + destination_km, 2),
+            'risk_score': round(sum(self._risk[edge] for edge in edges), 2)
+        }
+
+    def route(self, origin_lat, origin_lon, dest_lat, dest_lon, safety=1.0, compare=False):
+        """
+        Find the route balancing travel time against accident risk
+
+        Args:
+            origin_lat, origin_lon: Start of the trip
+            dest_lat, dest_lon: End of the trip
+            safety: Multiplier on penalty_seconds per unit of risk; 0 gives
+                    the fastest route
+            compare: Also summarize the fastest route
+
+        Returns:
+            Dict with duration_seconds, distance_km, risk_score and geometry
+            as [[lat, lon], ...], plus 'fastest' when compare is set; None
+            if the destination cannot be reached by road
+        """
+        graph = self._ready()
+        if graph is None:
+            return None
+
+        origin, origin_km = graph.nearest_node(origin_lat, origin_lon)
+        destination, destination_km = graph.nearest_node(dest_lat, dest_lon)
+
+        # Searches read the live scores without the lock; an event landing
+        # mid-search only shifts costs by that one record
+        cost, edges = graph.astar(
+            origin, destination, self._risk, safety * self.penalty_seconds, bounds=self._bounds
+        )
+        if cost is None:
+            return None
+        result = self._summary(graph, edges, origin_km, destination_km)
+
+        if compare:
+            if safety:
+                _, fastest = graph.astar(origin, destination)
+            else:
+                fastest = edges
+            result['fastest'] = self._summary(graph, fastest, origin_km, destination_km)
+
+        # Consecutive edges share their junction, so skip each shape's first point
+        geometry = [[origin_lat, origin_lon]]
+        for position, edge in enumerate(edges):
+            shape = graph.edge_shape(edge)
+            geometry.extend([lat, lon] for lat, lon in (shape[1:] if position else shape))
+        if not edges:
+            geometry.append([float(graph.lats[origin]), float(graph.lons[origin])])
+        geometry.append([dest_lat, dest_lon])
+        result['geometry'] = geometry
+        result['safety'] = safety
+        self.routes += 1
+        return result
+
+    def stats(self):
+        """Get score coverage and counters"""
+        risk = self._risk
+        return {
+            'enabled': self.enabled,
+            'loaded': risk is not None,
+            'accidents': len(self._accidents),
+            'alerts': len(self._alerts),
+            'risky_edges': sum(1 for value in risk if value) if risk is not None else 0,
+            'bounds_accidents': len(self._bounds_ids) if self._bounds is not None else None,
+            'routes': self.routes,
+            'updates': self.updates
+        }
+
+safe_route = SafeRouteService()
@@ -0,0 +1,271 @@
+"""Vector tiles for the accident, alert and emergency service map layers"""
+import hashlib
+import logging
+from datetime import datetime
+from decimal import Decimal
+from database import Database
+from utils import events
+from utils.cache import MemoryCacheBackend
+from utils.mvt import EXTENT, encode_tile
+from utils.tiles import MAX_ZOOM, pixel, tile_bounds
+
+logger = logging.getLogger(__name__)
+
+# Global Web Mercator cell of a row; the %s is cells across the world
+_CELL_X = "FLOOR((longitude + 180) / 360 * %s)"
+_CELL_Y = (
+    "FLOOR((0.5 - LN((1 + SIN(RADIANS(latitude))) / (1 - SIN(RADIANS(latitude)))) / (4 * PI())) * %s)"
+)
+
+LAYERS = {
+    'accidents': {
+        'table': 'accidents',
+        'where': 'timestamp >= NOW() - INTERVAL %s DAY',
+        'properties': ['accident_type', 'severity', 'status', 'timestamp'],
+        'breakdown': ('severity', ['low', 'medium', 'high'])
+    },
+    'alerts': {
+        'table': 'alerts',
+        'where': 'is_active = TRUE AND (expires_at IS NULL OR expires_at > NOW())',
+        'properties': ['alert_type', 'severity', 'radius', 'message', 'expires_at'],
+        'breakdown': ('severity', ['low', 'medium', 'high'])
+    },
+    'emergency_services': {
+        'table': 'emergency_services',
+        'where': 'is_active = TRUE',
+        'properties': ['name', 'type', 'phone'],
+        'breakdown': ('type', ['hospital', 'police', 'ambulance'])
+    }
+}
+
+# Writes larger than this clear a layer instead of dropping tiles one by one
+BATCH_CLEAR_THRESHOLD = 500
+
+class VectorTileService:
+    """
+    Mapbox Vector Tiles of the map layers, cached per tile
+
+    Up to cluster_max_zoom, points are grouped in SQL into a grid of
+    cluster_cells x cluster_cells per tile and each group becomes one
+    feature with cluster=true, point_count and per-severity (or per-type)
+    counts; groups of one are plain points. Deeper zooms carry every
+    point, with a buffer so symbols are not cut at tile edges.
+
+    Writes drop only the cached tiles containing the written point, one
+    per zoom. Changes without a location clear the layer, and the TTL
+    covers rows that age out of a layer's filter (expired alerts, old
+    accidents).
+    """
+
+    def __init__(self, cluster_max_zoom=12, cluster_cells=16, buffer=0.0625,
+                 ttl=60, cache_size=4096, accident_days=30):
+        self.enabled = True
+        self.cluster_max_zoom = cluster_max_zoom
+        self.cluster_cells = cluster_cells
+        self.buffer = buffer
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self.accident_days = accident_days
+        self._cache = MemoryCacheBackend()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        """Configure from the Flask app and subscribe to layer writes"""
+        self.enabled = app.config.get('VECTOR_TILES_ENABLED', True)
+        self.cluster_max_zoom = app.config.get('VECTOR_TILE_CLUSTER_MAX_ZOOM', self.cluster_max_zoom)
+        self.cluster_cells = app.config.get('VECTOR_TILE_CLUSTER_CELLS', self.cluster_cells)
+        self.ttl = app.config.get('VECTOR_TILE_TTL', self.ttl)
+        self.cache_size = app.config.get('VECTOR_TILE_CACHE_SIZE', self.cache_size)
+        self.accident_days = app.config.get('VECTOR_TILE_ACCIDENT_DAYS', self.accident_days)
+        self._cache = MemoryCacheBackend()
+
+        if self.enabled:
+            events.subscribe('accident.created', self._on_accident_created)
+            events.subscribe('accident.created_batch', self._on_accident_created_batch)
+            events.subscribe('accident.updated', self._on_accident_updated)
+            events.subscribe('accident.deleted', self._on_accident_deleted)
+            events.subscribe('alert.created', self._on_alert_created)
+            events.subscribe('alert.created_batch', self._on_alert_created_batch)
+            events.subscribe('alert.deactivated', self._on_alert_deactivated)
+            events.subscribe('alert.expired', self._on_alert_expired)
+            events.subscribe('emergency_service.changed', self._on_emergency_service_changed)
+
+    # Invalidation
+
+    def invalidate(self, layer):
+        """Drop every cached tile of a layer"""
+        self._cache.clear(layer)
+
+    def invalidate_point(self, layer, latitude, longitude):
+        """Drop the cached tiles of a layer that show a coordinate"""
+        for z in range(MAX_ZOOM + 1):
+            px, py = pixel(latitude, longitude, z, EXTENT)
+            margin = int(self.buffer * EXTENT) if z > self.cluster_max_zoom else 0
+            xs = {(px - margin) // EXTENT, (px + margin) // EXTENT}
+            ys = {(py - margin) // EXTENT, (py + margin) // EXTENT}
+            for x in xs:
+                for y in ys:
+                    self._cache.delete(layer, (z, x, y))
+
+    def _invalidate_rows(self, layer, rows):
+        if len(rows) > BATCH_CLEAR_THRESHOLD:
+            self.invalidate(layer)
+            return
+        for row in rows:
+            self.invalidate_point(layer, row['latitude'], row['longitude'])
+
+    def _on_accident_created(self, accident, **kwargs):
+        if accident:
+            self.invalidate_point('accidents', accident['latitude'], accident['longitude'])
+
+    def _on_accident_created_batch(self, accidents, **kwargs):
+        self._invalidate_rows('accidents', accidents)
+
+    def _on_accident_updated(self, accident_id, fields, accident=None, **kwargs):
+        # Only status and severity are drawn; image and report bookkeeping is not
+        if 'severity' in fields and accident:
+            self.invalidate_point('accidents', accident['latitude'], accident['longitude'])
+        elif 'status' in fields or 'severity' in fields:
+            self.invalidate('accidents')
+
+    def _on_accident_deleted(self, accident_id, accident=None, **kwargs):
+        if accident:
+            self.invalidate_point('accidents', accident['latitude'], accident['longitude'])
+        else:
+            self.invalidate('accidents')
+
+    def _on_alert_created(self, alert, **kwargs):
+        if alert:
+            self.invalidate_point('alerts', alert['latitude'], alert['longitude'])
+
+    def _on_alert_created_batch(self, alerts, **kwargs):
+        self._invalidate_rows('alerts', alerts)
+
+    def _on_alert_deactivated(self, alert_id, **kwargs):
+        self.invalidate('alerts')
+
+    def _on_alert_expired(self, alerts, **kwargs):
+        self._invalidate_rows('alerts', alerts)
+
+    def _on_emergency_service_changed(self, service_id, **kwargs):
+        self.invalidate('emergency_services')
+
+    # Rendering
+
+    def _where_params(self, layer):
+        return (self.accident_days,) if layer == 'accidents' else ()
+
+    @staticmethod
+    def _property(value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return float(value)
+        return value
+
+    def _position(self, row, z, x, y):
+        px, py = pixel(row['latitude'], row['longitude'], z, EXTENT)
+        return px - x * EXTENT, py - y * EXTENT
+
+    def _points(self, layer, z, x, y):
+        """Every point of a layer in the buffered tile"""
+        spec = LAYERS[layer]
+        min_lat, min_lon, max_lat, max_lon = tile_bounds(z, x, y, self.buffer)
+        query = f"""
+            SELECT id, latitude, longitude, {', '.join(spec['properties'])}
+            FROM {spec['table']}
+            WHERE {spec['where']}
+            AND latitude BETWEEN %s AND %s
+            AND longitude BETWEEN %s AND %s
+        """
+        params = self._where_params(layer) + (min_lat, max_lat, min_lon, max_lon)
+        rows = Database.execute_query(query, params, fetch_all=True) or []
+
+        features = []
+        for row in rows:
+            px, py = self._position(row, z, x, y)
+            features.append((row['id'], px, py, {
+                name: self._property(row[name]) for name in spec['properties']
+            }))
+        return features
+
+    def _clusters(self, layer, z, x, y):
+        """Points of a layer in the tile grouped into grid cells"""
+        spec = LAYERS[layer]
+        column, values = spec['breakdown']
+        min_lat, min_lon, max_lat, max_lon = tile_bounds(z, x, y)
+        cells = (1 << z) * self.cluster_cells
+
+        breakdown = ', '.join(f"SUM({column} = %s) AS `{value}`" for value in values)
+        first = ', '.join(f"MIN({name}) AS {name}" for name in spec['properties'])
+        query = f"""
+            SELECT COUNT(*) AS point_count, MIN(id) AS id,
+                   AVG(latitude) AS latitude, AVG(longitude) AS longitude,
+                   {breakdown}, {first},
+                   {_CELL_X} AS cell_x, {_CELL_Y} AS cell_y
+            FROM {spec['table']}
+            WHERE {spec['where']}
+            AND latitude BETWEEN %s AND %s
+            AND longitude BETWEEN %s AND %s
+            GROUP BY cell_x, cell_y
+        """
+        params = tuple(values) + (cells, cells) + self._where_params(layer) + \
+            (min_lat, max_lat, min_lon, max_lon)
+        rows = Database.execute_query(query, params, fetch_all=True) or []
+
+        features = []
+        for row in rows:
+            px, py = self._position(row, z, x, y)
+            if row['point_count'] == 1:
+                features.append((row['id'], px, py, {
+                    name: self._property(row[name]) for name in spec['properties']
+                }))
+                continue
+
+            properties = {'cluster': True, 'point_count': int(row['point_count'])}
+            for value in values:
+                properties[value] = int(row[value] or 0)
+            features.append((None, px, py, properties))
+        return features
+
+    def get_tile(self, layer, z, x, y):
+        """
+        Get one layer of a tile as a Mapbox Vector Tile
+
+        Args:
+            layer: A key of LAYERS
+            z, x, y: Tile address
+
+        Returns:
+            Tuple (tile bytes, etag)
+        """
+        key = (z, x, y)
+        entry = self._cache.get(layer, key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        if z <= self.cluster_max_zoom:
+            features = self._clusters(layer, z, x, y)
+        else:
+            features = self._points(layer, z, x, y)
+
+        body = encode_tile([(layer, features)])
+        entry = (body, hashlib.sha1(body).hexdigest())
+        self._cache.set(layer, key, entry, self.ttl, self.cache_size)
+        return entry
+
+    def stats(self):
+        """Get cache counters and cached tiles per layer"""
+        total = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0,
+            'tiles': self._cache.stats()
+        }
+
+vector_tiles = VectorTileService()
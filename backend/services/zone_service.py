@@ -0,0 +1,243 @@
+"""Accident-prone zone detection by density clustering"""
+import json
+import logging
+import threading
+import uuid
+from datetime import datetime, timedelta
+import numpy as np
+from database import Database
+from utils import events
+from utils.clustering import dbscan, convex_hull
+from utils.geolocation import haversine_many
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_LEVELS = ['low', 'medium', 'high']
+SEVERITY_WEIGHTS = {'low': 1, 'medium': 2, 'high': 4}
+
+def build_zones(lats, lons, severities, timestamps, eps_km, min_samples, min_accidents=1):
+    """
+    Cluster accident points into zones
+
+    Args:
+        lats, lons: Accident coordinates
+        severities: Severity names, parallel to the coordinates
+        timestamps: Accident timestamps, parallel to the coordinates
+        eps_km: DBSCAN neighbourhood radius in kilometers
+        min_samples: DBSCAN core point threshold
+        min_accidents: Smallest cluster to report
+
+    Returns:
+        List of zone dicts sorted by severity-weighted score, highest first
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    labels = dbscan(lats, lons, eps_km, min_samples)
+    if not len(labels) or labels.max() < 0:
+        return []
+
+    levels = {name: i for i, name in enumerate(SEVERITY_LEVELS)}
+    severity_codes = np.array([levels.get(s, 0) for s in severities], dtype=np.int64)
+    weights = np.array([SEVERITY_WEIGHTS[name] for name in SEVERITY_LEVELS])
+    times = np.array(timestamps, dtype='datetime64[s]')
+
+    clustered = np.nonzero(labels >= 0)[0]
+    order = clustered[np.argsort(labels[clustered], kind='stable')]
+    _, starts, sizes = np.unique(labels[order], return_index=True, return_counts=True)
+
+    zones = []
+    for start, size in zip(starts, sizes):
+        if size < min_accidents:
+            continue
+        members = order[start:start + size]
+        member_lats, member_lons = lats[members], lons[members]
+        counts = np.bincount(severity_codes[members], minlength=len(SEVERITY_LEVELS))
+
+        centroid_lat = float(member_lats.mean())
+        centroid_lon = float(member_lons.mean())
+        hull = convex_hull(zip(member_lons.tolist(), member_lats.tolist()))
+
+        zones.append({
+            'centroid_lat': round(centroid_lat, 6),
+            'centroid_lon': round(centroid_lon, 6),
+            'radius_km': round(float(haversine_many(centroid_lat, centroid_lon, member_lats, member_lons).max()), 3),
+            'accident_count': int(size),
+            'low_count': int(counts[0]),
+            'medium_count': int(counts[1]),
+            'high_count': int(counts[2]),
+            'score': int((counts * weights).sum()),
+            'polygon': [[round(lat, 6), round(lon, 6)] for lon, lat in hull],
+            'min_lat': float(member_lats.min()),
+            'max_lat': float(member_lats.max()),
+            'min_lon': float(member_lons.min()),
+            'max_lon': float(member_lons.max()),
+            'last_accident_at': times[members].max().astype(datetime)
+        })
+
+    zones.sort(key=lambda z: (z['score'], z['accident_count']), reverse=True)
+    return zones
+
+class ZoneService:
+    """
+    Maintains accident_zones, the precomputed accident-prone zones
+
+    Zones are DBSCAN clusters of the accidents in the last
+    ZONES_WINDOW_DAYS days, with convex hull polygons and severity-weighted
+    scores. A background thread recomputes them every
+    ZONES_REFRESH_MINUTES when accidents were written since the last run
+    (and at least daily, as the window slides); `flask rebuild-zones`
+    forces a run.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.window_days = 90
+        self.eps_km = 0.25
+        self.min_samples = 3
+        self.refresh_seconds = 900
+        self._dirty = True
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._stopping = False
+
+    def init_app(self, app):
+        """Configure from the Flask app and start the refresh thread"""
+        self.enabled = app.config.get('ZONES_ENABLED', True)
+        self.window_days = app.config.get('ZONES_WINDOW_DAYS', self.window_days)
+        self.eps_km = app.config.get('ZONES_EPS_KM', self.eps_km)
+        self.min_samples = app.config.get('ZONES_MIN_SAMPLES', self.min_samples)
+        self.refresh_seconds = app.config.get('ZONES_REFRESH_MINUTES', 15) * 60
+
+        for event in ('accident.created', 'accident.created_batch', 'accident.deleted'):
+            events.subscribe(event, self._mark_dirty)
+        events.subscribe('accident.updated', self._on_updated)
+
+        if self.enabled and self.refresh_seconds > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='zone-refresh', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Ask the refresh thread to exit"""
+        self._stopping = True
+        self._wakeup.set()
+
+    def _mark_dirty(self, **kwargs):
+        self._dirty = True
+
+    def _on_updated(self, fields, **kwargs):
+        # Zone scores are severity-weighted
+        if 'severity' in fields:
+            self._dirty = True
+
+    def compute_zones(self, days=None, min_accidents=1):
+        """
+        Cluster accidents from the last N days without persisting
+
+        Returns:
+            List of zone dicts
+        """
+        horizon = datetime.now() - timedelta(days=days or self.window_days)
+        lats, lons, severities, timestamps = [], [], [], []
+
+        query = "SELECT latitude, longitude, severity, timestamp FROM accidents WHERE timestamp >= %s"
+        for row in Database.stream_query(query, (horizon,), batch_size=5000):
+            lats.append(float(row['latitude']))
+            lons.append(float(row['longitude']))
+            severities.append(row['severity'])
+            timestamps.append(row['timestamp'])
+
+        return build_zones(lats, lons, severities, timestamps, self.eps_km, self.min_samples, min_accidents)
+
+    def refresh(self):
+        """
+        Recompute and persist zones
+
+        Zones are written to a side table and swapped in with an atomic
+        RENAME, so readers never see a partial result.
+
+        Returns:
+            Number of zones written
+        """
+        self._dirty = False
+        zones = self.compute_zones()
+
+        suffix = uuid.uuid4().hex[:8]
+        new_table = f"accident_zones_new_{suffix}"
+        old_table = f"accident_zones_old_{suffix}"
+
+        Database.execute_query(f"CREATE TABLE {new_table} LIKE accident_zones", commit=True)
+        try:
+            if zones:
+                Database.execute_many(f"""
+                    INSERT INTO {new_table}
+                    (centroid_lat, centroid_lon, radius_km, accident_count, low_count, medium_count,
+                     high_count, score, polygon, min_lat, max_lat, min_lon, max_lon,
+                     last_accident_at, window_days)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """, [
+                    (z['centroid_lat'], z['centroid_lon'], z['radius_km'], z['accident_count'],
+                     z['low_count'], z['medium_count'], z['high_count'], z['score'],
+                     json.dumps(z['polygon']), z['min_lat'], z['max_lat'], z['min_lon'], z['max_lon'],
+                     z['last_accident_at'], self.window_days)
+                    for z in zones
+                ])
+            Database.execute_query(f"""
+                RENAME TABLE accident_zones TO {old_table},
+                             {new_table} TO accident_zones
+            """, commit=True)
+        except Exception:
+            Database.execute_query(f"DROP TABLE IF EXISTS {new_table}", commit=True)
+            raise
+        Database.execute_query(f"DROP TABLE {old_table}", commit=True)
+
+        logger.info(f"Refreshed accident zones ({len(zones)} zones)")
+        return len(zones)
+
+    def _last_refresh_age(self):
+        row = Database.execute_query(
+            "SELECT TIMESTAMPDIFF(SECOND, MAX(computed_at), NOW()) as age FROM accident_zones",
+            fetch_one=True
+        )
+        return row['age'] if row else None
+
+    def _due(self):
+        age = self._last_refresh_age()
+        if age is None:
+            # Never computed, or no zones yet
+            return True
+        if age < self.refresh_seconds:
+            # Another process refreshed recently
+            return False
+        return self._dirty or age >= 86400
+
+    def _run(self):
+        while not self._stopping:
+            try:
+                if self._due():
+                    self.refresh()
+            except Exception as e:
+                logger.error(f"Zone refresh failed: {e}")
+            self._wakeup.wait(self.refresh_seconds)
+
+    def get_zones(self, min_accidents=1):
+        """
+        Read precomputed zones
+
+        Returns:
+            List of zones, highest score first
+        """
+        query = """
+            SELECT *
+            FROM accident_zones
+            WHERE accident_count >= %s
+            ORDER BY score DESC, accident_count DESC
+        """
+        rows = Database.execute_query(query, (min_accidents,), fetch_all=True) or []
+        for row in rows:
+            for key in ('centroid_lat', 'centroid_lon', 'radius_km', 'min_lat', 'max_lat', 'min_lon', 'max_lon'):
+                row[key] = float(row[key])
+            if isinstance(row['polygon'], (str, bytes)):
+                row['polygon'] = json.loads(row['polygon'])
+        return rows
+
+zone_service = ZoneService()
@@ -1,65 +1,244 @@
 """Backup and restore utilities"""
+import gzip
 import json
 import os
+import zlib
 from datetime import datetime
 from database import Database
 
+# Tables in restore order (parents before children), as (table, columns,
+# primary key to page on). Users are backed up without password hashes.
+BACKUP_TABLES = [
+    ('users', ['id', 'username', 'email', 'role', 'created_at'], 'id'),
+    ('accidents', None, 'id'),
+    ('accident_reports', None, 'id'),
+    ('alerts', None, 'id'),
+    ('alerts_archive', None, 'id'),
+    ('notifications', None, 'id'),
+    ('user_locations', None, 'user_id'),
+    ('upload_blobs', None, 'sha256'),
+    ('emergency_services', None, 'id'),
+    ('awareness_content', None, 'id'),
+]
+
+COMPRESSION_EXTENSIONS = {
+    'gzip': '.ndjson.gz',
+    'zstd': '.ndjson.zst',
+}
+
+class _MemberWriter:
+    """Writes one independently decompressible member onto an open file"""
+    
+    def __init__(self, raw, compression):
+        self._raw = raw
+        if compression == 'zstd':
+            import zstandard
+            self._stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=False)
+        else:
+            self._stream = gzip.GzipFile(fileobj=raw, mode='wb', mtime=0)
+    
+    def write(self, data):
+        self._stream.write(data)
+    
+    def close(self):
+        self._stream.close()
+
+def _member_lines(filepath, offset, length, compression, chunk_size=1 << 20):
+    """
+    Yield decoded lines from one compressed member of a backup file
+    
+    Only chunk_size compressed bytes plus one partial line are held in
+    memory at a time.
+    """
+    if compression == 'zstd':
+        import zstandard
+        decompressor = zstandard.ZstdDecompressor().decompressobj()
+    else:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    
+    buffer = b''
+    remaining = length
+    with open(filepath, 'rb') as f:
+        f.seek(offset)
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            
+            buffer += decompressor.decompress(chunk)
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                if line:
+                    yield line
+    
+    if buffer:
+        yield buffer
+
 class BackupUtility:
     """Utility for backing up and restoring data"""
     
+    PAGE_SIZE = 5000
+    
+    @staticmethod
+    def _manifest_name(filename):
+        for ext in COMPRESSION_EXTENSIONS.values():
+            if filename.endswith(ext):
+                return filename[:-len(ext)] + '.manifest.json'
+        return None
+    
+    @staticmethod
+    def _iter_table(table, columns, key, page_size):
+        """Page through a table by its primary key column"""
+        select = ', '.join(columns) if columns else '*'
+        last_key = None
+        
+        while True:
+            if last_key is None:
+                query = f"SELECT {select} FROM {table} ORDER BY {key} LIMIT %s"
+                params = (page_size,)
+            else:
+                query = f"SELECT {select} FROM {table} WHERE {key} > %s ORDER BY {key} LIMIT %s"
+                params = (last_key, page_size)
+            rows = Database.execute_query(query, params, fetch_all=True) or []
+            if not rows:
+                return
+            yield from rows
+            last_key = rows[-1][key]
+            if len(rows) < page_size:
+                return
+    
     @staticmethod
-    def create_backup(backup_dir='backups'):
+    def create_backup(backup_dir='backups', compression='gzip', page_size=None):
         """
-        Create a JSON backup of all data
+        Create a streaming backup of all data
+        
+        Each table is paged by primary key and written as newline-delimited
+        JSON into its own compressed member of a single file. A manifest
+        next to it records each member's byte range and row count. Memory
+        use is bounded by the page size, not the table size.
         
         Args:
             backup_dir: Directory to store backups
-            
+            compression: 'gzip' or 'zstd' (requires the zstandard package)
+            page_size: Rows fetched per query
+        
         Returns:
             Backup filename
         """
+        if compression not in COMPRESSION_EXTENSIONS:
+            raise ValueError(f"Unsupported compression: {compression}")
+        
         # Create backup directory if it doesn't exist
         os.makedirs(backup_dir, exist_ok=True)
         
-        backup_data = {}
+        page_size = page_size or BackupUtility.PAGE_SIZE
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = f"backup_{timestamp}{COMPRESSION_EXTENSIONS[compression]}"
+        filepath = os.path.join(backup_dir, filename)
         
-        # Backup users (without passwords)
-        query = "SELECT id, username, email, role, created_at FROM users"
-        backup_data['users'] = Database.execute_query(query, fetch_all=True) or []
+        manifest = {
+            'backup_date': datetime.now().isoformat(),
+            'version': '2.0',
+            'format': 'ndjson',
+            'compression': compression,
+            'data_file': filename,
+            'tables': {}
+        }
         
-        # Backup accidents
-        query = "SELECT * FROM accidents"
-        backup_data['accidents'] = Database.execute_query(query, fetch_all=True) or []
+        # Written under a temporary name, so a failed run leaves nothing
+        # that looks like a backup
+        tmp_path = f"{filepath}.tmp"
+        try:
+            with open(tmp_path, 'wb') as raw:
+                for table, columns, key in BACKUP_TABLES:
+                    offset = raw.tell()
+                    writer = _MemberWriter(raw, compression)
+                    rows = 0
+                    
+                    for row in BackupUtility._iter_table(table, columns, key, page_size):
+                        writer.write(json.dumps(row, default=str).encode('utf-8') + b'\n')
+                        rows += 1
+                    
+                    writer.close()
+                    manifest['tables'][table] = {
+                        'offset': offset,
+                        'length': raw.tell() - offset,
+                        'rows': rows
+                    }
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, filepath)
         
-        # Backup alerts
-        query = "SELECT * FROM alerts"
-        backup_data['alerts'] = Database.execute_query(query, fetch_all=True) or []
+        manifest_path = os.path.join(backup_dir, BackupUtility._manifest_name(filename))
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
         
-        # Backup emergency services
-        query = "SELECT * FROM emergency_services"
-        backup_data['emergency_services'] = Database.execute_query(query, fetch_all=True) or []
+        return filename
+    
+    @staticmethod
+    def restore_backup(filename, backup_dir='backups', tables=None, batch_size=1000):
+        """
+        Restore a streaming backup
         
-        # Backup awareness content
-        query = "SELECT * FROM awareness_content"
-        backup_data['awareness_content'] = Database.execute_query(query, fetch_all=True) or []
+        Rows are read member by member and inserted in batches with
+        INSERT IGNORE, so existing rows are kept. Restored users get an
+        empty password hash and must reset their password.
         
-        # Add metadata
-        backup_data['metadata'] = {
-            'backup_date': datetime.now().isoformat(),
-            'version': '1.0'
-        }
+        Args:
+            filename: Backup data file name
+            backup_dir: Directory containing backups
+            tables: Optional list of tables to restore (default: all)
+            batch_size: Rows per INSERT batch
         
-        # Convert datetime objects to strings
-        backup_data = json.loads(json.dumps(backup_data, default=str))
+        Returns:
+            Dict of table name to rows read
+        """
+        manifest_name = BackupUtility._manifest_name(filename)
+        if not manifest_name:
+            raise ValueError("Not a streaming backup file")
+        
+        with open(os.path.join(backup_dir, manifest_name)) as f:
+            manifest = json.load(f)
         
-        # Save to file
-        filename = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         filepath = os.path.join(backup_dir, filename)
+        restored = {}
         
-        with open(filepath, 'w') as f:
-            json.dump(backup_data, f, indent=2)
+        for table, _, _ in BACKUP_TABLES:
+            member = manifest['tables'].get(table)
+            if member is None or (tables and table not in tables):
+                continue
+            
+            columns = None
+            batch = []
+            count = 0
+            
+            def flush():
+                placeholders = ', '.join(['%s'] * len(columns))
+                query = f"INSERT IGNORE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+                Database.execute_many(query, batch)
+            
+            for line in _member_lines(filepath, member['offset'], member['length'], manifest['compression']):
+                row = json.loads(line)
+                if table == 'users':
+                    row.setdefault('password_hash', '')
+                if columns is None:
+                    columns = list(row.keys())
+                
+                batch.append(tuple(row.get(c) for c in columns))
+                count += 1
+                
+                if len(batch) >= batch_size:
+                    flush()
+                    batch = []
+            
+            if batch:
+                flush()
+            restored[table] = count
         
-        return filename
+        return restored
     
     @staticmethod
     def get_backup_info(backup_dir='backups'):
@@ -74,14 +253,16 @@ class BackupUtility:
         
         backups = []
         for filename in os.listdir(backup_dir):
-            if filename.endswith('.json'):
+            is_streaming = BackupUtility._manifest_name(filename) is not None
+            if filename.endswith('.json') and not filename.endswith('.manifest.json') or is_streaming:
                 filepath = os.path.join(backup_dir, filename)
                 file_stats = os.stat(filepath)
                 
                 backups.append({
                     'filename': filename,
                     'size': file_stats.st_size,
-                    'created': datetime.fromtimestamp(file_stats.st_mtime).isoformat()
+                    'created': datetime.fromtimestamp(file_stats.st_mtime).isoformat(),
+                    'format': 'ndjson' if is_streaming else 'json'
                 })
         
         return sorted(backups, key=lambda x: x['created'], reverse=True)
@@ -101,5 +282,9 @@ class BackupUtility:
             for backup in backups[keep_count:]:
                 filepath = os.path.join(backup_dir, backup['filename'])
                 os.remove(filepath)
+                
+                manifest_name = BackupUtility._manifest_name(backup['filename'])
+                if manifest_name and os.path.exists(os.path.join(backup_dir, manifest_name)):
+                    os.remove(os.path.join(backup_dir, manifest_name))
         
         return len(backups) - keep_count if len(backups) > keep_count else 0
@@ -0,0 +1,259 @@
+"""Content-addressed storage for uploaded files"""
+import glob
+import hashlib
+import logging
+import os
+import re
+import uuid
+from config import Config
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1 << 16
+BLOB_NAME = re.compile(r'^[0-9a-f]{64}$')
+
+def blob_path(digest, ext, subfolder='accidents'):
+    """
+    Relative path of a blob, fanned out by the first two hex digits
+    
+    Returns:
+        Path like accidents/ab/abcdef...123.jpg
+    """
+    filename = f"{digest}.{ext}" if ext else digest
+    return os.path.join(subfolder, digest[:2], filename)
+
+def is_blob_path(filepath):
+    """Check whether a relative path names a content-addressed blob"""
+    name = os.path.splitext(os.path.basename(filepath))[0]
+    return bool(BLOB_NAME.match(name))
+
+def hash_file(full_path):
+    """Compute the SHA-256 of a file on disk"""
+    digest = hashlib.sha256()
+    with open(full_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def add_reference(digest, filepath, size, cursor=None):
+    """
+    Count one more reference to a blob, registering it if new
+    
+    With a cursor the statement runs in the caller's transaction and the
+    blob row stays locked until it commits.
+    """
+    query = """
+        INSERT INTO upload_blobs (sha256, image_path, bytes, ref_count)
+        VALUES (%s, %s, %s, 1)
+        ON DUPLICATE KEY UPDATE ref_count = ref_count + 1
+    """
+    params = (digest, filepath, size)
+    if cursor is None:
+        Database.execute_query(query, params, commit=True)
+    else:
+        cursor.execute(query, params)
+
+def store_stream(stream, ext, subfolder='accidents', prepare=None):
+    """
+    Store an upload under its content hash
+    
+    The stream is hashed while it is written to a temporary file, so the
+    upload is read exactly once. If a blob with the same hash already
+    exists the temporary copy is discarded.
+    
+    The reference is counted before the file is checked, in one
+    transaction, so the blob row is locked while the file is moved into
+    place and a concurrent release() cannot delete it in between.
+    
+    Args:
+        stream: Readable binary stream
+        ext: File extension without the dot
+        subfolder: Subfolder within uploads directory
+        prepare: Optional callable run on the temporary file of a new blob
+                 before it is moved into place; the blob keeps the hash
+                 of the bytes as uploaded
+        
+    Returns:
+        Tuple of (relative path, whether the blob is new)
+    """
+    upload_path = os.path.join(Config.UPLOAD_FOLDER, subfolder)
+    os.makedirs(upload_path, exist_ok=True)
+    tmp_path = os.path.join(upload_path, f".incoming-{uuid.uuid4().hex}")
+    
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, 'wb') as f:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+        
+        relative_path = blob_path(digest.hexdigest(), ext, subfolder)
+        full_path = os.path.join(Config.UPLOAD_FOLDER, relative_path)
+        
+        with Database.transaction() as cursor:
+            add_reference(digest.hexdigest(), relative_path, size, cursor)
+            
+            created = not os.path.exists(full_path)
+            if created:
+                if prepare:
+                    prepare(tmp_path)
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                os.replace(tmp_path, full_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    
+    return relative_path, created
+
+def release(filepath):
+    """
+    Drop one reference to a blob, removing it once nothing refers to it
+    
+    The blob row is locked for the decrement and, on the last reference,
+    while the row and the file with its derivatives are deleted, so an
+    upload of the same content waits and then stores the file afresh.
+    
+    Args:
+        filepath: Relative path of the blob
+        
+    Returns:
+        Remaining reference count, or None if the path is not a tracked blob
+    """
+    with Database.transaction() as cursor:
+        cursor.execute(
+            "SELECT sha256, ref_count FROM upload_blobs WHERE image_path = %s FOR UPDATE",
+            (filepath,)
+        )
+        row = cursor.fetchone()
+        if not row:
+            return None
+        
+        remaining = max(row['ref_count'] - 1, 0)
+        if remaining:
+            cursor.execute(
+                "UPDATE upload_blobs SET ref_count = %s WHERE sha256 = %s",
+                (remaining, row['sha256'])
+            )
+            return remaining
+        
+        cursor.execute("DELETE FROM upload_blobs WHERE sha256 = %s", (row['sha256'],))
+        remove_files(filepath)
+    return 0
+
+def derivative_files(filepath):
+    """Full paths of the resized derivatives written next to a file"""
+    root = os.path.splitext(os.path.join(Config.UPLOAD_FOLDER, filepath))[0]
+    return glob.glob(f"{glob.escape(root)}_*")
+
+def remove_files(filepath):
+    """
+    Delete a stored file and its derivatives
+    
+    Returns:
+        Boolean indicating whether the file itself existed
+    """
+    for derivative in derivative_files(filepath):
+        os.remove(derivative)
+    
+    full_path = os.path.join(Config.UPLOAD_FOLDER, filepath)
+    if os.path.exists(full_path):
+        os.remove(full_path)
+        return True
+    return False
+
+def _move_or_drop(source, target):
+    """Move a file into place, or drop it if the target already exists"""
+    if os.path.exists(target):
+        os.remove(source)
+        return os.path.getsize(target)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(source, target)
+    return 0
+
+def dedupe_upload_tree(subfolder='accidents'):
+    """
+    Migrate uuid-named uploads into the content-addressed layout
+    
+    Every accident image that is not yet a blob is hashed and moved to
+    its blob path (or dropped if an identical blob exists); derivative
+    files, accident_images rows, pending image jobs and the accident row
+    are repointed, and reference counts are rebuilt for migrated images.
+    Files not referenced by any accident are left alone and counted.
+    
+    Args:
+        subfolder: Upload subfolder to migrate
+        
+    Returns:
+        Dict with migrated, duplicates, bytes_saved, missing and orphans counts
+    """
+    from models.accident import Accident
+    
+    stats = {'migrated': 0, 'duplicates': 0, 'bytes_saved': 0, 'missing': 0, 'orphans': 0}
+    referenced = set()
+    
+    query = "SELECT id, image_path FROM accidents WHERE image_path LIKE %s ORDER BY id"
+    rows = Database.execute_query(query, (f"{subfolder}/%",), fetch_all=True) or []
+    
+    for row in rows:
+        old_path = row['image_path']
+        if is_blob_path(old_path):
+            referenced.add(old_path)
+            continue
+        
+        full_path = os.path.join(Config.UPLOAD_FOLDER, old_path)
+        if not os.path.exists(full_path):
+            stats['missing'] += 1
+            continue
+        
+        digest = hash_file(full_path)
+        ext = old_path.rsplit('.', 1)[1].lower() if '.' in os.path.basename(old_path) else ''
+        new_path = blob_path(digest, ext, subfolder)
+        new_root = os.path.splitext(new_path)[0]
+        size = os.path.getsize(full_path)
+        
+        saved = _move_or_drop(full_path, os.path.join(Config.UPLOAD_FOLDER, new_path))
+        if saved:
+            stats['duplicates'] += 1
+            stats['bytes_saved'] += saved
+        
+        # Derivatives keep their suffix, e.g. <uuid>_thumb.webp -> <sha>_thumb.webp
+        old_root = os.path.splitext(old_path)[0]
+        for derivative in derivative_files(old_path):
+            suffix = os.path.basename(derivative)[len(os.path.basename(old_root)):]
+            target = os.path.join(Config.UPLOAD_FOLDER, new_root + suffix)
+            stats['bytes_saved'] += _move_or_drop(derivative, target)
+        
+        Database.execute_query(
+            """
+                UPDATE accident_images
+                SET image_path = CONCAT(%s, SUBSTRING(image_path, %s))
+                WHERE accident_id = %s
+            """,
+            (new_root, len(old_root) + 1, row['id']), commit=True
+        )
+        Database.execute_query(
+            "UPDATE image_jobs SET image_path = %s WHERE image_path = %s",
+            (new_path, old_path), commit=True
+        )
+        Accident.update_image_path(row['id'], new_path)
+        add_reference(digest, new_path, size)
+        
+        referenced.add(new_path)
+        stats['migrated'] += 1
+    
+    # Report anything left on disk that no accident points at, counting
+    # <root>_<variant> derivatives as referenced through their original
+    roots = {os.path.splitext(p)[0] for p in referenced}
+    upload_path = os.path.join(Config.UPLOAD_FOLDER, subfolder)
+    for dirpath, _, filenames in os.walk(upload_path):
+        for filename in filenames:
+            relative_path = os.path.relpath(os.path.join(dirpath, filename), Config.UPLOAD_FOLDER)
+            root = os.path.splitext(relative_path)[0]
+            if root not in roots and root.rsplit('_', 1)[0] not in roots:
+                stats['orphans'] += 1
+    
+    logger.info(f"Upload dedupe finished: {stats}")
+    return stats
@@ -0,0 +1,210 @@
+"""Response caching for read-heavy public endpoints"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+from flask import request, current_app, Response
+from utils import events
+
+logger = logging.getLogger(__name__)
+
+class MemoryCacheBackend:
+    """In-process cache with per-namespace LRU bounds and per-entry TTLs"""
+
+    def __init__(self):
+        self._namespaces = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace, key):
+        with self._lock:
+            entries = self._namespaces.get(namespace)
+            if not entries or key not in entries:
+                return None
+
+            expires_at, value = entries[key]
+            if expires_at < time.monotonic():
+                del entries[key]
+                return None
+
+            entries.move_to_end(key)
+            return value
+
+    def set(self, namespace, key, value, ttl, maxsize=None):
+        with self._lock:
+            entries = self._namespaces.setdefault(namespace, OrderedDict())
+            entries[key] = (time.monotonic() + ttl, value)
+            entries.move_to_end(key)
+
+            if maxsize:
+                while len(entries) > maxsize:
+                    entries.popitem(last=False)
+
+    def delete(self, namespace, key):
+        with self._lock:
+            entries = self._namespaces.get(namespace)
+            if entries:
+                entries.pop(key, None)
+
+    def clear(self, namespace):
+        with self._lock:
+            self._namespaces.pop(namespace, None)
+
+    def stats(self):
+        with self._lock:
+            return {ns: len(entries) for ns, entries in self._namespaces.items()}
+
+class RedisCacheBackend:
+    """
+    Redis (or any Redis-compatible server) cache backend
+
+    Namespaces are invalidated by bumping a version counter that is part
+    of every key, so clear() is O(1); stale versions age out through their
+    TTL. Size bounds are left to the server's maxmemory-policy.
+    """
+
+    def __init__(self, url, prefix='safe_route:cache'):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def _version(self, namespace):
+        return int(self._client.get(f"{self._prefix}:{namespace}:version") or 0)
+
+    def _key(self, namespace, key):
+        return f"{self._prefix}:{namespace}:{self._version(namespace)}:{key}"
+
+    def get(self, namespace, key):
+        value = self._client.get(self._key(namespace, key))
+        return json.loads(value) if value is not None else None
+
+    def set(self, namespace, key, value, ttl, maxsize=None):
+        self._client.set(self._key(namespace, key), json.dumps(value), ex=max(1, int(ttl)))
+
+    def delete(self, namespace, key):
+        self._client.delete(self._key(namespace, key))
+
+    def clear(self, namespace):
+        self._client.incr(f"{self._prefix}:{namespace}:version")
+
+    def stats(self):
+        return {}
+
+class ResponseCache:
+    """Route-level response cache with a pluggable backend"""
+
+    def __init__(self):
+        self.enabled = True
+        self.backend = MemoryCacheBackend()
+        self._invalidators = {}
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        """Select the backend from app config"""
+        self.enabled = app.config.get('CACHE_ENABLED', True)
+        backend = app.config.get('CACHE_BACKEND', 'memory')
+
+        if backend == 'redis':
+            try:
+                self.backend = RedisCacheBackend(app.config['CACHE_REDIS_URL'])
+            except Exception as e:
+                logger.error(f"Redis cache unavailable, falling back to memory: {e}")
+                self.backend = MemoryCacheBackend()
+        else:
+            self.backend = MemoryCacheBackend()
+
+    @staticmethod
+    def make_key(req):
+        """Build a cache key from the path and normalized query args"""
+        # Encode the pairs so '&' or '=' inside a value cannot collide with
+        # another argument list
+        query = urlencode(sorted(req.args.items(multi=True)))
+        return f"{req.path}?{query}"
+
+    def invalidate(self, *namespaces):
+        """Drop every cached response in the given namespaces"""
+        for namespace in namespaces:
+            try:
+                self.backend.clear(namespace)
+            except Exception as e:
+                logger.error(f"Failed to invalidate cache namespace '{namespace}': {e}")
+
+    def invalidate_on(self, event, *namespaces, when=None):
+        """
+        Invalidate namespaces whenever a model write event fires
+
+        when: Optional predicate on the event payload; the namespaces are
+              only invalidated when it returns True
+        """
+        key = (event, namespaces, when)
+        if key not in self._invalidators:
+            def invalidator(**payload):
+                if when is None or when(**payload):
+                    self.invalidate(*namespaces)
+            self._invalidators[key] = invalidator
+        events.subscribe(event, self._invalidators[key])
+
+    def stats(self):
+        """Get cache hit/miss counters and entry counts"""
+        return {
+            'enabled': self.enabled,
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': self.backend.stats()
+        }
+
+    def cached(self, namespace, ttl=60, maxsize=256):
+        """
+        Decorator caching successful responses of a blueprint route
+
+        Usage:
+            @alerts_bp.route('', methods=['GET'])
+            @response_cache.cached('alerts', ttl=30)
+
+        Args:
+            namespace: Invalidation group for the route
+            ttl: Seconds a response stays fresh
+            maxsize: Maximum cached responses in the namespace
+        """
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+
+                key = self.make_key(request)
+                try:
+                    entry = self.backend.get(namespace, key)
+                except Exception as e:
+                    logger.error(f"Cache read failed: {e}")
+                    entry = None
+
+                if entry is not None:
+                    self.hits += 1
+                    response = Response(entry['body'], status=entry['status'], mimetype=entry['mimetype'])
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                self.misses += 1
+                response = current_app.make_response(fn(*args, **kwargs))
+
+                if response.status_code == 200 and not response.direct_passthrough:
+                    try:
+                        self.backend.set(namespace, key, {
+                            'body': response.get_data(as_text=True),
+                            'status': response.status_code,
+                            'mimetype': response.mimetype
+                        }, ttl, maxsize)
+                    except Exception as e:
+                        logger.error(f"Cache write failed: {e}")
+
+                response.headers['X-Cache'] = 'MISS'
+                return response
+
+            return wrapper
+        return decorator
+
+response_cache = ResponseCache()
@@ -0,0 +1,224 @@
+"""Density-based clustering of coordinates"""
+import math
+import numpy as np
+
+KM_PER_DEG_LAT = 110.574
+KM_PER_DEG_LON_EQUATOR = 111.320
+
+# Cells are eps/sqrt(2) wide, so two points in the same cell are always
+# within eps and a point's eps-neighbourhood lies in the 5x5 block of
+# cells around it minus the corners
+_NEIGHBOUR_OFFSETS = [
+    (dx, dy)
+    for dx in range(-2, 3)
+    for dy in range(-2, 3)
+    if not (abs(dx) == 2 and abs(dy) == 2)
+]
+
+def project_km(lats, lons):
+    """
+    Project coordinates to a local plane in kilometers
+
+    Uses an equirectangular projection around the mean latitude, which is
+    accurate to well under 1% at city or region scale.
+
+    Returns:
+        Tuple of NumPy arrays (x, y)
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    lat0 = math.radians(float(lats.mean())) if len(lats) else 0.0
+    return lons * KM_PER_DEG_LON_EQUATOR * math.cos(lat0), lats * KM_PER_DEG_LAT
+
+class _UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[rb] = ra
+
+def dbscan(lats, lons, eps_km, min_samples):
+    """
+    Grid-accelerated DBSCAN over coordinates
+
+    Points are hashed into cells eps/sqrt(2) wide. Cells holding at least
+    min_samples points are core wholesale; other points count their
+    neighbours in the surrounding cells. Core cells are merged with a
+    union-find when any pair of their core points is within eps, and
+    border points join the cluster of a core point within eps. The result
+    is exact DBSCAN (up to border points reachable from two clusters).
+
+    Args:
+        lats, lons: Point coordinates in decimal degrees
+        eps_km: Neighbourhood radius in kilometers
+        min_samples: Points (including itself) needed to make a core point
+
+    Returns:
+        NumPy array of cluster labels, -1 for noise
+    """
+    n = len(lats)
+    labels = np.full(n, -1, dtype=np.int64)
+    if n == 0:
+        return labels
+
+    x, y = project_km(lats, lons)
+    eps2 = eps_km * eps_km
+    side = eps_km / math.sqrt(2)
+
+    cx = np.floor(x / side).astype(np.int64)
+    cy = np.floor(y / side).astype(np.int64)
+    cx -= cx.min() - 2
+    cy -= cy.min() - 2
+    width = int(cy.max()) + 3
+    keys = cx * width + cy
+
+    order = np.argsort(keys, kind='stable')
+    cell_keys, starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+    ncells = len(cell_keys)
+    ends = starts + counts
+
+    # neighbours[k, c] is the cell at offset k from cell c, or -1
+    neighbours = np.full((len(_NEIGHBOUR_OFFSETS), ncells), -1, dtype=np.int64)
+    for k, (dx, dy) in enumerate(_NEIGHBOUR_OFFSETS):
+        target = cell_keys + dx * width + dy
+        idx = np.minimum(np.searchsorted(cell_keys, target), ncells - 1)
+        found = cell_keys[idx] == target
+        neighbours[k, found] = idx[found]
+
+    def cell_points(c):
+        return order[starts[c]:ends[c]]
+
+    def neighbour_points(c):
+        cells = neighbours[:, c]
+        return np.concatenate([cell_points(j) for j in cells[cells >= 0]])
+
+    # Core points
+    core = np.zeros(n, dtype=bool)
+    dense = counts >= min_samples
+    core[order[np.repeat(dense, counts)]] = True
+
+    reachable = np.where(neighbours >= 0, counts[np.maximum(neighbours, 0)], 0).sum(axis=0)
+    for c in np.nonzero(~dense & (reachable >= min_samples))[0]:
+        pts = cell_points(c)
+        nbrs = neighbour_points(c)
+        d2 = (x[pts, None] - x[nbrs]) ** 2 + (y[pts, None] - y[nbrs]) ** 2
+        core[pts] = (d2 <= eps2).sum(axis=1) >= min_samples
+
+    core_count = np.add.reduceat(core[order], starts)
+    core_cells = core_count > 0
+    core_points = {}
+
+    def cell_core_points(c):
+        pts = core_points.get(c)
+        if pts is None:
+            pts = cell_points(c)
+            pts = core_points[c] = pts[core[pts]]
+        return pts
+
+    # Bounding boxes of each cell's core points give cheap distance bounds
+    core_order = order[core[order]]
+    core_starts = np.concatenate(([0], np.cumsum(core_count)[:-1]))[core_cells]
+    bounds = np.zeros((4, ncells))
+    for row, (values, reduce) in enumerate([
+        (x, np.minimum), (x, np.maximum), (y, np.minimum), (y, np.maximum)
+    ]):
+        if len(core_order):
+            bounds[row, core_cells] = reduce.reduceat(values[core_order], core_starts)
+    min_x, max_x, min_y, max_y = bounds
+
+    # Merge core cells. Pairs whose boxes are entirely within eps merge
+    # outright, pairs whose boxes are further apart are skipped, and only
+    # the rest compare points, nearest offsets first so most of those are
+    # already connected by then
+    uf = _UnionFind(ncells)
+    offsets = sorted(
+        (k for k, (dx, dy) in enumerate(_NEIGHBOUR_OFFSETS) if (dx, dy) > (0, 0)),
+        key=lambda k: abs(_NEIGHBOUR_OFFSETS[k][0]) + abs(_NEIGHBOUR_OFFSETS[k][1])
+    )
+    for k in offsets:
+        targets = neighbours[k]
+        c = np.nonzero(core_cells & (targets >= 0))[0]
+        j = targets[c]
+        keep = core_cells[j]
+        c, j = c[keep], j[keep]
+
+        gap_x = np.maximum(0, np.maximum(min_x[j] - max_x[c], min_x[c] - max_x[j]))
+        gap_y = np.maximum(0, np.maximum(min_y[j] - max_y[c], min_y[c] - max_y[j]))
+        span_x = np.maximum(max_x[j] - min_x[c], max_x[c] - min_x[j])
+        span_y = np.maximum(max_y[j] - min_y[c], max_y[c] - min_y[j])
+        near = gap_x ** 2 + gap_y ** 2 <= eps2
+        certain = span_x ** 2 + span_y ** 2 <= eps2
+
+        for a, b in zip(c[certain].tolist(), j[certain].tolist()):
+            uf.union(a, b)
+
+        for a, b in zip(c[near & ~certain].tolist(), j[near & ~certain].tolist()):
+            if uf.find(a) == uf.find(b):
+                continue
+            pa, pb = cell_core_points(a), cell_core_points(b)
+            d2 = (x[pa, None] - x[pb]) ** 2 + (y[pa, None] - y[pb]) ** 2
+            if d2.min() <= eps2:
+                uf.union(a, b)
+
+    roots = np.array([uf.find(c) if core_cells[c] else -1 for c in range(ncells)], dtype=np.int64)
+    cell_of_point = np.empty(n, dtype=np.int64)
+    cell_of_point[order] = np.repeat(np.arange(ncells), counts)
+    labels[core] = roots[cell_of_point[core]]
+
+    # Border points join the cluster of their nearest core point within eps
+    has_core_neighbour = (np.where(neighbours >= 0, core_cells[np.maximum(neighbours, 0)], False)).any(axis=0)
+    for c in np.nonzero(has_core_neighbour & (core_count < counts))[0]:
+        pts = cell_points(c)
+        pts = pts[~core[pts]]
+        cells = neighbours[:, c]
+        cells = cells[(cells >= 0) & core_cells[np.maximum(cells, 0)]]
+        nbrs = np.concatenate([cell_core_points(j) for j in cells])
+        d2 = (x[pts, None] - x[nbrs]) ** 2 + (y[pts, None] - y[nbrs]) ** 2
+        nearest = d2.argmin(axis=1)
+        within = d2[np.arange(len(pts)), nearest] <= eps2
+        labels[pts[within]] = labels[nbrs[nearest[within]]]
+
+    # Renumber clusters 0..k-1
+    clustered = labels >= 0
+    _, labels[clustered] = np.unique(labels[clustered], return_inverse=True)
+    return labels
+
+def convex_hull(points):
+    """
+    Convex hull of 2-D points (Andrew's monotone chain)
+
+    Args:
+        points: Sequence of (x, y) pairs
+
+    Returns:
+        List of hull vertices in counter-clockwise order
+    """
+    points = sorted(set(map(tuple, points)))
+    if len(points) <= 2:
+        return points
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    lower = []
+    for p in points:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], p) <= 0:
+            lower.pop()
+        lower.append(p)
+
+    upper = []
+    for p in reversed(points):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], p) <= 0:
+            upper.pop()
+        upper.append(p)
+
+    return lower[:-1] + upper[:-1]
@@ -0,0 +1,40 @@
+"""In-process event hooks for model write paths"""
+import logging
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+_listeners = defaultdict(list)
+
+def subscribe(event, handler):
+    """
+    Register a handler for an event
+
+    Args:
+        event: Event name (e.g. 'accident.created')
+        handler: Callable receiving the event payload as keyword arguments
+    """
+    if handler not in _listeners[event]:
+        _listeners[event].append(handler)
+
+def unsubscribe(event, handler):
+    """Remove a previously registered handler"""
+    if handler in _listeners.get(event, []):
+        _listeners[event].remove(handler)
+
+def has_listeners(event):
+    """Check whether anything is listening for an event"""
+    return bool(_listeners.get(event))
+
+def emit(event, **payload):
+    """
+    Notify all handlers of an event
+
+    Handler failures are logged and never propagate to the caller, so a
+    broken listener cannot fail the write that triggered it.
+    """
+    for handler in list(_listeners.get(event, [])):
+        try:
+            handler(**payload)
+        except Exception as e:
+            logger.error(f"Error in '{event}' handler {getattr(handler, '__name__', handler)}: {e}")
@@ -1,8 +1,30 @@
+import mimetypes
 import os
 import uuid
+from functools import lru_cache
+from flask import current_app, request, send_file, abort, Response
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
-from PIL import Image
+from PIL import Image, ImageOps, UnidentifiedImageError
 from config import Config
+from utils import blob_store
+
+# Derivative sizes, largest first so each one is downscaled from the last
+IMAGE_VARIANTS = [
+    ('full', (1920, 1080)),
+    ('medium', (512, 512)),
+    ('thumb', (128, 128)),
+]
+
+# EXIF tag holding the camera orientation
+ORIENTATION_TAG = 0x0112
+
+# Format name -> (Pillow format, file extension, save options)
+IMAGE_FORMATS = {
+    'webp': ('WEBP', '.webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', '.jpg', {'quality': 85, 'optimize': True, 'progressive': True}),
+    'avif': ('AVIF', '.avif', {'quality': 60}),
+}
 
 def allowed_file(filename):
     """
@@ -25,13 +47,20 @@ def generate_unique_filename(original_filename):
     unique_name = f"{uuid.uuid4().hex}.{ext}"
     return unique_name
 
-def save_uploaded_file(file, subfolder='accidents'):
+def save_uploaded_file(file, subfolder='accidents', optimize=True):
     """
     Save an uploaded file securely
     
+    Files are stored by content hash, so identical uploads share one
+    blob and are only optimized the first time they are seen. EXIF and
+    other embedded metadata (camera GPS position included) are stripped
+    before the file is stored, since uploads are served publicly.
+    
     Args:
         file: FileStorage object from Flask request
         subfolder: Subfolder within uploads directory
+        optimize: Optimize the image before returning; pass False when
+                  the image pipeline will process it in the background
         
     Returns:
         Tuple of (success, filepath or error_message)
@@ -41,27 +70,66 @@ def save_uploaded_file(file, subfolder='accidents'):
         if not allowed_file(file.filename):
             return False, "File type not allowed"
         
-        # Create subfolder if it doesn't exist
-        upload_path = os.path.join(Config.UPLOAD_FOLDER, subfolder)
-        os.makedirs(upload_path, exist_ok=True)
-        
-        # Generate unique filename
-        filename = generate_unique_filename(file.filename)
-        filepath = os.path.join(upload_path, filename)
+        ext = file.filename.rsplit('.', 1)[1].lower()
         
-        # Save file
-        file.save(filepath)
+        # Save file under its content hash
+        relative_path, created = blob_store.store_stream(
+            file.stream, ext, subfolder, prepare=strip_metadata
+        )
         
         # Optimize image
-        optimize_image(filepath)
+        if optimize and created:
+            optimize_image(os.path.join(Config.UPLOAD_FOLDER, relative_path))
         
         # Return relative path for database storage
-        relative_path = os.path.join(subfolder, filename)
         return True, relative_path
         
+    except UnidentifiedImageError:
+        return False, "File is not a valid image"
     except Exception as e:
         return False, str(e)
 
+def strip_metadata(filepath):
+    """
+    Remove EXIF, XMP and text metadata from an image file in place
+    
+    The EXIF orientation is applied to the pixels first so the image
+    still displays upright. JPEGs that need no rotation are re-saved with
+    their original quantization tables; the ICC profile is kept.
+    
+    Args:
+        filepath: Path to image file
+        
+    Raises:
+        Exception if the file is not a readable image
+    """
+    tmp_path = f"{filepath}.strip"
+    
+    try:
+        with Image.open(filepath) as img:
+            pil_format = img.format
+            options = {}
+            if img.info.get('icc_profile'):
+                options['icc_profile'] = img.info['icc_profile']
+            
+            if pil_format == 'GIF':
+                # GIF carries no EXIF; re-save to drop comments, keeping frames
+                img.info.pop('comment', None)
+                img.save(tmp_path, format=pil_format, save_all=True)
+            elif img.getexif().get(ORIENTATION_TAG, 1) == 1:
+                if pil_format == 'JPEG':
+                    options['quality'] = 'keep'
+                img.save(tmp_path, format=pil_format, **options)
+            else:
+                if pil_format == 'JPEG':
+                    options['quality'] = 95
+                ImageOps.exif_transpose(img).save(tmp_path, format=pil_format, **options)
+        
+        os.replace(tmp_path, filepath)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
 def optimize_image(filepath, max_size=(1920, 1080), quality=85):
     """
     Optimize image file size while maintaining quality
@@ -70,7 +138,13 @@ def optimize_image(filepath, max_size=(1920, 1080), quality=85):
         filepath: Path to image file
         max_size: Maximum dimensions (width, height)
         quality: JPEG quality (1-100)
+        
+    Returns:
+        Boolean indicating whether the image was optimized
     """
+    root, ext = os.path.splitext(filepath)
+    tmp_path = f"{root}.tmp{ext}"
+    
     try:
         with Image.open(filepath) as img:
             # Convert RGBA to RGB if necessary
@@ -82,42 +156,204 @@ def optimize_image(filepath, max_size=(1920, 1080), quality=85):
             # Resize if larger than max_size
             img.thumbnail(max_size, Image.Resampling.LANCZOS)
             
-            # Save optimized image
-            img.save(filepath, optimize=True, quality=quality)
+            # Save optimized image, swapping it in atomically so the file
+            # is never served half-written
+            img.save(tmp_path, optimize=True, quality=quality)
+        
+        os.replace(tmp_path, filepath)
+        return True
             
     except Exception as e:
         # If optimization fails, keep original file
-        pass
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+
+def _flatten(img):
+    """Convert an image to RGB on a white background"""
+    if img.mode in ('RGBA', 'LA', 'P'):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[-1])
+        return background
+    if img.mode != 'RGB':
+        return img.convert('RGB')
+    return img
+
+def supported_image_formats(formats=None):
+    """
+    Filter format names down to those this Pillow build can encode
+    
+    Args:
+        formats: Format names (default: Config.IMAGE_DERIVATIVE_FORMATS)
+        
+    Returns:
+        List of format names
+    """
+    Image.init()
+    formats = formats or Config.IMAGE_DERIVATIVE_FORMATS
+    return [
+        name for name in formats
+        if name in IMAGE_FORMATS and IMAGE_FORMATS[name][0] in Image.SAVE
+    ]
+
+def generate_image_derivatives(filepath, formats=None):
+    """
+    Write resized copies of an uploaded image in several formats
+    
+    The source is decoded once; each size is downscaled from the previous
+    one and encoded in every format, next to the original as
+    <name>_<variant><ext>.
+    
+    Args:
+        filepath: Relative path of the uploaded image
+        formats: Format names (default: Config.IMAGE_DERIVATIVE_FORMATS)
+        
+    Returns:
+        List of dicts with keys variant, format, image_path, width, height, bytes
+    """
+    full_path = os.path.join(Config.UPLOAD_FOLDER, filepath)
+    root = os.path.splitext(filepath)[0]
+    formats = supported_image_formats(formats)
+    derivatives = []
+    
+    with Image.open(full_path) as source:
+        img = _flatten(ImageOps.exif_transpose(source))
+    
+    for variant, max_size in IMAGE_VARIANTS:
+        img.thumbnail(max_size, Image.Resampling.LANCZOS)
+        
+        for name in formats:
+            pil_format, ext, options = IMAGE_FORMATS[name]
+            relative_path = f"{root}_{variant}{ext}"
+            target = os.path.join(Config.UPLOAD_FOLDER, relative_path)
+            tmp_path = f"{target}.tmp"
+            
+            img.save(tmp_path, format=pil_format, **options)
+            os.replace(tmp_path, target)
+            
+            derivatives.append({
+                'variant': variant,
+                'format': name,
+                'image_path': relative_path,
+                'width': img.width,
+                'height': img.height,
+                'bytes': os.path.getsize(target)
+            })
+    
+    return derivatives
 
 def delete_file(filepath):
     """
     Delete a file safely
     
+    Content-addressed blobs are reference counted and only removed, along
+    with their derivatives, once nothing refers to them.
+    
     Args:
         filepath: Relative path to file
         
     Returns:
-        Boolean indicating success
+        Boolean indicating whether the file was removed
     """
     try:
-        full_path = os.path.join(Config.UPLOAD_FOLDER, filepath)
-        if os.path.exists(full_path):
-            os.remove(full_path)
-            return True
-        return False
+        remaining = blob_store.release(filepath)
+        if remaining is None:
+            # Not a tracked blob, e.g. uploaded before deduplication
+            return blob_store.remove_files(filepath)
+        return remaining == 0
     except Exception:
         return False
 
-def get_file_url(filepath):
+def get_file_url(filepath, variants=None):
     """
     Get URL for accessing uploaded file
     
     Args:
         filepath: Relative path to file
+        variants: Optional derivative rows for the file (see
+                  generate_image_derivatives)
         
     Returns:
-        URL string
+        URL string, or with variants a srcset-style map:
+        {'src': url, 'sizes': {variant: {format: url, 'width': w, 'height': h}},
+         'srcset': {format: "url 128w, url 512w, ..."}}
     """
     if not filepath:
         return None
-    return f"/uploads/{filepath}"
+    if variants is None:
+        return f"/uploads/{filepath}"
+    
+    sizes = {}
+    srcset = {}
+    for row in sorted(variants, key=lambda r: r['width']):
+        url = f"/uploads/{row['image_path']}"
+        size = sizes.setdefault(row['variant'], {'width': row['width'], 'height': row['height']})
+        size[row['format']] = url
+        srcset.setdefault(row['format'], []).append(f"{url} {row['width']}w")
+    
+    # The JPEG full size is the universally supported default
+    full = sizes.get('full', {})
+    src = full.get('jpeg') or next((full[k] for k in full if k not in ('width', 'height')), None)
+    
+    return {
+        'src': src or f"/uploads/{filepath}",
+        'sizes': sizes,
+        'srcset': {fmt: ', '.join(entries) for fmt, entries in srcset.items()}
+    }
+
+@lru_cache(maxsize=4096)
+def _file_digest(full_path, size, mtime_ns):
+    """SHA-256 of a legacy upload, cached until the file changes"""
+    return blob_store.hash_file(full_path)
+
+def upload_etag(filepath, full_path):
+    """
+    Strong ETag for an uploaded file
+    
+    Content-addressed blobs and their derivatives are named after the
+    content hash, so the name itself is the tag; older uuid-named files
+    are hashed once and cached.
+    """
+    name = os.path.basename(filepath)
+    if blob_store.is_blob_path(name.split('_', 1)[0]):
+        return name
+    stat = os.stat(full_path)
+    return _file_digest(full_path, stat.st_size, stat.st_mtime_ns)
+
+def send_upload(filepath):
+    """
+    Serve a file from the uploads folder
+    
+    Responses carry a strong ETag and an immutable Cache-Control and
+    honour If-None-Match and Range. With UPLOADS_SENDFILE set, the body is
+    left to the front proxy (X-Accel-Redirect or X-Sendfile).
+    
+    Args:
+        filepath: Relative path within the uploads folder
+        
+    Returns:
+        Flask response
+    """
+    config = current_app.config
+    full_path = safe_join(config['UPLOAD_FOLDER'], filepath)
+    if full_path is None or not os.path.isfile(full_path):
+        abort(404)
+    
+    etag = upload_etag(filepath, full_path)
+    max_age = config.get('UPLOADS_MAX_AGE', 31536000)
+    
+    if config.get('UPLOADS_SENDFILE') == 'x-accel':
+        if etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            mimetype = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+            response = Response(mimetype=mimetype)
+            response.headers['X-Accel-Redirect'] = config['UPLOADS_ACCEL_PREFIX'].rstrip('/') + '/' + filepath
+        response.set_etag(etag)
+    else:
+        # X-Sendfile is applied by send_file when USE_X_SENDFILE is set
+        response = send_file(full_path, etag=etag, conditional=True)
+    
+    response.headers['Cache-Control'] = f"public, max-age={max_age}, immutable"
+    return response
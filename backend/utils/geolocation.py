@@ -1,4 +1,7 @@
 import math
+import numpy as np
+
+EARTH_RADIUS_KM = 6371
 
 def haversine_distance(lat1, lon1, lat2, lon2):
     """
@@ -16,10 +19,55 @@ def haversine_distance(lat1, lon1, lat2, lon2):
     a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
     c = 2 * math.asin(math.sqrt(a))
     
-    # Radius of earth in kilometers
-    r = 6371
+    return c * EARTH_RADIUS_KM
+
+def haversine_many(lat, lon, lats, lons):
+    """
+    Calculate distances from one point to many points
+    
+    Args:
+        lat, lon: Origin coordinate in decimal degrees
+        lats, lons: Sequences of candidate coordinates
+        
+    Returns:
+        NumPy array of distances in kilometers
+    """
+    lat = math.radians(float(lat))
+    lon = math.radians(float(lon))
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    lons = np.radians(np.asarray(lons, dtype=np.float64))
+    
+    a = np.sin((lats - lat) / 2) ** 2 + math.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def haversine_pairwise(lats1, lons1, lats2, lons2):
+    """
+    Calculate the N x M distance matrix between two sets of points
+    
+    Args:
+        lats1, lons1: N origin coordinates
+        lats2, lons2: M destination coordinates
+        
+    Returns:
+        NumPy array of shape (N, M) with distances in kilometers
+    """
+    lats1 = np.radians(np.asarray(lats1, dtype=np.float64))[:, np.newaxis]
+    lons1 = np.radians(np.asarray(lons1, dtype=np.float64))[:, np.newaxis]
+    lats2 = np.radians(np.asarray(lats2, dtype=np.float64))[np.newaxis, :]
+    lons2 = np.radians(np.asarray(lons2, dtype=np.float64))[np.newaxis, :]
     
-    return c * r
+    a = np.sin((lats2 - lats1) / 2) ** 2 + np.cos(lats1) * np.cos(lats2) * np.sin((lons2 - lons1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def within_radius_mask(lat, lon, lats, lons, radius_km):
+    """
+    Check which candidate points lie within a radius of a point
+    
+    Returns:
+        Tuple of (boolean mask, distances in kilometers)
+    """
+    distances = haversine_many(lat, lon, lats, lons)
+    return distances <= radius_km, distances
 
 def is_within_radius(lat1, lon1, lat2, lon2, radius_km):
     """
@@ -47,6 +95,9 @@ def validate_coordinates(latitude, longitude):
         lat = float(latitude)
         lon = float(longitude)
         
+        if not (math.isfinite(lat) and math.isfinite(lon)):
+            return False, "Coordinates must be finite numbers"
+        
         if lat < -90 or lat > 90:
             return False, "Latitude must be between -90 and 90"
         
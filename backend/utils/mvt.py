@@ -0,0 +1,100 @@
+"""Mapbox Vector Tile (spec v2) encoding for point layers"""
+import struct
+
+EXTENT = 4096
+
+_VARINT = 0
+_FIXED64 = 1
+_BYTES = 2
+
+_POINT = 1
+_MOVE_TO = 1
+
+def _varint(value):
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+def _key(field, wire_type):
+    return _varint((field << 3) | wire_type)
+
+def _bytes_field(field, payload):
+    return _key(field, _BYTES) + _varint(len(payload)) + payload
+
+def _packed(field, values):
+    return _bytes_field(field, b''.join(_varint(v) for v in values))
+
+def _value(value):
+    """Encode a property value as a Tile.Value message"""
+    if isinstance(value, bool):
+        return _key(7, _VARINT) + _varint(int(value))
+    if isinstance(value, int):
+        if value < 0:
+            return _key(6, _VARINT) + _varint(_zigzag(value))
+        return _key(5, _VARINT) + _varint(value)
+    if isinstance(value, float):
+        return _key(3, _FIXED64) + struct.pack('<d', value)
+    return _bytes_field(1, str(value).encode('utf-8'))
+
+def encode_layer(name, features, extent=EXTENT):
+    """
+    Encode one layer of point features
+
+    Args:
+        name: Layer name
+        features: Iterable of (id, x, y, properties) with x/y in tile
+                  coordinates (0..extent, may stray into the buffer) and
+                  properties a dict of str, int, float or bool; None
+                  values are skipped
+        extent: Tile coordinate extent
+
+    Returns:
+        Encoded Tile.Layer message (without the Tile wrapper)
+    """
+    keys, values = {}, {}
+    body = []
+
+    for feature_id, x, y, properties in features:
+        tags = []
+        for k, v in properties.items():
+            if v is None:
+                continue
+            tags.append(keys.setdefault(k, len(keys)))
+            tags.append(values.setdefault((type(v), v), len(values)))
+
+        feature = b''
+        if feature_id is not None:
+            feature += _key(1, _VARINT) + _varint(feature_id)
+        feature += _packed(2, tags)
+        feature += _key(3, _VARINT) + _varint(_POINT)
+        feature += _packed(4, [(_MOVE_TO & 0x7) | (1 << 3), _zigzag(int(x)), _zigzag(int(y))])
+        body.append(_bytes_field(2, feature))
+
+    layer = _key(15, _VARINT) + _varint(2)
+    layer += _bytes_field(1, name.encode('utf-8'))
+    layer += b''.join(body)
+    layer += b''.join(_bytes_field(3, k.encode('utf-8')) for k in keys)
+    layer += b''.join(_bytes_field(4, _value(v)) for _, v in values)
+    layer += _key(5, _VARINT) + _varint(extent)
+    return layer
+
+def encode_tile(layers):
+    """
+    Encode a vector tile
+
+    Args:
+        layers: Iterable of (name, features) pairs, see encode_layer
+
+    Returns:
+        Tile bytes; layers without features are left out
+    """
+    return b''.join(
+        _bytes_field(3, encode_layer(name, features))
+        for name, features in layers if features
+    )
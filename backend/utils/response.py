@@ -1,3 +1,6 @@
+import base64
+import json
+from datetime import datetime
 from flask import jsonify
 
 def success_response(data=None, message="Success", status_code=200):
@@ -76,6 +79,65 @@ def paginated_response(items, page, page_size, total_count, message="Success"):
     
     return jsonify(response), 200
 
+def cursor_response(items, page_size, next_cursor, total_count=None, message="Success"):
+    """
+    Create a cursor-paginated response
+    
+    Args:
+        items: List of items for current page
+        page_size: Items per page
+        next_cursor: Opaque cursor for the next page, or None on the last page
+        total_count: Optional total number of items
+        message: Success message
+        
+    Returns:
+        Flask response object
+    """
+    pagination = {
+        "page_size": page_size,
+        "next_cursor": next_cursor,
+        "has_next": next_cursor is not None
+    }
+    
+    if total_count is not None:
+        pagination["total_count"] = total_count
+    
+    response = {
+        "success": True,
+        "message": message,
+        "data": items,
+        "pagination": pagination
+    }
+    
+    return jsonify(response), 200
+
+def encode_cursor(timestamp, item_id):
+    """
+    Encode a (timestamp, id) keyset position as an opaque cursor
+    
+    Returns:
+        URL-safe cursor string
+    """
+    payload = json.dumps([timestamp.isoformat() if timestamp else None, item_id])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor
+    
+    Returns:
+        Tuple of (timestamp, id)
+        
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, item_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(timestamp), int(item_id)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
 def get_pagination_params(request, default_page=1, default_size=20, max_size=100):
     """
     Extract and validate pagination parameters from request
@@ -0,0 +1,697 @@
+"""Offline road network graph in compressed sparse row form"""
+import heapq
+import math
+import random
+import xml.etree.ElementTree as ET
+from array import array
+from collections import Counter
+import numpy as np
+from utils.clustering import KM_PER_DEG_LAT, KM_PER_DEG_LON_EQUATOR
+from utils.geolocation import EARTH_RADIUS_KM
+from utils.spatial import SphericalKDTree
+
+# Stand-in for "unreachable" in landmark tables, kept finite so bounds
+# stay plain float arithmetic
+UNREACHABLE_SECONDS = 1e9
+
+# Typical urban speeds in km/h for the OSM highway classes that carry
+# cars; ways tagged with maxspeed use that instead
+ROAD_SPEEDS = {
+    'motorway': 80, 'motorway_link': 50,
+    'trunk': 60, 'trunk_link': 40,
+    'primary': 45, 'primary_link': 35,
+    'secondary': 35, 'secondary_link': 30,
+    'tertiary': 30, 'tertiary_link': 25,
+    'unclassified': 25, 'residential': 20, 'living_street': 10
+}
+
+def _parse_maxspeed(value):
+    """Get a maxspeed tag in km/h, or None if it is missing or symbolic"""
+    if not value:
+        return None
+    parts = value.split()
+    try:
+        speed = float(parts[0])
+    except ValueError:
+        return None
+    if len(parts) > 1 and parts[1] == 'mph':
+        speed *= 1.609344
+    return speed if speed > 0 else None
+
+def _direction(tags):
+    """1 for one-way along the way, -1 for against it, 0 for both ways"""
+    default = 'yes' if tags.get('junction') == 'roundabout' or tags.get('highway') == 'motorway' else 'no'
+    oneway = tags.get('oneway', default)
+    if oneway in ('yes', 'true', '1'):
+        return 1
+    if oneway == '-1':
+        return -1
+    return 0
+
+def _polyline_km(lats, lons):
+    """Great-circle length of a polyline in km"""
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    lons = np.radians(np.asarray(lons, dtype=np.float64))
+    a = np.sin(np.diff(lats) / 2) ** 2 + \
+        np.cos(lats[:-1]) * np.cos(lats[1:]) * np.sin(np.diff(lons) / 2) ** 2
+    return float((2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))).sum())
+
+class LandmarkBounds:
+    """
+    Costs to and from a few landmark junctions, for A* lower bounds
+
+    By the triangle inequality d(landmark, t) - d(landmark, v) and
+    d(v, landmark) - d(t, landmark) never exceed d(v, t), so the tables
+    bound the remaining cost from any node. Tables built with
+    penalty_weight > 0 measure travel time plus that weight times a
+    penalty per edge, and stay valid bounds for any later penalties that
+    are at least as large.
+    """
+
+    def __init__(self, landmarks, costs_from, costs_to, penalty_weight=0.0):
+        self.landmarks = np.asarray(landmarks, dtype=np.int64)
+        self.costs_from = np.asarray(costs_from, dtype=np.float32)
+        self.costs_to = np.asarray(costs_to, dtype=np.float32)
+        self.penalty_weight = penalty_weight
+        # array('f') indexes to Python floats without per-item NumPy overhead
+        self.rows = [
+            (array('f', f.tobytes()), array('f', t.tobytes()))
+            for f, t in zip(self.costs_from, self.costs_to)
+        ]
+
+    def __len__(self):
+        return len(self.landmarks)
+
+class RoadGraph:
+    """
+    Directed road network stored as compressed sparse row arrays
+
+    Nodes are junctions and dead ends; the road between two junctions is a
+    single edge carrying its length, travel time and shape, so searches
+    do not step through every bend. Edges are numbered in forward CSR
+    order (grouped by source node). A reverse CSR over the same edges
+    serves inbound (many-to-one) searches.
+
+    Searches read plain Python lists, which index several times faster
+    than NumPy arrays inside a loop; the arrays are kept for saving and
+    vectorised work.
+
+    Point-to-point routes use bidirectional A*. With landmarks (see
+    prepare_landmarks) the bounds come from travel times to and from a few
+    landmark junctions via the triangle inequality (ALT); without them
+    from great-circle distance at the network's top speed. Both stay valid
+    lower bounds when edges carry extra non-negative penalties, but loose
+    ones when penalties dominate; landmark_bounds builds tables that
+    include a snapshot of the penalties for that case.
+    """
+
+    def __init__(self, lats, lons, sources, targets, seconds, lengths_m,
+                 shape_ptr=None, shape_lats=None, shape_lons=None,
+                 landmarks=None, landmark_from=None, landmark_to=None):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        node_count = len(self.lats)
+
+        sources = np.asarray(sources, dtype=np.int64)
+        order = np.argsort(sources, kind='stable')
+        self.edge_source = sources[order]
+        self.edge_target = np.asarray(targets, dtype=np.int64)[order]
+        self.edge_seconds = np.asarray(seconds, dtype=np.float64)[order]
+        self.edge_length = np.asarray(lengths_m, dtype=np.float64)[order]
+
+        if shape_ptr is None:
+            # Straight segments between the two junctions
+            shape_ptr = np.arange(0, 2 * len(order) + 1, 2)
+            shape_lats = np.column_stack([self.lats[self.edge_source], self.lats[self.edge_target]]).ravel()
+            shape_lons = np.column_stack([self.lons[self.edge_source], self.lons[self.edge_target]]).ravel()
+        else:
+            shape_ptr = np.asarray(shape_ptr, dtype=np.int64)
+            counts = np.diff(shape_ptr)[order]
+            new_ptr = np.concatenate([[0], np.cumsum(counts)])
+            gather = np.repeat(shape_ptr[:-1][order] - new_ptr[:-1], counts) + np.arange(new_ptr[-1])
+            shape_ptr = new_ptr
+            shape_lats = np.asarray(shape_lats, dtype=np.float64)[gather]
+            shape_lons = np.asarray(shape_lons, dtype=np.float64)[gather]
+        self.shape_ptr = shape_ptr
+        self.shape_lats = np.asarray(shape_lats, dtype=np.float64)
+        self.shape_lons = np.asarray(shape_lons, dtype=np.float64)
+
+        self.indptr = np.searchsorted(self.edge_source, np.arange(node_count + 1))
+        reverse = np.argsort(self.edge_target, kind='stable')
+        self.rev_indptr = np.searchsorted(self.edge_target[reverse], np.arange(node_count + 1))
+        self.rev_edge = reverse
+
+        self._fwd = (self.indptr.tolist(), self.edge_target.tolist(), list(range(len(order))))
+        self._rev = (self.rev_indptr.tolist(), self.edge_source[reverse].tolist(), reverse.tolist())
+        self.seconds = self.edge_seconds.tolist()
+        self._tree = None
+        self._zero_penalties = None
+        self._samples = None
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            speeds = self.edge_length / self.edge_seconds
+        self.max_speed_mps = float(np.nanmax(speeds[np.isfinite(speeds)])) if len(speeds) else 1.0
+        self._node_lats = np.radians(self.lats).tolist()
+        self._node_lons = np.radians(self.lons).tolist()
+
+        self.bounds = None
+        if landmarks is not None and len(landmarks):
+            self.bounds = LandmarkBounds(landmarks, landmark_from, landmark_to)
+
+    def __len__(self):
+        return len(self.lats)
+
+    @property
+    def edge_count(self):
+        return len(self.edge_source)
+
+    # Storage
+
+    def save(self, path):
+        """Write the graph as a compressed .npz file"""
+        np.savez_compressed(
+            path,
+            lats=self.lats, lons=self.lons,
+            sources=self.edge_source, targets=self.edge_target,
+            seconds=self.edge_seconds, lengths_m=self.edge_length,
+            shape_ptr=self.shape_ptr, shape_lats=self.shape_lats, shape_lons=self.shape_lons,
+            **({} if self.bounds is None else {
+                'landmarks': self.bounds.landmarks,
+                'landmark_from': self.bounds.costs_from,
+                'landmark_to': self.bounds.costs_to
+            })
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Read a graph written by save"""
+        with np.load(path) as data:
+            return cls(**{name: data[name] for name in data.files})
+
+    @classmethod
+    def from_osm(cls, path, speeds=None):
+        """
+        Build a graph from an OpenStreetMap XML extract
+
+        Keeps ways whose highway class has a speed, splits them at
+        junctions and keeps the largest connected network, so points
+        never snap onto an isolated fragment.
+
+        Args:
+            path: .osm file (convert a .pbf with `osmium cat city.osm.pbf -o city.osm`)
+            speeds: Optional highway class -> km/h table, default ROAD_SPEEDS
+        """
+        speeds = speeds or ROAD_SPEEDS
+        coords = {}
+        ways = []
+
+        for _, elem in ET.iterparse(path, events=('end',)):
+            if elem.tag == 'node':
+                coords[int(elem.get('id'))] = (float(elem.get('lat')), float(elem.get('lon')))
+                elem.clear()
+            elif elem.tag == 'way':
+                tags = {tag.get('k'): tag.get('v') for tag in elem.iter('tag')}
+                highway = tags.get('highway')
+                if highway in speeds and tags.get('access') not in ('no', 'private') and tags.get('area') != 'yes':
+                    refs = [int(nd.get('ref')) for nd in elem.iter('nd')]
+                    speed = _parse_maxspeed(tags.get('maxspeed')) or speeds[highway]
+                    ways.append((refs, speed, _direction(tags)))
+                elem.clear()
+            elif elem.tag == 'relation':
+                elem.clear()
+
+        # Junctions are nodes shared by ways and way ends; pieces of ways cut
+        # off by the edge of the extract are dropped
+        uses = Counter(ref for refs, _, _ in ways for ref in refs)
+        for refs, _, _ in ways:
+            uses[refs[0]] += 1
+            uses[refs[-1]] += 1
+
+        node_ids = {}
+        edges = []
+        for refs, speed, direction in ways:
+            segment = []
+            for ref in refs:
+                if ref not in coords:
+                    segment = []
+                    continue
+                segment.append(ref)
+                if len(segment) > 1 and uses[ref] > 1:
+                    edges.append((segment, speed, direction))
+                    segment = [ref]
+
+        # Keep the largest weakly connected network
+        parent = {}
+
+        def find(node):
+            root = node
+            while parent.get(root, root) != root:
+                root = parent[root]
+            while node != root:
+                parent[node], node = root, parent.get(node, node)
+            return root
+
+        for segment, _, _ in edges:
+            a, b = find(segment[0]), find(segment[-1])
+            if a != b:
+                parent[b] = a
+        sizes = Counter(find(segment[0]) for segment, _, _ in edges)
+        largest = sizes.most_common(1)[0][0] if sizes else None
+
+        lats, lons = [], []
+        sources, targets, seconds, lengths = [], [], [], []
+        shape_ptr, shape_lats, shape_lons = [0], [], []
+
+        def node_index(ref):
+            if ref not in node_ids:
+                node_ids[ref] = len(lats)
+                lats.append(coords[ref][0])
+                lons.append(coords[ref][1])
+            return node_ids[ref]
+
+        for segment, speed, direction in edges:
+            if find(segment[0]) != largest:
+                continue
+            seg_lats = [coords[ref][0] for ref in segment]
+            seg_lons = [coords[ref][1] for ref in segment]
+            length_km = _polyline_km(seg_lats, seg_lons)
+            start, end = node_index(segment[0]), node_index(segment[-1])
+
+            legs = []
+            if direction >= 0:
+                legs.append((start, end, seg_lats, seg_lons))
+            if direction <= 0:
+                legs.append((end, start, seg_lats[::-1], seg_lons[::-1]))
+            for source, target, leg_lats, leg_lons in legs:
+                sources.append(source)
+                targets.append(target)
+                seconds.append(length_km / speed * 3600)
+                lengths.append(length_km * 1000)
+                shape_lats.extend(leg_lats)
+                shape_lons.extend(leg_lons)
+                shape_ptr.append(len(shape_lats))
+
+        return cls(lats, lons, sources, targets, seconds, lengths, shape_ptr, shape_lats, shape_lons)
+
+    # Lookups
+
+    def nearest_node(self, latitude, longitude):
+        """
+        Snap a coordinate to the closest junction
+
+        Returns:
+            Tuple of (node, distance_km)
+        """
+        if self._tree is None:
+            self._tree = SphericalKDTree(self.lats, self.lons)
+        node, distance = self._tree.nearest(latitude, longitude, 1)[0]
+        return node, distance
+
+    def edge_shape(self, edge):
+        """Get an edge's polyline as [(lat, lon), ...]"""
+        start, end = self.shape_ptr[edge], self.shape_ptr[edge + 1]
+        return list(zip(self.shape_lats[start:end].tolist(), self.shape_lons[start:end].tolist()))
+
+    def _build_samples(self, spacing_km=0.1, cell_km=0.25):
+        """
+        Sample every edge's shape at least every spacing_km and bin the
+        samples in a planar grid sorted by cell, so each grid row of a
+        query is one searchsorted range
+        """
+        lat0 = float(self.lats.mean()) if len(self.lats) else 0.0
+        x_scale = KM_PER_DEG_LON_EQUATOR * math.cos(math.radians(lat0))
+        xs = self.shape_lons * x_scale
+        ys = self.shape_lats * KM_PER_DEG_LAT
+
+        # Segments join consecutive shape points of the same edge
+        ends = self.shape_ptr[1:] - 1
+        starts = np.setdiff1d(np.arange(len(xs) - 1), ends)
+        seg_edge = np.searchsorted(self.shape_ptr, starts, side='right') - 1
+        dx, dy = xs[starts + 1] - xs[starts], ys[starts + 1] - ys[starts]
+        steps = np.maximum(np.ceil(np.hypot(dx, dy) / spacing_km), 1).astype(np.int64)
+
+        # Each segment gets steps + 1 evenly spaced samples, both ends included
+        counts = steps + 1
+        owner = np.repeat(np.arange(len(starts)), counts)
+        offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        t = offset / steps[owner]
+        sample_x = (xs[starts][owner] + dx[owner] * t).astype(np.float32)
+        sample_y = (ys[starts][owner] + dy[owner] * t).astype(np.float32)
+        sample_edge = seg_edge[owner].astype(np.int32)
+
+        col0 = math.floor(float(sample_x.min()) / cell_km) if len(sample_x) else 0
+        row0 = math.floor(float(sample_y.min()) / cell_km) if len(sample_y) else 0
+        cols = np.floor(sample_x / cell_km).astype(np.int64) - col0
+        rows = np.floor(sample_y / cell_km).astype(np.int64) - row0
+        width = int(cols.max()) + 1 if len(cols) else 1
+        keys = rows * width + cols
+        order = np.argsort(keys, kind='stable')
+
+        self._samples = {
+            'x_scale': x_scale, 'cell_km': cell_km, 'spacing_km': spacing_km,
+            'row0': row0, 'col0': col0, 'width': width,
+            'height': int(rows.max()) + 1 if len(rows) else 1,
+            'keys': keys[order], 'x': sample_x[order], 'y': sample_y[order], 'edge': sample_edge[order]
+        }
+
+    def edges_near(self, latitude, longitude, radius_km):
+        """
+        Find the edges whose shape passes within radius_km of a coordinate
+
+        Distances are measured to shape samples at most 100 m apart, so
+        edges up to 50 m beyond the radius may be included.
+
+        Returns:
+            NumPy array of edge IDs
+        """
+        if self._samples is None:
+            self._build_samples()
+        grid = self._samples
+        if not len(grid['keys']):
+            return np.empty(0, dtype=np.int64)
+
+        x = longitude * grid['x_scale']
+        y = latitude * KM_PER_DEG_LAT
+        reach = radius_km + grid['spacing_km'] / 2
+        cell = grid['cell_km']
+        row_lo = max(math.floor((y - reach) / cell) - grid['row0'], 0)
+        row_hi = min(math.floor((y + reach) / cell) - grid['row0'], grid['height'] - 1)
+        col_lo = max(math.floor((x - reach) / cell) - grid['col0'], 0)
+        col_hi = min(math.floor((x + reach) / cell) - grid['col0'], grid['width'] - 1)
+        if row_lo > row_hi or col_lo > col_hi:
+            return np.empty(0, dtype=np.int64)
+
+        rows = np.arange(row_lo, row_hi + 1) * grid['width']
+        lo = np.searchsorted(grid['keys'], rows + col_lo)
+        hi = np.searchsorted(grid['keys'], rows + col_hi, side='right')
+        picked = np.concatenate([np.arange(a, b) for a, b in zip(lo, hi) if b > a] or [np.empty(0, dtype=np.int64)])
+        if not len(picked):
+            return np.empty(0, dtype=np.int64)
+
+        inside = np.hypot(grid['x'][picked] - x, grid['y'][picked] - y) <= reach
+        return np.unique(grid['edge'][picked[inside]]).astype(np.int64)
+
+    # Searches
+
+    def travel_times(self, source, targets, reverse=False, max_seconds=None):
+        """
+        Dijkstra from one node until every target is settled
+
+        Args:
+            source: Start node
+            targets: Nodes to time
+            reverse: Search the reverse graph, giving times from each
+                     target to source (many-to-one) instead of from source
+                     to each target
+            max_seconds: Stop searching past this travel time
+
+        Returns:
+            Dict of target -> seconds for the targets reached
+        """
+        indptr, heads, edge_ids = self._rev if reverse else self._fwd
+        seconds = self.seconds
+        limit = math.inf if max_seconds is None else max_seconds
+        remaining = set(targets)
+        result = {}
+        dist = {source: 0.0}
+        heap = [(0.0, source)]
+
+        while heap and remaining:
+            d, node = heapq.heappop(heap)
+            if d > dist[node]:
+                continue
+            if d > limit:
+                break
+            if node in remaining:
+                remaining.discard(node)
+                result[node] = d
+
+            for position in range(indptr[node], indptr[node + 1]):
+                head = heads[position]
+                candidate = d + seconds[edge_ids[position]]
+                if candidate < dist.get(head, math.inf):
+                    dist[head] = candidate
+                    heapq.heappush(heap, (candidate, head))
+
+        return result
+
+    def shortest_path(self, source, target):
+        """
+        Bidirectional Dijkstra between two nodes
+
+        Returns:
+            Tuple of (seconds, [edge, ...]), or (None, []) if unreachable
+        """
+        if source == target:
+            return 0.0, []
+
+        seconds = self.seconds
+        sides = [
+            (self._fwd, {source: 0.0}, {source: None}, [(0.0, source)]),
+            (self._rev, {target: 0.0}, {target: None}, [(0.0, target)])
+        ]
+        best, meeting = math.inf, None
+
+        while sides[0][3] and sides[1][3]:
+            if sides[0][3][0][0] + sides[1][3][0][0] >= best:
+                break
+
+            side = 0 if sides[0][3][0][0] <= sides[1][3][0][0] else 1
+            (indptr, heads, edge_ids), dist, via, heap = sides[side]
+            other_dist = sides[1 - side][1]
+
+            d, node = heapq.heappop(heap)
+            if d > dist[node]:
+                continue
+
+            for position in range(indptr[node], indptr[node + 1]):
+                head = heads[position]
+                edge = edge_ids[position]
+                candidate = d + seconds[edge]
+                if candidate < dist.get(head, math.inf):
+                    dist[head] = candidate
+                    via[head] = edge
+                    heapq.heappush(heap, (candidate, head))
+                    if head in other_dist and candidate + other_dist[head] < best:
+                        best, meeting = candidate + other_dist[head], head
+
+        if meeting is None:
+            return None, []
+        return best, self._join_path(meeting, sides[0][2], sides[1][2])
+
+    # Landmarks
+
+    def _full_search(self, source, reverse=False, costs=None):
+        """Cost from source to every node (to source, if reverse); travel time unless costs given"""
+        indptr, heads, edge_ids = self._rev if reverse else self._fwd
+        seconds = self.seconds if costs is None else costs
+        dist = [math.inf] * len(self)
+        dist[source] = 0.0
+        heap = [(0.0, source)]
+
+        while heap:
+            d, node = heapq.heappop(heap)
+            if d > dist[node]:
+                continue
+            for position in range(indptr[node], indptr[node + 1]):
+                head = heads[position]
+                candidate = d + seconds[edge_ids[position]]
+                if candidate < dist[head]:
+                    dist[head] = candidate
+                    heapq.heappush(heap, (candidate, head))
+
+        result = np.array(dist)
+        result[~np.isfinite(result)] = UNREACHABLE_SECONDS
+        return result
+
+    def prepare_landmarks(self, count=8, seed=0):
+        """
+        Pick landmarks and store travel-time bounds for every search
+
+        Takes two full searches per landmark, so it belongs in the offline
+        build; save stores the tables with the graph.
+        """
+        self.bounds = self.landmark_bounds(count, seed) if len(self) else None
+
+    def landmark_bounds(self, count=8, seed=0, penalties=None, penalty_weight=0.0, landmarks=None):
+        """
+        Time every node to and from a set of landmarks
+
+        Landmarks are picked by farthest-point selection unless given. With
+        penalties the tables hold travel time plus penalty_weight times
+        each edge's penalty, for astar calls whose penalties never drop
+        below these.
+
+        Returns:
+            LandmarkBounds
+        """
+        costs = None
+        if penalties is not None and penalty_weight:
+            costs = (self.edge_seconds + penalty_weight * np.asarray(penalties, dtype=np.float64)).tolist()
+        else:
+            penalty_weight = 0.0
+
+        tables_from, tables_to = [], []
+        if landmarks is None:
+            start = random.Random(seed).randrange(len(self))
+            spread = self._full_search(start, costs=costs)
+            landmarks = []
+            nearest = np.full(len(self), np.inf)
+            for _ in range(min(count, len(self))):
+                # The reachable node farthest from every landmark so far
+                candidates = np.where(spread < UNREACHABLE_SECONDS, nearest, -1)
+                landmark = int(np.argmax(np.where(np.isinf(candidates), spread, candidates)))
+                landmarks.append(landmark)
+                tables_from.append(self._full_search(landmark, costs=costs))
+                tables_to.append(self._full_search(landmark, reverse=True, costs=costs))
+                nearest = np.minimum(nearest, tables_from[-1])
+        else:
+            for landmark in landmarks:
+                tables_from.append(self._full_search(int(landmark), costs=costs))
+                tables_to.append(self._full_search(int(landmark), reverse=True, costs=costs))
+
+        return LandmarkBounds(landmarks, np.array(tables_from), np.array(tables_to), penalty_weight)
+
+    def _potential(self, source, target, bounds=None, scale=1.0, active_landmarks=4):
+        """
+        Build the average potential p(node) = (h_t(node) - h_s(node)) / 2
+
+        h_t bounds the cost from node to target from below and h_s the cost
+        from source to node. Searching forwards on +p and backwards on -p
+        gives both searches the same reduced edge costs, which is what lets
+        bidirectional A* stop as soon as the two frontiers' keys add up to
+        the best path found. bounds defaults to the travel-time landmarks;
+        scale shrinks the bounds for searches cheaper than their tables.
+        """
+        bounds = bounds or self.bounds
+        if bounds is not None:
+            rows = bounds.rows
+            to_target = [(f, f[target], t, t[target]) for f, t in rows]
+            from_source = [(f, f[source], t, t[source]) for f, t in rows]
+            # Only the landmarks that bound the whole trip best are consulted
+            to_target.sort(key=lambda b: max(b[1] - b[0][source], b[2][source] - b[3]), reverse=True)
+            from_source.sort(key=lambda b: max(b[0][target] - b[1], b[3] - b[2][target]), reverse=True)
+            to_target = to_target[:active_landmarks]
+            from_source = from_source[:active_landmarks]
+
+            def potential(node):
+                h_t = 0.0
+                for from_row, d_lt, to_row, d_tl in to_target:
+                    value = d_lt - from_row[node]
+                    if value > h_t:
+                        h_t = value
+                    value = to_row[node] - d_tl
+                    if value > h_t:
+                        h_t = value
+                h_s = 0.0
+                for from_row, d_ls, to_row, d_sl in from_source:
+                    value = from_row[node] - d_ls
+                    if value > h_s:
+                        h_s = value
+                    value = d_sl - to_row[node]
+                    if value > h_s:
+                        h_s = value
+                return (h_t - h_s) * scale
+            return potential
+
+        node_lats, node_lons = self._node_lats, self._node_lons
+        seconds_per_radian = EARTH_RADIUS_KM * 1000 / self.max_speed_mps
+
+        def great_circle(a, b):
+            lat_a, lat_b = node_lats[a], node_lats[b]
+            h = math.sin((lat_b - lat_a) / 2) ** 2 + \
+                math.cos(lat_a) * math.cos(lat_b) * math.sin((node_lons[b] - node_lons[a]) / 2) ** 2
+            return 2 * math.asin(math.sqrt(min(h, 1.0)))
+
+        def potential(node):
+            return (great_circle(node, target) - great_circle(source, node)) * seconds_per_radian / 2
+        return potential
+
+    def astar(self, source, target, penalties=None, penalty_weight=0.0, bounds=None):
+        """
+        Cheapest path between two nodes by bidirectional A*
+
+        Edge cost is its travel time plus penalty_weight times its entry in
+        penalties, so travel time can be traded against another per-edge
+        measure such as risk.
+
+        Args:
+            source, target: Nodes
+            penalties: Optional list of non-negative per-edge penalties
+            penalty_weight: Seconds one unit of penalty is worth
+            bounds: Optional LandmarkBounds from landmark_bounds, built with
+                    penalties no larger than these; used when
+                    penalty_weight is at least half of theirs
+
+        Returns:
+            Tuple of (cost, [edge, ...]), or (None, []) if unreachable
+        """
+        if source == target:
+            return 0.0, []
+
+        if penalties is None or not penalty_weight:
+            if self._zero_penalties is None:
+                self._zero_penalties = [0.0] * self.edge_count
+            penalties, penalty_weight = self._zero_penalties, 0.0
+
+        scale = 0.5
+        if bounds is not None and bounds.penalty_weight and penalty_weight >= bounds.penalty_weight / 2:
+            # Costs at a lower weight are at least this fraction of the tables'
+            scale *= min(1.0, penalty_weight / bounds.penalty_weight)
+        else:
+            bounds = None
+        potential = self._potential(source, target, bounds, scale)
+        potentials = {}
+        seconds = self.seconds
+        sides = [
+            (self._fwd, {source: 0.0}, {source: None}, [(potential(source), 0.0, source)], 1.0),
+            (self._rev, {target: 0.0}, {target: None}, [(-potential(target), 0.0, target)], -1.0)
+        ]
+        best, meeting = math.inf, None
+
+        while sides[0][3] and sides[1][3]:
+            if sides[0][3][0][0] + sides[1][3][0][0] >= best:
+                break
+
+            side = 0 if sides[0][3][0][0] <= sides[1][3][0][0] else 1
+            (indptr, heads, edge_ids), dist, via, heap, sign = sides[side]
+            other_dist = sides[1 - side][1]
+
+            _, d, node = heapq.heappop(heap)
+            if d > dist[node]:
+                continue
+
+            for position in range(indptr[node], indptr[node + 1]):
+                head = heads[position]
+                edge = edge_ids[position]
+                candidate = d + seconds[edge] + penalty_weight * penalties[edge]
+                if candidate < dist.get(head, math.inf):
+                    dist[head] = candidate
+                    via[head] = edge
+                    value = potentials.get(head)
+                    if value is None:
+                        value = potentials[head] = potential(head)
+                    heapq.heappush(heap, (candidate + sign * value, candidate, head))
+
+                    other = other_dist.get(head)
+                    if other is not None and candidate + other < best:
+                        best, meeting = candidate + other, head
+
+        if meeting is None:
+            return None, []
+        return best, self._join_path(meeting, sides[0][2], sides[1][2])
+
+    def _join_path(self, meeting, forward_via, backward_via):
+        """Stitch the edges of a bidirectional search through meeting"""
+        path = []
+        node = meeting
+        while forward_via[node] is not None:
+            path.append(forward_via[node])
+            node = int(self.edge_source[forward_via[node]])
+        path.reverse()
+
+        node = meeting
+        while backward_via[node] is not None:
+            path.append(backward_via[node])
+            node = int(self.edge_target[backward_via[node]])
+        return path
@@ -0,0 +1,50 @@
+"""
+Build risk-aware landmark bounds for a saved road graph in a separate process
+
+Usage (from the backend directory):
+    python -m utils.route_bounds GRAPH PENALTIES OUTPUT --penalty-weight 60 [--landmarks 16]
+
+Two full searches per landmark take tens of seconds of pure Python, so the
+safe-route service runs this as a child process instead of a thread of
+the web worker. PENALTIES is a .npy array with one penalty per edge;
+OUTPUT is written as a .npz of landmarks, costs_from and costs_to.
+"""
+import argparse
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.road_graph import LandmarkBounds, RoadGraph
+
+def save_bounds(bounds, path):
+    """Write landmark tables as .npz; the path must end in .npz"""
+    np.savez(path, landmarks=bounds.landmarks, costs_from=bounds.costs_from, costs_to=bounds.costs_to)
+
+def load_bounds(path, penalty_weight):
+    """Read tables written by save_bounds"""
+    with np.load(path) as data:
+        return LandmarkBounds(data['landmarks'], data['costs_from'], data['costs_to'], penalty_weight)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('graph', help='Road graph .npz from build-road-graph')
+    parser.add_argument('penalties', help='.npy array of per-edge penalties')
+    parser.add_argument('output', help='Destination .npz')
+    parser.add_argument('--penalty-weight', type=float, required=True)
+    parser.add_argument('--landmarks', type=int, default=16,
+                        help='Landmarks to pick when the graph stores none')
+    args = parser.parse_args()
+
+    graph = RoadGraph.load(args.graph)
+    # Reuse the stored landmarks so travel-time and risk tables agree
+    landmarks = graph.bounds.landmarks if graph.bounds is not None else None
+    bounds = graph.landmark_bounds(
+        args.landmarks, penalties=np.load(args.penalties),
+        penalty_weight=args.penalty_weight, landmarks=landmarks
+    )
+    save_bounds(bounds, args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,345 @@
+"""In-memory spatial indexing helpers"""
+import heapq
+import math
+from collections import defaultdict
+import numpy as np
+from utils.geolocation import EARTH_RADIUS_KM, get_bounding_box, within_radius_mask
+
+class GridIndex:
+    """
+    Uniform latitude/longitude cell grid mapping keys to points
+
+    Each key lives in exactly one cell, so inserts, moves and removals are
+    O(1) and radius queries only touch the cells overlapping the query box.
+    """
+
+    def __init__(self, cell_size_deg=0.01):
+        self.cell_size = cell_size_deg
+        self._cells = defaultdict(dict)
+        self._points = {}
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, key):
+        return key in self._points
+
+    def cell_for(self, latitude, longitude):
+        """Get the (row, col) cell containing a coordinate"""
+        return (
+            math.floor(latitude / self.cell_size),
+            math.floor(longitude / self.cell_size)
+        )
+
+    def insert(self, key, latitude, longitude):
+        """Insert or move a key to a coordinate"""
+        latitude = float(latitude)
+        longitude = float(longitude)
+
+        if key in self._points:
+            self.remove(key)
+
+        cell = self.cell_for(latitude, longitude)
+        self._cells[cell][key] = (latitude, longitude)
+        self._points[key] = (latitude, longitude, cell)
+
+    def remove(self, key):
+        """Remove a key, returning True if it was present"""
+        entry = self._points.pop(key, None)
+        if entry is None:
+            return False
+
+        cell = entry[2]
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self._cells[cell]
+        return True
+
+    def get(self, key):
+        """Get (latitude, longitude) for a key, or None"""
+        entry = self._points.get(key)
+        return entry[:2] if entry else None
+
+    def clear(self):
+        """Remove all keys"""
+        self._cells.clear()
+        self._points.clear()
+
+    def keys(self):
+        """Iterate over all indexed keys"""
+        return iter(self._points)
+
+    def _cells_in_box(self, min_lat, max_lat, min_lon, max_lon):
+        """Yield non-empty cells overlapping a bounding box"""
+        min_row, min_col = self.cell_for(min_lat, min_lon)
+        max_row, max_col = self.cell_for(max_lat, max_lon)
+        span = (max_row - min_row + 1) * (max_col - min_col + 1)
+
+        # For very large boxes it is cheaper to walk the occupied cells
+        if span > len(self._cells):
+            for cell, bucket in self._cells.items():
+                if min_row <= cell[0] <= max_row and min_col <= cell[1] <= max_col:
+                    yield bucket
+            return
+
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                bucket = self._cells.get((row, col))
+                if bucket:
+                    yield bucket
+
+    def query_bbox(self, min_lat, max_lat, min_lon, max_lon):
+        """
+        Find keys inside a bounding box
+
+        Returns:
+            List of (key, latitude, longitude)
+        """
+        results = []
+        for bucket in self._cells_in_box(min_lat, max_lat, min_lon, max_lon):
+            for key, (lat, lon) in bucket.items():
+                if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
+                    results.append((key, lat, lon))
+        return results
+
+    def query_radius(self, latitude, longitude, radius_km):
+        """
+        Find keys within a great-circle radius
+
+        Returns:
+            List of (key, distance_km)
+        """
+        min_lat, max_lat, min_lon, max_lon = get_bounding_box(latitude, longitude, radius_km)
+
+        candidates = self.query_bbox(min_lat, max_lat, min_lon, max_lon)
+        if not candidates:
+            return []
+
+        keys, lats, lons = zip(*candidates)
+        mask, distances = within_radius_mask(latitude, longitude, lats, lons, radius_km)
+        return [(keys[i], float(distances[i])) for i in mask.nonzero()[0]]
+
+class RTree:
+    """
+    Static R-tree over bounding boxes, bulk-loaded with Sort-Tile-Recursive
+
+    Entries are (min_lat, max_lat, min_lon, max_lon, key). STR packs every
+    node full, so the tree is as shallow as it can be and a point or box
+    query only descends into nodes whose box overlaps it. The tree is
+    immutable; rebuild it when the entries change.
+    """
+
+    def __init__(self, entries=(), node_size=16):
+        self.node_size = node_size
+        self._size = 0
+        self._root = None
+        self._build(list(entries))
+
+    def __len__(self):
+        return self._size
+
+    def _pack(self, items, is_leaf):
+        """Group one level of items into parent nodes"""
+        size = self.node_size
+        per_slab = size * math.ceil(math.sqrt(math.ceil(len(items) / size)))
+
+        # Sort by longitude into vertical slabs, then by latitude within each
+        items.sort(key=lambda b: b[2] + b[3])
+        nodes = []
+        for start in range(0, len(items), per_slab):
+            slab = sorted(items[start:start + per_slab], key=lambda b: b[0] + b[1])
+            for chunk_start in range(0, len(slab), size):
+                chunk = slab[chunk_start:chunk_start + size]
+                nodes.append((
+                    min(b[0] for b in chunk), max(b[1] for b in chunk),
+                    min(b[2] for b in chunk), max(b[3] for b in chunk),
+                    is_leaf, chunk
+                ))
+        return nodes
+
+    def _build(self, entries):
+        self._size = len(entries)
+        if not entries:
+            return
+
+        level = self._pack(entries, True)
+        while len(level) > 1:
+            level = self._pack(level, False)
+        self._root = level[0]
+
+    def query_bbox(self, min_lat, max_lat, min_lon, max_lon):
+        """
+        Find entries whose box overlaps a bounding box
+
+        Returns:
+            List of (min_lat, max_lat, min_lon, max_lon, key)
+        """
+        if self._root is None:
+            return []
+
+        results = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            for child in node[5]:
+                if child[0] <= max_lat and child[1] >= min_lat and \
+                        child[2] <= max_lon and child[3] >= min_lon:
+                    if node[4]:
+                        results.append(child)
+                    else:
+                        stack.append(child)
+        return results
+
+    def query_point(self, latitude, longitude):
+        """Find entries whose box contains a coordinate"""
+        return self.query_bbox(latitude, latitude, longitude, longitude)
+
+def _unit_vectors(lats, lons):
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    lons = np.radians(np.asarray(lons, dtype=np.float64))
+    cos_lat = np.cos(lats)
+    return np.column_stack([cos_lat * np.cos(lons), cos_lat * np.sin(lons), np.sin(lats)])
+
+class SphericalKDTree:
+    """
+    Static KD-tree of points on the Earth's surface
+
+    Points are stored as 3-D unit vectors, where straight-line (chord)
+    distance grows with great-circle distance. Nearest-neighbour and
+    radius queries on chords therefore give the same answers as
+    haversine, with plain axis-aligned boxes to prune on. Leaves hold up
+    to leaf_size points and are scanned with NumPy. The tree is
+    immutable; rebuild it when the points change.
+    """
+
+    def __init__(self, lats, lons, leaf_size=32):
+        self.leaf_size = leaf_size
+        xyz = _unit_vectors(lats, lons) if len(lats) else np.empty((0, 3))
+        order = np.arange(len(xyz))
+
+        # Nodes are (lo, hi, start, end, left, right); leaves have left = -1
+        self._nodes = []
+        if len(xyz):
+            pending = [(None, 0, len(xyz))]
+            while pending:
+                parent, start, end = pending.pop()
+                points = xyz[order[start:end]]
+                lo, hi = points.min(axis=0), points.max(axis=0)
+                node_id = len(self._nodes)
+                self._nodes.append([tuple(lo), tuple(hi), start, end, -1, -1])
+                if parent is not None:
+                    self._nodes[parent[0]][4 + parent[1]] = node_id
+
+                if end - start > leaf_size:
+                    axis = int(np.argmax(hi - lo))
+                    mid = (start + end) // 2
+                    segment = order[start:end]
+                    order[start:end] = segment[np.argpartition(xyz[segment, axis], mid - start)]
+                    pending.append(((node_id, 1), mid, end))
+                    pending.append(((node_id, 0), start, mid))
+
+        # Leaf points are contiguous, so a leaf scan is one slice
+        self._xyz = xyz[order]
+        self._index = order
+
+    def __len__(self):
+        return len(self._index)
+
+    @staticmethod
+    def chord_for(distance_km):
+        """Squared chord length of a great-circle distance"""
+        angle = min(distance_km / EARTH_RADIUS_KM, math.pi)
+        return (2 * math.sin(angle / 2)) ** 2
+
+    @staticmethod
+    def distance_for(chord_sq):
+        """Great-circle distance in km of a squared chord length"""
+        return 2 * EARTH_RADIUS_KM * math.asin(min(math.sqrt(chord_sq) / 2, 1.0))
+
+    @staticmethod
+    def _box_distance(point, lo, hi):
+        total = 0.0
+        for axis in range(3):
+            value = point[axis]
+            if value < lo[axis]:
+                total += (lo[axis] - value) ** 2
+            elif value > hi[axis]:
+                total += (value - hi[axis]) ** 2
+        return total
+
+    def nearest(self, latitude, longitude, k=1, max_distance_km=None):
+        """
+        Find the k points closest to a coordinate
+
+        Args:
+            latitude, longitude: Query coordinate
+            k: Number of neighbours
+            max_distance_km: Optional cap on the neighbours' distance
+
+        Returns:
+            List of (position, distance_km), nearest first, where position
+            indexes the lats/lons the tree was built from
+        """
+        if not self._nodes or k < 1:
+            return []
+
+        point = tuple(_unit_vectors([latitude], [longitude])[0])
+        bound = self.chord_for(max_distance_km) if max_distance_km is not None else math.inf
+        best = []  # max-heap of (-chord_sq, position)
+        queue = [(0.0, 0)]
+
+        while queue:
+            box_distance, node_id = heapq.heappop(queue)
+            if box_distance > bound:
+                break
+
+            lo, hi, start, end, left, right = self._nodes[node_id]
+            if left < 0:
+                chords = ((self._xyz[start:end] - point) ** 2).sum(axis=1)
+                for offset in np.nonzero(chords <= bound)[0]:
+                    entry = (-float(chords[offset]), int(self._index[start + offset]))
+                    if len(best) < k:
+                        heapq.heappush(best, entry)
+                    elif entry > best[0]:
+                        heapq.heapreplace(best, entry)
+                if len(best) == k:
+                    bound = -best[0][0]
+                continue
+
+            for child in (left, right):
+                child_distance = self._box_distance(point, self._nodes[child][0], self._nodes[child][1])
+                if child_distance <= bound:
+                    heapq.heappush(queue, (child_distance, child))
+
+        return [(position, self.distance_for(-chord)) for chord, position in sorted(best, reverse=True)]
+
+    def within(self, latitude, longitude, radius_km):
+        """
+        Find every point within a great-circle radius
+
+        Returns:
+            List of (position, distance_km), nearest first
+        """
+        if not self._nodes:
+            return []
+
+        point = tuple(_unit_vectors([latitude], [longitude])[0])
+        bound = self.chord_for(radius_km)
+        results = []
+        stack = [0]
+
+        while stack:
+            lo, hi, start, end, left, right = self._nodes[stack.pop()]
+            if self._box_distance(point, lo, hi) > bound:
+                continue
+            if left < 0:
+                chords = ((self._xyz[start:end] - point) ** 2).sum(axis=1)
+                for offset in np.nonzero(chords <= bound)[0]:
+                    results.append((float(chords[offset]), int(self._index[start + offset])))
+            else:
+                stack.extend((left, right))
+
+        results.sort()
+        return [(position, self.distance_for(chord)) for chord, position in results]
@@ -0,0 +1,67 @@
+"""Web Mercator (slippy map) tile math"""
+import math
+
+MAX_LATITUDE = 85.05112878
+MAX_ZOOM = 22
+
+def valid_tile(z, x, y):
+    """Check that z/x/y addresses an existing tile"""
+    if not 0 <= z <= MAX_ZOOM:
+        return False
+    n = 1 << z
+    return 0 <= x < n and 0 <= y < n
+
+def project(latitude, longitude):
+    """
+    Project a coordinate to the unit square
+
+    Returns:
+        Tuple (x, y) with x growing east and y growing south, both in [0, 1)
+    """
+    latitude = min(max(float(latitude), -MAX_LATITUDE), MAX_LATITUDE)
+    x = (float(longitude) + 180.0) / 360.0
+    s = math.sin(math.radians(latitude))
+    y = 0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)
+    return min(max(x, 0.0), 1.0 - 1e-12), min(max(y, 0.0), 1.0 - 1e-12)
+
+def unproject(x, y):
+    """Inverse of project: unit-square (x, y) to (latitude, longitude)"""
+    longitude = x * 360.0 - 180.0
+    latitude = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
+    return latitude, longitude
+
+def pixel(latitude, longitude, z, extent=256):
+    """
+    Global pixel of a coordinate at a zoom level
+
+    Args:
+        latitude, longitude: Coordinate in decimal degrees
+        z: Zoom level
+        extent: Pixels (or cells) per tile side
+
+    Returns:
+        Tuple (px, py) of integers; the tile is (px // extent, py // extent)
+    """
+    x, y = project(latitude, longitude)
+    scale = (1 << z) * extent
+    return int(x * scale), int(y * scale)
+
+def tile_for(latitude, longitude, z):
+    """Get the (x, y) tile containing a coordinate at a zoom level"""
+    return pixel(latitude, longitude, z, 1)
+
+def tile_bounds(z, x, y, buffer=0.0):
+    """
+    Bounding box of a tile
+
+    Args:
+        z, x, y: Tile address
+        buffer: Margin to add on every side, as a fraction of the tile
+
+    Returns:
+        Tuple (min_lat, min_lon, max_lat, max_lon)
+    """
+    n = 1 << z
+    max_lat, min_lon = unproject(max(x - buffer, 0) / n, max(y - buffer, 0) / n)
+    min_lat, max_lon = unproject(min(x + 1 + buffer, n) / n, min(y + 1 + buffer, n) / n)
+    return min_lat, min_lon, max_lat, max_lon